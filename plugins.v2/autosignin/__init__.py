@@ -1,8 +1,6 @@
 import re
 import traceback
 from datetime import datetime, timedelta
-from multiprocessing.dummy import Pool as ThreadPool
-from multiprocessing.pool import ThreadPool
 from typing import Any, List, Dict, Tuple, Optional
 from urllib.parse import urljoin
 
@@ -11,12 +9,13 @@ from app import schemas
 from app.core.config import settings
 from app.core.event import eventmanager, Event
 from app.db.site_oper import SiteOper
-from app.helper.browser import PlaywrightHelper
 from app.helper.cloudflare import under_challenge
 from app.helper.module import ModuleHelper
 from app.helper.sites import SitesHelper
 from app.log import logger
 from app.plugins import _PluginBase
+from app.plugins.autosignin.engine import SigninEngine, set_engine, get_session, render_page
+from app.plugins.autosignin.registry import SiteHandlerRegistry
 from app.schemas.types import EventType, NotificationType
 from app.utils.http import RequestUtils
 from app.utils.site import SiteUtils
@@ -35,7 +34,7 @@ class AutoSignIn(_PluginBase):
     # 插件图标
     plugin_icon = "signin.png"
     # 插件版本
-    plugin_version = "2.7"
+    plugin_version = "2.10"
     # 插件作者
     plugin_author = "thsrite"
     # 作者主页
@@ -49,8 +48,16 @@ class AutoSignIn(_PluginBase):
 
     # 定时器
     _scheduler: Optional[BackgroundScheduler] = None
-    # 加载的模块
-    _site_schema: list = []
+    # 站点签到实现注册表
+    _registry: Optional[SiteHandlerRegistry] = None
+    # 签到执行引擎
+    _engine: Optional[SigninEngine] = None
+    # 单个站点网络失败时的重试次数
+    _retry_cnt: int = 1
+    # 渲染站点共享的浏览器数
+    _browser_cnt: int = 2
+    # 可重试的失败信息
+    _retry_pattern = re.compile(r"无法打开网站|连通性|接口请求失败|状态码：5\d\d|timed out|Connection")
 
     # 配置属性
     _enabled: bool = False
@@ -95,8 +102,13 @@ class AutoSignIn(_PluginBase):
         # 加载模块
         if self._enabled or self._onlyonce:
 
-            self._site_schema = ModuleHelper.load('app.plugins.autosignin.sites',
-                                                  filter_func=lambda _, obj: hasattr(obj, 'match'))
+            self._registry = SiteHandlerRegistry(ModuleHelper.load('app.plugins.autosignin.sites',
+                                                                   filter_func=lambda _, obj: hasattr(obj, 'match')))
+            self._engine = SigninEngine(workers=int(self._queue_cnt), browser_workers=self._browser_cnt)
+            set_engine(self._engine)
+            stats = self._registry.stats()
+            logger.info(f"站点签到模块加载完成，共 {stats.get('handlers')} 个，"
+                        f"其中自定义匹配 {stats.get('custom')} 个，耗时 {stats.get('load_time')}ms")
 
             # 立即运行一次
             if self._onlyonce:
@@ -1348,12 +1360,18 @@ class AutoSignIn(_PluginBase):
 
         # 执行签到
         logger.info(f"开始执行{type_str}任务 ...")
-        if type_str == "签到":
-            with ThreadPool(min(len(do_sites), int(self._queue_cnt))) as p:
-                status = p.map(self.signin_site, do_sites)
-        else:
-            with ThreadPool(min(len(do_sites), int(self._queue_cnt))) as p:
-                status = p.map(self.login_site, do_sites)
+        engine = self._engine or SigninEngine(workers=int(self._queue_cnt), browser_workers=self._browser_cnt)
+        try:
+            status = engine.run(func=self.signin_site if type_str == "签到" else self.login_site,
+                                sites=do_sites,
+                                timeout=self.__site_timeout,
+                                timeout_message=f"{type_str}超时！")
+        finally:
+            # 释放本次任务的连接及浏览器，超时任务仍在执行时推迟到其结束后释放
+            engine.release()
+
+        if self._registry:
+            logger.debug(f"站点签到模块匹配统计：{self._registry.stats()}")
 
         if status:
             logger.info(f"站点{type_str}任务完成！")
@@ -1474,14 +1492,19 @@ class AutoSignIn(_PluginBase):
         # 保存配置
         self.__update_config()
 
-    def __build_class(self, url) -> Any:
-        for site_schema in self._site_schema:
-            try:
-                if site_schema.match(url):
-                    return site_schema
-            except Exception as e:
-                logger.error("站点模块加载失败：%s" % str(e))
-        return None
+    def __site_timeout(self, site_info: CommentedMap) -> float:
+        """
+        单个站点最长执行时间，按站点超时时间及重试次数计算
+        """
+        return (site_info.get("timeout") or 60) * 2 * (self._retry_cnt + 1) + 30
+
+    def __get_handler(self, url: str) -> Any:
+        """
+        获取站点对应的签到实现实例
+        """
+        if not self._registry:
+            return None
+        return self._registry.get(url)
 
     def signin_by_domain(self, url: str, apikey: str) -> schemas.Response:
         """
@@ -1508,17 +1531,21 @@ class AutoSignIn(_PluginBase):
         """
         签到一个站点
         """
-        site_module = self.__build_class(site_info.get("url"))
+        site_module = self.__get_handler(site_info.get("url"))
         # 开始记时
         start_time = datetime.now()
-        if site_module and hasattr(site_module, "signin"):
-            try:
-                state, message = site_module().signin(site_info)
-            except Exception as e:
-                traceback.print_exc()
-                state, message = False, f"签到失败：{str(e)}"
-        else:
-            state, message = self.__signin_base(site_info)
+        for i in range(self._retry_cnt + 1):
+            if site_module and hasattr(site_module, "signin"):
+                try:
+                    state, message = site_module.signin(site_info)
+                except Exception as e:
+                    traceback.print_exc()
+                    state, message = False, f"签到失败：{str(e)}"
+            else:
+                state, message = self.__signin_base(site_info)
+            if state or i >= self._retry_cnt or not self._retry_pattern.search(message or ""):
+                break
+            logger.info(f"{site_info.get('name')} 签到失败，第 {i + 1} 次重试 ...")
         # 统计
         seconds = (datetime.now() - start_time).seconds
         domain = StringUtils.get_url_domain(site_info.get('url'))
@@ -1557,11 +1584,11 @@ class AutoSignIn(_PluginBase):
                 checkin_url = urljoin(site_url, "attendance.php")
             logger.info(f"开始站点签到：{site}，地址：{checkin_url}...")
             if render:
-                page_source = PlaywrightHelper().get_page_source(url=checkin_url,
-                                                                 cookies=site_cookie,
-                                                                 ua=ua,
-                                                                 proxies=proxy_server,
-                                                                 timeout=timeout)
+                page_source = render_page(url=checkin_url,
+                                          cookies=site_cookie,
+                                          ua=ua,
+                                          proxies=proxy_server,
+                                          timeout=timeout)
                 if not SiteUtils.is_logged_in(page_source):
                     if under_challenge(page_source):
                         return False, f"无法通过Cloudflare！"
@@ -1576,6 +1603,7 @@ class AutoSignIn(_PluginBase):
                 res = RequestUtils(cookies=site_cookie,
                                    ua=ua,
                                    proxies=proxies,
+                                   session=get_session(checkin_url),
                                    timeout=timeout
                                    ).get_res(url=checkin_url)
                 if not res and site_url != checkin_url:
@@ -1583,6 +1611,7 @@ class AutoSignIn(_PluginBase):
                     res = RequestUtils(cookies=site_cookie,
                                        ua=ua,
                                        proxies=proxies,
+                                       session=get_session(site_url),
                                        timeout=timeout
                                        ).get_res(url=site_url)
                 # 判断登录状态
@@ -1614,17 +1643,21 @@ class AutoSignIn(_PluginBase):
         """
         模拟登录一个站点
         """
-        site_module = self.__build_class(site_info.get("url"))
+        site_module = self.__get_handler(site_info.get("url"))
         # 开始记时
         start_time = datetime.now()
-        if site_module and hasattr(site_module, "login"):
-            try:
-                state, message = site_module().login(site_info)
-            except Exception as e:
-                traceback.print_exc()
-                state, message = False, f"模拟登录失败：{str(e)}"
-        else:
-            state, message = self.__login_base(site_info)
+        for i in range(self._retry_cnt + 1):
+            if site_module and hasattr(site_module, "login"):
+                try:
+                    state, message = site_module.login(site_info)
+                except Exception as e:
+                    traceback.print_exc()
+                    state, message = False, f"模拟登录失败：{str(e)}"
+            else:
+                state, message = self.__login_base(site_info)
+            if state or i >= self._retry_cnt or not self._retry_pattern.search(message or ""):
+                break
+            logger.info(f"{site_info.get('name')} 模拟登录失败，第 {i + 1} 次重试 ...")
         # 统计
         seconds = (datetime.now() - start_time).seconds
         domain = StringUtils.get_url_domain(site_info.get('url'))
@@ -1660,11 +1693,11 @@ class AutoSignIn(_PluginBase):
             site_url = str(site_url).replace("attendance.php", "")
             logger.info(f"开始站点模拟登录：{site}，地址：{site_url}...")
             if render:
-                page_source = PlaywrightHelper().get_page_source(url=site_url,
-                                                                 cookies=site_cookie,
-                                                                 ua=ua,
-                                                                 proxies=proxy_server,
-                                                                 timeout=timeout)
+                page_source = render_page(url=site_url,
+                                          cookies=site_cookie,
+                                          ua=ua,
+                                          proxies=proxy_server,
+                                          timeout=timeout)
                 if not SiteUtils.is_logged_in(page_source):
                     if under_challenge(page_source):
                         return False, f"无法通过Cloudflare！"
@@ -1675,6 +1708,7 @@ class AutoSignIn(_PluginBase):
                 res = RequestUtils(cookies=site_cookie,
                                    ua=ua,
                                    proxies=proxies,
+                                   session=get_session(site_url),
                                    timeout=timeout
                                    ).get_res(url=site_url)
                 # 判断登录状态
@@ -1712,6 +1746,10 @@ class AutoSignIn(_PluginBase):
                 if self._scheduler.running:
                     self._scheduler.shutdown()
                 self._scheduler = None
+            if self._engine:
+                set_engine(None)
+                self._engine.release(force=True)
+                self._engine = None
         except Exception as e:
             logger.error("退出插件失败：%s" % str(e))
 
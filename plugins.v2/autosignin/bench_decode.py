@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+页面解码微基准，对比整页chardet检测与 _ISiteSigninHandler.decode_page 的耗时及解码结果，
+并检查同一站点随后的UTF-8页面能否正确解码，页面为模拟的NexusPHP用户页面，在MoviePilot环境中执行：
+
+    python -m app.plugins.autosignin.bench_decode
+"""
+import time
+from typing import Callable, Tuple
+
+import chardet
+from requests import Response
+
+from app.plugins.autosignin import sites
+from app.plugins.autosignin.sites import _ISiteSigninHandler
+
+# 每个页面的表格行数
+_ROWS = 4000
+# 简体及繁体页面的表格行
+_ROW = "<tr><td>用户名</td><td>魔力值 12,345.6 签到已得 已签到 今日已签到</td></tr>\n"
+_ROW_HANT = "<tr><td>用戶名</td><td>魔力值 12,345.6 簽到已得 已簽到 今日已簽到</td></tr>\n"
+# 以ASCII为主的表格行，如种子列表，中文字符占比很低
+_ROW_ASCII = '<tr class="torrent"><td><a href="details.php?id=123456&amp;hit=1">' \
+             'Some.Movie.2023.1080p.BluRay.x264-GROUP</a></td><td>12.34 GB</td><td>2023-01-01 12:00:00</td></tr>\n'
+# 签到结果页面
+_SIGNED = "<html><body><p>今天已经签到过了</p></body></html>"
+# 每种方式的执行次数，取平均值
+_ROUNDS = 5
+
+
+def build_page(encoding: str, declared: bool, row: str) -> bytes:
+    """
+    构造模拟页面
+    :param encoding: 页面编码
+    :param declared: 是否在meta中声明编码
+    :param row: 表格行
+    """
+    meta = f'<meta charset="{encoding}">' if declared else ''
+    return f"<html><head>{meta}<title>控制面板</title></head><body><table>{row * _ROWS}</table></body></html>" \
+        .encode(encoding)
+
+
+def build_response(content: bytes) -> Response:
+    res = Response()
+    res._content = content
+    res.status_code = 200
+    res.headers["Content-Type"] = "text/html"
+    return res
+
+
+def chardet_decode(content: bytes) -> str:
+    """
+    原有的解码方式：对整个页面执行chardet检测
+    """
+    return content.decode(chardet.detect(content)["encoding"])
+
+
+def timeit(func: Callable[[], str], reset: bool = False) -> Tuple[float, str]:
+    """
+    执行多次并返回平均耗时（毫秒）及解码结果
+    :param reset: 每次执行前清空站点编码记录，即首次访问该站点
+    """
+    text, elapsed = "", 0.0
+    for _ in range(_ROUNDS):
+        if reset:
+            sites._page_encodings.clear()
+        start = time.perf_counter()
+        text = func()
+        elapsed += time.perf_counter() - start
+    return elapsed / _ROUNDS * 1000, text
+
+
+def main():
+    url = "https://bench.example.org/index.php"
+    cases = [
+        ("UTF-8，声明编码", "utf-8", True, _ROW),
+        ("GBK，未声明编码", "gbk", False, _ROW),
+        ("Big5，未声明编码", "big5", False, _ROW_HANT),
+        ("GBK，未声明编码，以ASCII为主", "gbk", False, _ROW_ASCII),
+    ]
+    for name, encoding, declared, row in cases:
+        content = build_page(encoding, declared, row)
+        expected = content.decode(encoding)
+        old_time, old_text = timeit(lambda: chardet_decode(content))
+        cold_time, cold_text = timeit(lambda: _ISiteSigninHandler.decode_page(url, build_response(content)),
+                                      reset=True)
+        warm_time, warm_text = timeit(lambda: _ISiteSigninHandler.decode_page(url, build_response(content)))
+        # 站点编码记录不能影响随后的UTF-8页面
+        utf8_text = _ISiteSigninHandler.decode_page(url, build_response(_SIGNED.encode("utf-8")))
+        print(f"{name}：{len(content) // 1024} KB，整页chardet {old_time:.1f} ms（{old_text == expected}），"
+              f"decode_page 首次 {cold_time:.2f} ms（{cold_text == expected}），"
+              f"再次访问 {warm_time:.2f} ms（{warm_text == expected}），"
+              f"随后UTF-8页面（{utf8_text == _SIGNED}）")
+        sites._page_encodings.clear()
+
+
+if __name__ == "__main__":
+    main()
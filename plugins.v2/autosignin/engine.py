@@ -0,0 +1,320 @@
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from playwright.sync_api import sync_playwright
+from requests import Session
+from requests.adapters import HTTPAdapter
+
+from app.helper.browser import PlaywrightHelper
+from app.helper.cloudflare import under_challenge
+from app.log import logger
+from app.utils.string import StringUtils
+
+
+class SessionPool(object):
+    """
+    按站点域名复用的HTTP会话池，同一站点的多次请求复用长连接
+    """
+
+    def __init__(self, pool_size: int = 4):
+        # 每个站点保持的最大连接数
+        self._pool_size = pool_size
+        self._sessions: Dict[str, Session] = {}
+        self._lock = threading.Lock()
+
+    def get(self, url: str) -> Optional[Session]:
+        """
+        获取站点对应的会话
+        """
+        domain = StringUtils.get_url_domain(url)
+        if not domain:
+            return None
+        with self._lock:
+            session = self._sessions.get(domain)
+            if not session:
+                session = Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self._pool_size)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._sessions[domain] = session
+            return session
+
+    def close(self):
+        """
+        关闭全部会话
+        """
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for session in sessions:
+            try:
+                session.close()
+            except Exception as e:
+                logger.debug(f"关闭会话失败：{str(e)}")
+
+
+class BrowserPool(object):
+    """
+    常驻浏览器池，每个工作线程持有一个浏览器实例，并按站点复用浏览器上下文；
+    Playwright同步接口的对象只能在创建它的线程中使用，因此渲染请求统一提交给工作线程执行
+    """
+
+    def __init__(self, workers: int = 2, max_contexts: int = 8, headless: bool = False):
+        self._workers = workers
+        # 每个浏览器保留的最大上下文数
+        self._max_contexts = max_contexts
+        self._headless = headless
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+
+    def get_page_source(self, url: str, cookies: str = None, ua: str = None,
+                        proxies: dict = None, timeout: int = 60) -> str:
+        """
+        渲染页面并返回页面源码，遇到Cloudflare防护或渲染失败时回退到PlaywrightHelper
+        """
+        self.__start()
+        future = Future()
+        self._queue.put((future, url, cookies, ua, proxies, timeout))
+        try:
+            page_source = future.result(timeout=timeout * 2 + 30)
+            if page_source and not under_challenge(page_source):
+                return page_source
+        except Exception as e:
+            future.cancel()
+            logger.warn(f"浏览器池渲染页面失败：{url} {str(e)}")
+        return PlaywrightHelper().get_page_source(url=url,
+                                                  cookies=cookies,
+                                                  ua=ua,
+                                                  proxies=proxies,
+                                                  timeout=timeout)
+
+    def close(self):
+        """
+        关闭全部浏览器
+        """
+        with self._lock:
+            threads, self._threads = self._threads, []
+            for _ in threads:
+                self._queue.put(None)
+        for thread in threads:
+            thread.join(timeout=30)
+
+    def __start(self):
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self._workers):
+                thread = threading.Thread(target=self.__worker, name=f"AutoSignIn-Browser-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def __worker(self):
+        playwright, browser = None, None
+        # (站点域名, UA, 代理) -> 浏览器上下文
+        contexts: "OrderedDict[tuple, Any]" = OrderedDict()
+        try:
+            while True:
+                task = self._queue.get()
+                if task is None:
+                    break
+                future, url, cookies, ua, proxies, timeout = task
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    if not browser:
+                        playwright = sync_playwright().start()
+                        browser = playwright.chromium.launch(headless=self._headless)
+                    key = (StringUtils.get_url_domain(url), ua, str(proxies))
+                    context = contexts.pop(key, None) or browser.new_context(user_agent=ua, proxy=proxies)
+                    contexts[key] = context
+                    while len(contexts) > self._max_contexts:
+                        contexts.popitem(last=False)[1].close()
+                    page = context.new_page()
+                    try:
+                        if cookies:
+                            page.set_extra_http_headers({"cookie": cookies})
+                        page.goto(url, timeout=timeout * 1000)
+                        page.wait_for_load_state("networkidle", timeout=timeout * 1000)
+                        future.set_result(page.content())
+                    finally:
+                        page.close()
+                except Exception as e:
+                    future.set_exception(e)
+        finally:
+            for context in contexts.values():
+                try:
+                    context.close()
+                except Exception as e:
+                    logger.debug(f"关闭浏览器上下文失败：{str(e)}")
+            try:
+                if browser:
+                    browser.close()
+                if playwright:
+                    playwright.stop()
+            except Exception as e:
+                logger.debug(f"关闭浏览器失败：{str(e)}")
+
+
+class SigninEngine(object):
+    """
+    站点签到执行引擎，并发执行各站点任务并控制单站点超时，站点请求复用会话池及浏览器池
+    """
+
+    def __init__(self, workers: int = 5, browser_workers: int = 2, release_wait: float = 30):
+        self._workers = workers
+        # 释放前等待超时任务结束的最长时间（秒）
+        self._release_wait = release_wait
+        self.sessions = SessionPool()
+        self.browsers = BrowserPool(workers=browser_workers)
+        self._lock = threading.Lock()
+        # 已判定超时但仍在执行的站点任务
+        self._orphans: Set[Future] = set()
+        # 正在执行的批次数
+        self._running = 0
+        # 是否存在因其它批次或超时任务未结束而推迟的释放
+        self._release_pending = False
+
+    def run(self, func: Callable[[Any], Tuple[str, str]], sites: List[Any],
+            timeout: Callable[[Any], float], timeout_message: str) -> List[Tuple[str, str]]:
+        """
+        并发执行站点任务，结果顺序与站点顺序一致
+        :param func: 站点任务，返回(站点名称, 结果信息)
+        :param sites: 站点列表
+        :param timeout: 计算单个站点最长执行时间的函数，从该站点任务开始执行时计时
+        :param timeout_message: 站点执行超时时的结果信息
+        """
+        if not sites:
+            return []
+        with self._lock:
+            self._running += 1
+            self._release_pending = False
+        results: List[Optional[Tuple[str, str]]] = [None] * len(sites)
+        started: Dict[int, float] = {}
+
+        def __task(index: int) -> Tuple[str, str]:
+            started[index] = time.monotonic()
+            return func(sites[index])
+
+        executor = ThreadPoolExecutor(max_workers=max(1, min(len(sites), self._workers)),
+                                      thread_name_prefix="AutoSignIn")
+        try:
+            futures = {executor.submit(__task, index): index for index in range(len(sites))}
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, timeout=1, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index = futures[future]
+                    try:
+                        results[index] = future.result()
+                    except Exception as e:
+                        logger.error(f"站点 {sites[index].get('name')} 执行失败：{str(e)}")
+                        results[index] = (sites[index].get("name"), f"执行失败：{str(e)}！")
+                now = time.monotonic()
+                for future in list(pending):
+                    index = futures[future]
+                    start = started.get(index)
+                    if start is not None and now - start > timeout(sites[index]):
+                        logger.warn(f"站点 {sites[index].get('name')} 执行超时")
+                        pending.discard(future)
+                        results[index] = (sites[index].get("name"), timeout_message)
+                        self.__add_orphan(future)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+            with self._lock:
+                self._running -= 1
+                close = self.__can_close()
+        if close:
+            self.__close()
+        return results
+
+    def release(self, force: bool = False) -> bool:
+        """
+        释放会话及浏览器；其它批次仍在执行时推迟到最后一个批次结束后再释放；
+        仍有超时任务在执行时先等待其结束，超过等待时间仍未结束则推迟到这些任务结束后再释放
+        :param force: 不等待其它批次及超时任务，直接释放
+        :return: 是否已释放
+        """
+        with self._lock:
+            if self._running and not force:
+                logger.debug(f"仍有 {self._running} 个签到批次在执行，待其结束后再释放会话及浏览器")
+                self._release_pending = True
+                return False
+            orphans = set(self._orphans)
+        if orphans and not force:
+            wait(orphans, timeout=self._release_wait)
+        with self._lock:
+            if self._running and not force:
+                self._release_pending = True
+                return False
+            running = [future for future in self._orphans if not future.done()]
+            if running and not force:
+                logger.warn(f"仍有 {len(running)} 个超时站点任务未结束，待其结束后再释放会话及浏览器")
+                self._release_pending = True
+                return False
+            self._release_pending = False
+        self.__close()
+        return True
+
+    def __add_orphan(self, future: Future):
+        with self._lock:
+            self._orphans.add(future)
+        future.add_done_callback(self.__on_orphan_done)
+
+    def __on_orphan_done(self, future: Future):
+        """
+        超时任务结束后，如存在推迟的释放且没有正在执行的批次，则执行释放
+        """
+        with self._lock:
+            self._orphans.discard(future)
+            close = self.__can_close()
+        if close:
+            self.__close()
+
+    def __can_close(self) -> bool:
+        """
+        存在推迟的释放且批次及超时任务均已结束时，取消推迟标记并返回可以释放，调用方需持有锁
+        """
+        if not self._release_pending or self._running \
+                or any(not future.done() for future in self._orphans):
+            return False
+        self._release_pending = False
+        return True
+
+    def __close(self):
+        self.sessions.close()
+        self.browsers.close()
+
+
+# 当前生效的执行引擎
+_engine: Optional[SigninEngine] = None
+
+
+def set_engine(engine: Optional[SigninEngine]):
+    """
+    设置当前生效的执行引擎
+    """
+    global _engine
+    _engine = engine
+
+
+def get_session(url: str) -> Optional[Session]:
+    """
+    获取站点复用的HTTP会话，引擎未启用时返回None
+    """
+    engine = _engine
+    return engine.sessions.get(url) if engine else None
+
+
+def render_page(url: str, cookies: str = None, ua: str = None, proxies: dict = None, timeout: int = 60) -> str:
+    """
+    渲染页面，引擎未启用时直接使用PlaywrightHelper
+    """
+    engine = _engine
+    if engine:
+        return engine.browsers.get_page_source(url=url, cookies=cookies, ua=ua, proxies=proxies, timeout=timeout)
+    return PlaywrightHelper().get_page_source(url=url, cookies=cookies, ua=ua, proxies=proxies, timeout=timeout)
@@ -0,0 +1,97 @@
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+
+from app.log import logger
+
+
+class SiteHandlerRegistry(object):
+    """
+    站点签到实现类注册表，按站点域名直接定位签到实现，
+    仅对使用自定义match规则的实现类逐个调用match
+    """
+
+    def __init__(self, handlers: List[Any]):
+        start = time.perf_counter()
+        # 站点域名 -> 签到实现实例
+        self._domains: Dict[str, Any] = {}
+        # 使用自定义match规则的签到实现实例
+        self._custom: List[Any] = []
+        for handler in handlers or []:
+            try:
+                instance = handler()
+            except Exception as e:
+                logger.error(f"站点签到模块 {handler.__name__} 加载失败：{str(e)}")
+                continue
+            domain = self.get_domain(getattr(handler, "site_url", ""))
+            if getattr(handler, "custom_match", False) or not domain:
+                self._custom.append(instance)
+            elif domain in self._domains:
+                logger.warn(f"站点签到模块 {handler.__name__} 与 "
+                            f"{type(self._domains[domain]).__name__} 域名重复：{domain}")
+            else:
+                self._domains[domain] = instance
+        self._load_time = time.perf_counter() - start
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._custom_hits = 0
+        self._misses = 0
+        self._dispatch_time = 0.0
+
+    def __len__(self) -> int:
+        return len(self._domains) + len(self._custom)
+
+    @staticmethod
+    def get_domain(url: str) -> str:
+        """
+        获取用于匹配的站点域名，与StringUtils.url_equal的比较规则一致
+        """
+        if not url:
+            return ""
+        if url.startswith("http"):
+            url = urlparse(url).netloc
+        return url.replace("www.", "")
+
+    def get(self, url: str) -> Optional[Any]:
+        """
+        获取站点Url对应的签到实现实例
+        """
+        start = time.perf_counter()
+        handler = self._domains.get(self.get_domain(url))
+        custom = False
+        if not handler and url:
+            for instance in self._custom:
+                try:
+                    if instance.match(url):
+                        handler = instance
+                        custom = True
+                        break
+                except Exception as e:
+                    logger.error(f"站点签到模块 {type(instance).__name__} 匹配失败：{str(e)}")
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self._dispatch_time += elapsed
+            if not handler:
+                self._misses += 1
+            elif custom:
+                self._custom_hits += 1
+            else:
+                self._hits += 1
+        return handler
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        注册表加载及匹配统计，耗时单位：毫秒
+        """
+        with self._lock:
+            return {
+                "handlers": len(self),
+                "domains": len(self._domains),
+                "custom": len(self._custom),
+                "load_time": round(self._load_time * 1000, 2),
+                "hits": self._hits,
+                "custom_hits": self._custom_hits,
+                "misses": self._misses,
+                "dispatch_time": round(self._dispatch_time * 1000, 3)
+            }
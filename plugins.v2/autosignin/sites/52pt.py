@@ -128,7 +128,8 @@ class Pt52(_ISiteSigninHandler):
         sign_res = RequestUtils(cookies=site_cookie,
                                 ua=ua,
                                 proxies=settings.PROXY if proxy else None,
-                                timeout=timeout
+                                timeout=timeout,
+                                session=self.get_session('https://52pt.site/bakatest.php')
                                 ).post_res(url='https://52pt.site/bakatest.php', data=data)
         if not sign_res or sign_res.status_code != 200:
             logger.error(f"{site} 签到失败，签到接口请求失败")
@@ -1,18 +1,48 @@
 # -*- coding: utf-8 -*-
+import codecs
 import re
 from abc import ABCMeta, abstractmethod
-from typing import Tuple
+from typing import Tuple, Optional, Dict
 
 import chardet
+from requests import Response, Session
 from ruamel.yaml import CommentedMap
 
 from app.core.config import settings
-from app.helper.browser import PlaywrightHelper
 from app.log import logger
+from app.plugins.autosignin.engine import get_session, render_page
 from app.utils.http import RequestUtils
 from app.utils.string import StringUtils
 
 
+# Content-Type中声明的编码
+_CHARSET_RE = re.compile(r"charset=[\"']?([\w.:-]+)", re.I)
+# 页面meta中声明的编码
+_META_CHARSET_RE = re.compile(rb"<meta[^>]+charset=[\"']?([\w.:-]+)", re.I)
+# 查找meta声明的字节数
+_META_SCAN_SIZE = 4096
+# chardet检测的字节数
+_DETECT_SIZE = 32 * 1024
+# 多字节编码（codecs规范名称），单字节编码几乎能解码任意字节，解码成功不能说明编码正确
+_MULTI_BYTE_CODECS = {"utf-8", "utf-8-sig", "gbk", "gb2312", "gb18030", "hz", "big5", "big5hkscs", "cp950",
+                      "shift_jis", "shift_jis_2004", "shift_jisx0213", "cp932", "euc_jp", "euc_jis_2004",
+                      "euc_jisx0213", "iso2022_jp", "euc_kr", "cp949", "johab"}
+# 站点域名 -> 上次使用的声明编码
+_page_encodings: Dict[str, str] = {}
+
+
+def _is_multi_byte(encoding: Optional[str]) -> bool:
+    """
+    是否为多字节编码，未知编码视为否
+    """
+    if not encoding:
+        return False
+    try:
+        return codecs.lookup(encoding).name in _MULTI_BYTE_CODECS
+    except LookupError:
+        return False
+
+
 class _ISiteSigninHandler(metaclass=ABCMeta):
     """
     实现站点签到的基类，所有站点签到类都需要继承此类，并实现match和signin方法
@@ -20,6 +50,8 @@ class _ISiteSigninHandler(metaclass=ABCMeta):
     """
     # 匹配的站点Url，每一个实现类都需要设置为自己的站点Url
     site_url = ""
+    # 是否使用自定义match规则，为False时直接按site_url域名匹配，不调用match
+    custom_match = False
 
     @abstractmethod
     def match(self, url: str) -> bool:
@@ -56,11 +88,11 @@ class _ISiteSigninHandler(metaclass=ABCMeta):
         :return: 页面源码，错误信息
         """
         if render:
-            return PlaywrightHelper().get_page_source(url=url,
-                                                      cookies=cookie,
-                                                      ua=ua,
-                                                      proxies=settings.PROXY_SERVER if proxy else None,
-                                                      timeout=timeout or 60)
+            return render_page(url=url,
+                               cookies=cookie,
+                               ua=ua,
+                               proxies=settings.PROXY_SERVER if proxy else None,
+                               timeout=timeout or 60)
         else:
             if token:
                 headers = {
@@ -74,23 +106,72 @@ class _ISiteSigninHandler(metaclass=ABCMeta):
                 }
             res = RequestUtils(headers=headers,
                                proxies=settings.PROXY if proxy else None,
+                               session=get_session(url),
                                timeout=timeout or 20).get_res(url=url)
             if res is not None:
-                # 使用chardet检测字符编码
-                raw_data = res.content
-                if raw_data:
-                    try:
-                        result = chardet.detect(raw_data)
-                        encoding = result['encoding']
-                        # 解码为字符串
-                        return raw_data.decode(encoding)
-                    except Exception as e:
-                        logger.error(f"chardet解码失败：{str(e)}")
-                        return res.text
-                else:
-                    return res.text
+                return _ISiteSigninHandler.decode_page(url=url, res=res)
             return ""
 
+    @staticmethod
+    def decode_page(url: str, res: Response) -> str:
+        """
+        解码页面内容，依次尝试声明的字符编码、UTF-8及该站点上次使用的编码，
+        均失败时对页面前部内容使用chardet检测，检测失败时才使用可解码几乎任意字节的GB18030；
+        单字节编码几乎总能解码成功，声明及检测到的单字节编码均不采用，chardet的检测结果也不记录为站点编码
+        :param url: Url地址
+        :param res: 请求响应
+        :return: 页面源码
+        """
+        raw_data = res.content
+        if not raw_data:
+            return res.text
+        domain = StringUtils.get_url_domain(url)
+        encodings = []
+        # Content-Type 及 meta 中声明的编码
+        for match in (_CHARSET_RE.search(res.headers.get("Content-Type") or ""),
+                      _META_CHARSET_RE.search(raw_data[:_META_SCAN_SIZE])):
+            if match:
+                encoding = match.group(1)
+                if isinstance(encoding, bytes):
+                    encoding = encoding.decode("ascii", "ignore")
+                if _is_multi_byte(encoding):
+                    encodings.append(encoding)
+        encodings += ["utf-8", _page_encodings.get(domain)]
+        tried = set()
+        for encoding in encodings:
+            if not encoding or codecs.lookup(encoding).name in tried:
+                continue
+            tried.add(codecs.lookup(encoding).name)
+            try:
+                html_text = raw_data.decode(encoding)
+            except UnicodeDecodeError:
+                continue
+            # UTF-8 总是优先尝试，无需记录
+            if codecs.lookup(encoding).name != "utf-8":
+                _page_encodings[domain] = encoding
+            return html_text
+        # 仅检测页面前部内容，以ASCII为主的页面检测结果不可靠，不记录为站点编码
+        try:
+            encoding = chardet.detect(raw_data[:_DETECT_SIZE])['encoding']
+            if _is_multi_byte(encoding) and codecs.lookup(encoding).name not in tried:
+                return raw_data.decode(encoding)
+        except Exception as e:
+            logger.debug(f"chardet解码失败：{str(e)}")
+        # 兜底编码不记录为站点编码，避免掩盖后续页面的真实编码
+        try:
+            return raw_data.decode("gb18030")
+        except UnicodeDecodeError as e:
+            logger.error(f"页面解码失败：{str(e)}")
+            return res.text
+
+    @staticmethod
+    def get_session(url: str) -> Optional[Session]:
+        """
+        获取站点复用的HTTP会话，用于构造RequestUtils时传入session，签到任务外调用时返回None
+        :param url: Url地址
+        """
+        return get_session(url)
+
     @staticmethod
     def sign_in_result(html_res: str, regexs: list) -> bool:
         """
@@ -69,7 +69,8 @@ class Hares(_ISiteSigninHandler):
         sign_res = RequestUtils(cookies=site_cookie,
                                 headers=headers,
                                 proxies=settings.PROXY if proxy else None,
-                                timeout=timeout
+                                timeout=timeout,
+                                session=self.get_session("https://club.hares.top/attendance.php?action=sign")
                                 ).get_res(url="https://club.hares.top/attendance.php?action=sign")
         if not sign_res or sign_res.status_code != 200:
             logger.error(f"{site} 签到失败，签到接口请求失败")
@@ -61,7 +61,8 @@ class HDChina(_ISiteSigninHandler):
         html_res = RequestUtils(cookies=site_cookie,
                                 ua=ua,
                                 proxies=proxies,
-                                timeout=timeout
+                                timeout=timeout,
+                                session=self.get_session("https://hdchina.org/index.php")
                                 ).get_res(url="https://hdchina.org/index.php")
         if not html_res or html_res.status_code != 200:
             logger.error(f"{site} 签到失败，请检查站点连通性")
@@ -102,7 +103,8 @@ class HDChina(_ISiteSigninHandler):
         sign_res = RequestUtils(cookies=site_cookie,
                                 ua=ua,
                                 proxies=proxies,
-                                timeout=timeout
+                                timeout=timeout,
+                                session=self.get_session("https://hdchina.org/plugin_sign-in.php?cmd=signin")
                                 ).post_res(url="https://hdchina.org/plugin_sign-in.php?cmd=signin", data=data)
         if not sign_res or sign_res.status_code != 200:
             logger.error(f"{site} 签到失败，签到接口请求失败")
@@ -76,7 +76,8 @@ class HDSky(_ISiteSigninHandler):
                                      referer="https://hdsky.me/index.php",
                                      accept_type="*/*",
                                      proxies=settings.PROXY if proxy else None,
-                                     timeout=timeout
+                                     timeout=timeout,
+                                     session=self.get_session('https://hdsky.me/image_code_ajax.php')
                                      ).post_res(url='https://hdsky.me/image_code_ajax.php',
                                                 data={'action': 'new'})
             if image_res and image_res.status_code == 200:
@@ -122,7 +123,8 @@ class HDSky(_ISiteSigninHandler):
                 res = RequestUtils(cookies=site_cookie,
                                    ua=ua,
                                    referer=referer,
-                                   proxies=settings.PROXY if proxy else None
+                                   proxies=settings.PROXY if proxy else None,
+                                   session=self.get_session('https://hdsky.me/showup.php')
                                    ).post_res(url='https://hdsky.me/showup.php', data=data)
                 if res and res.status_code == 200:
                     if json.loads(res.text)["success"]:
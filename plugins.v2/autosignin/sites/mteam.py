@@ -14,6 +14,8 @@ class MTorrent(_ISiteSigninHandler):
     """
     # 匹配的站点Url，每一个实现类都需要设置为自己的站点Url
     site_url = "m-team"
+    # 按自定义规则匹配站点Url
+    custom_match = True
 
     @classmethod
     def match(cls, url: str) -> bool:
@@ -43,7 +45,8 @@ class MTorrent(_ISiteSigninHandler):
         res = RequestUtils(headers=headers,
                            timeout=timeout,
                            proxies=settings.PROXY if site_info.get("proxy") else None,
-                           referer=f"{url}index"
+                           referer=f"{url}index",
+                           session=self.get_session(f"https://api.{domain}/api/member/updateLastBrowse")
                            ).post_res(url=f"https://api.{domain}/api/member/updateLastBrowse")
         if res:
             return True, "模拟登录成功"
@@ -50,7 +50,8 @@ class NexusHD(_ISiteSigninHandler):
         html_res = RequestUtils(cookies=site_cookie,
                                 ua=ua,
                                 proxies=proxies,
-                                timeout=timeout
+                                timeout=timeout,
+                                session=self.get_session("https://v6.nexushd.org/signin.php")
                                 ).post_res(url="https://v6.nexushd.org/signin.php", data=data)
         if not html_res or html_res.status_code != 200:
             logger.error(f"{site} 签到失败，请检查站点连通性")
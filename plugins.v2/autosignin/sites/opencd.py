@@ -117,7 +117,8 @@ class Opencd(_ISiteSigninHandler):
             # 访问签到链接
             sign_res = RequestUtils(cookies=site_cookie,
                                     ua=ua,
-                                    proxies=settings.PROXY if proxy else None
+                                    proxies=settings.PROXY if proxy else None,
+                                    session=self.get_session('https://www.open.cd/plugin_sign-in.php?cmd=signin')
                                     ).post_res(url='https://www.open.cd/plugin_sign-in.php?cmd=signin', data=data)
             if sign_res and sign_res.status_code == 200:
                 logger.debug(f"sign_res返回 {sign_res.text}")
@@ -102,7 +102,8 @@ class Tjupt(_ISiteSigninHandler):
         # 获取签到图片hash
         captcha_img_res = RequestUtils(cookies=site_cookie,
                                        ua=ua,
-                                       proxies=settings.PROXY if proxy else None
+                                       proxies=settings.PROXY if proxy else None,
+                                       session=self.get_session(img_url)
                                        ).get_res(url=img_url)
         if not captcha_img_res or captcha_img_res.status_code != 200:
             logger.error(f"{site} 签到图片 {img_url} 请求失败")
@@ -206,7 +207,8 @@ class Tjupt(_ISiteSigninHandler):
         logger.debug(f"提交data {data}")
         sign_in_res = RequestUtils(cookies=site_cookie,
                                    ua=ua,
-                                   proxies=settings.PROXY if proxy else None
+                                   proxies=settings.PROXY if proxy else None,
+                                   session=self.get_session(self._sign_in_url)
                                    ).post_res(url=self._sign_in_url, data=data)
         if not sign_in_res or sign_in_res.status_code != 200:
             logger.error(f"{site} 签到失败，签到接口请求失败")
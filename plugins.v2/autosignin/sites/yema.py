@@ -14,6 +14,8 @@ class YemaPT(_ISiteSigninHandler):
     """
     # 匹配的站点Url，每一个实现类都需要设置为自己的站点Url
     site_url = "yemapt.org"
+    # 按自定义规则匹配站点Url
+    custom_match = True
 
     @classmethod
     def match(cls, url: str) -> bool:
@@ -76,7 +76,8 @@ class ZhuQue(_ISiteSigninHandler):
             skill_res = RequestUtils(cookies=site_cookie,
                                      headers=headers,
                                      proxies=settings.PROXY if proxy else None,
-                                     timeout=timeout
+                                     timeout=timeout,
+                                     session=self.get_session("https://zhuque.in/api/gaming/fireGenshinCharacterMagic")
                                      ).post_res(url="https://zhuque.in/api/gaming/fireGenshinCharacterMagic", json=data)
             if not skill_res or skill_res.status_code != 200:
                 logger.error(f"模拟登录失败，释放技能失败")
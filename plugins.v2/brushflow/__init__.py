@@ -1,11 +1,14 @@
 import base64
+import heapq
 import json
 import random
 import re
 import threading
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, Future, TimeoutError as FutureTimeoutError
 from datetime import datetime, timedelta
-from typing import Any, List, Dict, Tuple, Optional, Union, Set
+from typing import Any, List, Dict, Tuple, Optional, Union, Set, Callable
 from urllib.parse import urlparse, parse_qs, unquote, parse_qsl, urlencode, urlunparse
 
 import pytz
@@ -25,6 +28,7 @@ from app.log import logger
 from app.modules.qbittorrent import Qbittorrent
 from app.modules.transmission import Transmission
 from app.plugins import _PluginBase
+from app.plugins.brushflow.taskstore import BrushTaskStore
 from app.schemas import NotificationType, TorrentInfo, MediaType, ServiceInfo
 from app.schemas.types import EventType
 from app.utils.http import RequestUtils
@@ -73,12 +77,19 @@ class BrushConfig:
         self.except_subscribe = config.get("except_subscribe", True)
         self.brush_sequential = config.get("brush_sequential", False)
         self.proxy_delete = config.get("proxy_delete", False)
+        self.proxy_delete_score = config.get("proxy_delete_score", "seeding_time")
+        self.proxy_delete_dryrun = config.get("proxy_delete_dryrun", False)
         self.del_no_free = config.get("del_no_free", False) if self.freeleech in ["free", "2xfree"] else False
         self.active_time_range = config.get("active_time_range")
         self.cron = config.get("cron")
         self.qb_category = config.get("qb_category")
         self.site_hr_active = config.get("site_hr_active", False)
         self.site_skip_tips = config.get("site_skip_tips", False)
+        self.bandwidth_window = self.__parse_number(config.get("bandwidth_window"))
+        self.bandwidth_ewma = config.get("bandwidth_ewma", False)
+        self.brush_prefetch = config.get("brush_prefetch", False)
+        # 预编译的种子过滤计划
+        self.filter_plan = BrushFilterPlan(brush_config=self)
 
         self.brush_tag = "刷流"
         # 站点独立配置
@@ -140,7 +151,7 @@ class BrushConfig:
                 site_specific_config = {key: config[key] for key in allowed_fields & set(config.keys())}
 
                 full_config = {key: getattr(self, key) for key in vars(self) if
-                               key not in ["group_site_configs", "site_config"]}
+                               key not in ["group_site_configs", "site_config", "filter_plan"]}
                 full_config.update(site_specific_config)
 
                 self.group_site_configs[sitename] = BrushConfig(config=full_config, process_site_config=False)
@@ -240,7 +251,7 @@ class BrushConfig:
             return str(v)
 
     def __str__(self):
-        attrs = vars(self)
+        attrs = {k: v for k, v in vars(self).items() if k != "filter_plan"}
         # Note the use of self.format_value(v) here to call the instance method
         attrs_str = ', '.join(f'"{k}": {self.__format_value(v)}' for k, v in attrs.items())
         return f'{{ {attrs_str} }}'
@@ -249,6 +260,409 @@ class BrushConfig:
         return self.__str__()
 
 
+class BrushFilterPlan:
+    """
+    刷流种子过滤计划，配置初始化时预编译正则和数值范围，按站点种子批量过滤
+    """
+
+    def __init__(self, brush_config: Any):
+        self.freeleech = brush_config.freeleech
+        self.hr = brush_config.hr
+        self.include, self.include_error = self.__compile(brush_config.include, "包含规则")
+        self.exclude, self.exclude_error = self.__compile(brush_config.exclude, "排除规则")
+        # 种子大小（字节）
+        self.size_range = self.__parse_range(brush_config.size, 1024 ** 3)
+        self.seeder_range = self.__parse_range(brush_config.seeder)
+        self.pubtime_range = self.__parse_range(brush_config.pubtime)
+        # 时区偏移（分钟）
+        self.timezone_offset = brush_config.timezone_offset or 0
+
+    def evaluate(self, torrents: List[TorrentInfo]) -> List[Optional[str]]:
+        """
+        批量过滤站点种子，按顺序返回每个种子不符合条件的原因，符合条件时为None
+        """
+        now = datetime.now()
+        return [self.evaluate_torrent(torrent=torrent, now=now) for torrent in torrents]
+
+    def evaluate_torrent(self, torrent: TorrentInfo, now: datetime = None) -> Optional[str]:
+        """
+        过滤单个种子，返回不符合条件的原因，符合条件时为None
+        """
+        # 促销条件
+        if self.freeleech and torrent.downloadvolumefactor != 0:
+            return "非免费种子"
+        if self.freeleech == "2xfree" and torrent.uploadvolumefactor != 2:
+            return "非双倍上传种子"
+
+        # H&R
+        if self.hr == "yes" and torrent.hit_and_run:
+            return "存在H&R"
+
+        title = torrent.title or ""
+        description = torrent.description or ""
+
+        # 包含规则
+        if self.include_error:
+            return self.include_error
+        if self.include and not (self.include.search(title) or self.include.search(description)):
+            return "不符合包含规则"
+
+        # 排除规则
+        if self.exclude_error:
+            return self.exclude_error
+        if self.exclude and (self.exclude.search(title) or self.exclude.search(description)):
+            return "符合排除规则"
+
+        # 种子大小（GB）
+        if self.size_range:
+            size_gb = (torrent.size or 0) / 1024 ** 3
+            if len(self.size_range) == 1 and torrent.size < self.size_range[0]:
+                return f"种子大小 {size_gb:.1f} GB，不符合条件"
+            elif len(self.size_range) > 1 and not self.size_range[0] <= torrent.size <= self.size_range[1]:
+                return f"种子大小 {size_gb:.1f} GB，不在指定范围内"
+
+        # 做种人数
+        if self.seeder_range:
+            # 检查是否仅指定了一个数字，即做种人数需要小于等于该数字
+            if len(self.seeder_range) == 1:
+                if torrent.seeders > self.seeder_range[0]:
+                    return f"做种人数 {torrent.seeders}，超过单个指定值"
+            # 检查做种人数是否在指定的范围内（包括边界）
+            elif not (self.seeder_range[0] <= torrent.seeders <= self.seeder_range[1]):
+                return f"做种人数 {torrent.seeders}，不在指定范围内"
+
+        # 发布时间：用户时间 - 站点时间 - 时区偏移
+        # e.g.1: 用户UTC+8，站点UTC，timezone_offset应为+8，种子在UTC 0:00/UTC+8 8:00发布；
+        #        9:17 - 0:00 - 8:00 = 1:17；1小时17分为正确的发布时间与当前的时间差
+        # e.g.2: 用户UTC，站点UTC+8，timezone_offset应为-8，种子在UTC 0:00/UTC+8 8:00发布：
+        #        1:17 - 8:00 - (-8:00) = 1:17；1小时17分为正确的发布时间与当前的时间差
+        # timezone_offset为后加功能，默认为0，方便后续更多与时间相关的功能开发，之前在单独站点配置中使用pubtime计算过时区偏移的用户也不受影响
+        if self.pubtime_range:
+            pubdate_minutes = self.get_pubminutes(torrent.pubdate, now=now) - self.timezone_offset
+            if len(self.pubtime_range) == 1:
+                # 单个值：选择发布时间小于等于该值的种子
+                if pubdate_minutes > self.pubtime_range[0]:
+                    return f"发布时间（站点时区）{torrent.pubdate}，当前配置时区偏移 {self.timezone_offset} 小时，{pubdate_minutes:.0f} 分钟前，不符合条件"
+            # 范围值：选择发布时间在范围内的种子
+            elif not (self.pubtime_range[0] <= pubdate_minutes <= self.pubtime_range[1]):
+                return f"发布时间（站点时区）{torrent.pubdate}，当前配置时区偏移 {self.timezone_offset} 小时，{pubdate_minutes:.0f} 分钟前，不在指定范围内"
+
+        return None
+
+    @staticmethod
+    def get_pubminutes(pubdate: str, now: datetime = None) -> float:
+        """
+        将字符串转换为时间，并计算与当前时间差（分钟）
+        """
+        try:
+            if not pubdate:
+                return 0
+            pubdate = pubdate.replace("T", " ").replace("Z", "")
+            try:
+                pubtime = datetime.fromisoformat(pubdate)
+            except ValueError:
+                pubtime = datetime.strptime(pubdate, "%Y-%m-%d %H:%M:%S")
+            return ((now or datetime.now()) - pubtime).total_seconds() // 60
+        except Exception as e:
+            logger.error(f"发布时间 {pubdate} 获取分钟失败，错误详情: {e}")
+            return 0
+
+    @staticmethod
+    def __compile(pattern: Optional[str], desc: str) -> Tuple[Optional[re.Pattern], Optional[str]]:
+        """
+        预编译正则，编译失败时返回错误原因
+        """
+        if not pattern:
+            return None, None
+        try:
+            return re.compile(pattern, re.I), None
+        except re.error as e:
+            logger.error(f"刷流{desc}设置错误：{pattern}，错误详情: {e}")
+            return None, f"{desc}无效"
+
+    @staticmethod
+    def __parse_range(value: Any, unit: float = 1) -> Optional[List[float]]:
+        """
+        解析数字或数字范围，如 5 或 5-10
+        """
+        if not value:
+            return None
+        try:
+            return [float(n) * unit for n in str(value).split("-")]
+        except ValueError:
+            return None
+
+
+class BrushTaskIndex:
+    """
+    刷流任务重复校验索引，每次刷流时构建一次，新增任务时同步更新
+    """
+
+    def __init__(self, torrent_tasks: Dict[str, dict] = None):
+        # (站点名称, 标题)
+        self.site_titles: Set[Tuple[str, str]] = set()
+        # (站点名称, 详情地址)
+        self.site_page_urls: Set[Tuple[str, str]] = set()
+        # 标题 -> 尚未完成下载的站点名称集合
+        self.unfinished_title_sites: Dict[str, Set[str]] = {}
+        for task in (torrent_tasks or {}).values():
+            self.add(task)
+
+    def add(self, task: dict):
+        """
+        将刷流任务加入索引
+        """
+        site_name = f"{task.get('site_name')}"
+        title = f"{task.get('title')}"
+        self.site_titles.add((site_name, title))
+        self.site_page_urls.add((site_name, f"{task.get('page_url')}"))
+        if not task.get("seed_time"):
+            self.unfinished_title_sites.setdefault(title, set()).add(site_name)
+
+    def contains_title(self, site_name: str, title: str) -> bool:
+        """
+        判断站点中是否已存在相同标题的任务
+        """
+        return (f"{site_name}", f"{title}") in self.site_titles
+
+    def contains_page_url(self, site_name: str, page_url: str) -> bool:
+        """
+        判断站点中是否已存在相同详情地址的任务
+        """
+        return (f"{site_name}", f"{page_url}") in self.site_page_urls
+
+    def exists_unfinished_in_other_sites(self, site_name: str, title: str) -> bool:
+        """
+        判断其他站点是否存在尚未下载完成的相同标题任务
+        """
+        sites = self.unfinished_title_sites.get(f"{title}")
+        if not sites:
+            return False
+        return len(sites) > 1 or site_name not in sites
+
+
+class BrushDeletePlanner:
+    """
+    动态删除计划，按评分通过优先队列选取需要删除的种子，并记录删除计划用于预演及页面展示；
+    预演仅作用于动态阈值阶段，前置条件及删除规则命中的种子仍会实际删除
+    """
+
+    # 动态阈值阶段
+    THRESHOLD_STAGE = "动态阈值"
+
+    # 评分方式 -> (说明, 评分函数)，评分越高越优先删除
+    SCORES: Dict[str, Tuple[str, Callable[[dict], float]]] = {
+        "seeding_time": ("做种时间最长优先", lambda info: info.get("seeding_time") or 0),
+        "ratio": ("分享率最高优先", lambda info: info.get("ratio") or 0),
+        "avg_upspeed": ("平均上传速度最低优先", lambda info: -(info.get("avg_upspeed") or 0)),
+    }
+
+    def __init__(self, total_size: float, min_size: float = 0, max_size: float = 0,
+                 score: str = None, dry_run: bool = False):
+        self.score = score if score in self.SCORES else "seeding_time"
+        self.dry_run = dry_run
+        # 删除前的做种体积
+        self.origin_size = total_size
+        # 按计划删除后的剩余做种体积
+        self.total_size = total_size
+        self.min_size = min_size
+        self.max_size = max_size
+        # 计划删除的种子，按加入顺序排列
+        self.items: List[dict] = []
+        self.hashes: Set[str] = set()
+
+    def add(self, torrent_hash: str, torrent_task: dict, torrent_info: dict, stage: str, reason: str):
+        """
+        将种子加入删除计划，并扣减剩余做种体积
+        """
+        if torrent_hash in self.hashes:
+            return
+        size = torrent_info.get("total_size") or 0
+        self.hashes.add(torrent_hash)
+        self.total_size -= size
+        self.items.append({
+            "hash": torrent_hash,
+            "site_name": torrent_task.get("site_name"),
+            "title": torrent_task.get("title"),
+            "size": size,
+            "seeding_time": torrent_info.get("seeding_time") or 0,
+            "ratio": torrent_info.get("ratio") or 0,
+            "avg_upspeed": torrent_info.get("avg_upspeed") or 0,
+            "hit_and_run": bool(torrent_task.get("hit_and_run")),
+            "stage": stage,
+            "reason": reason,
+            "dry_run": self.dry_run and stage == self.THRESHOLD_STAGE
+        })
+
+    def select(self, candidates: Dict[str, dict]):
+        """
+        按评分从高到低依次选取种子，直至剩余做种体积降至下限，调用方需将选中的种子通过add加入计划
+        """
+        score_func = self.SCORES[self.score][1]
+        heap = [(-score_func(info), torrent_hash) for torrent_hash, info in candidates.items()
+                if torrent_hash not in self.hashes]
+        heapq.heapify(heap)
+        while heap and self.total_size > self.min_size:
+            _, torrent_hash = heapq.heappop(heap)
+            yield torrent_hash
+
+    def get_hashes(self) -> List[str]:
+        """
+        获取需要实际删除的种子哈希列表，不包括预演的种子
+        """
+        return [item.get("hash") for item in self.items if not item.get("dry_run")]
+
+    def to_dict(self) -> dict:
+        """
+        转换为可保存的删除计划
+        """
+        return {
+            "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "dry_run": self.dry_run,
+            "score": self.SCORES[self.score][0],
+            "origin_size": self.origin_size,
+            "total_size": self.total_size,
+            "min_size": self.min_size,
+            "max_size": self.max_size,
+            "items": self.items
+        }
+
+
+class BandwidthSampler:
+    """
+    下载器带宽后台采样器，按固定间隔采样上传/下载速度并保存在环形缓冲区中
+    """
+
+    def __init__(self, downloader: str, sample_func: Callable[[], Optional[Tuple[float, float]]],
+                 window: float = 15, interval: float = 3.0, ewma: bool = False):
+        """
+        :param downloader: 下载器名称
+        :param sample_func: 采样函数，返回 (上传速度, 下载速度)，采样失败时返回None
+        :param window: 滑动窗口时长，单位秒
+        :param interval: 采样间隔，单位秒
+        :param ewma: 是否使用指数加权移动平均
+        """
+        self.downloader = downloader
+        self.interval = interval
+        self.ewma = ewma
+        self._sample_func = sample_func
+        self._samples = deque(maxlen=max(1, int(window // interval)))
+        self._samples_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """
+        启动后台采样线程
+        """
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self.__run, name=f"BandwidthSampler-{self.downloader}", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        停止后台采样线程
+        """
+        self._stop_event.set()
+        if self._thread and self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join(timeout=self.interval + 1)
+        self._thread = None
+        with self._samples_lock:
+            self._samples.clear()
+
+    def sample(self) -> bool:
+        """
+        立即采样一次并写入缓冲区
+        """
+        try:
+            result = self._sample_func()
+        except Exception as e:
+            logger.debug(f"下载器 {self.downloader} 带宽采样失败：{e}")
+            return False
+        if not result:
+            return False
+        upload_speed, download_speed = result
+        with self._samples_lock:
+            self._samples.append((upload_speed or 0, download_speed or 0))
+        return True
+
+    def get_average(self) -> Tuple[Optional[float], Optional[float]]:
+        """
+        获取当前窗口内的平均上传/下载带宽，没有任何采样时返回 (None, None)
+        """
+        with self._samples_lock:
+            samples = list(self._samples)
+        if not samples:
+            return None, None
+        if not self.ewma:
+            return (sum(upload for upload, _ in samples) / len(samples),
+                    sum(download for _, download in samples) / len(samples))
+        alpha = 2 / (self._samples.maxlen + 1)
+        avg_upload, avg_download = samples[0]
+        for upload, download in samples[1:]:
+            avg_upload = alpha * upload + (1 - alpha) * avg_upload
+            avg_download = alpha * download + (1 - alpha) * avg_download
+        return avg_upload, avg_download
+
+    @property
+    def sample_count(self) -> int:
+        """
+        当前缓冲区中的采样数量
+        """
+        with self._samples_lock:
+            return len(self._samples)
+
+    def __run(self):
+        while not self._stop_event.is_set():
+            self.sample()
+            self._stop_event.wait(self.interval)
+
+
+class DownloadingCountCache:
+    """
+    正在下载的任务数缓存，刷流周期开始时同步一次，新增任务时本地累加，超过有效期后重新同步
+    """
+
+    def __init__(self, fetch_func: Callable[[], Optional[int]], ttl: float = 60):
+        """
+        :param fetch_func: 从下载器获取正在下载任务数的函数，获取失败时返回None
+        :param ttl: 缓存有效期，单位秒
+        """
+        self.ttl = ttl
+        self._fetch_func = fetch_func
+        self._count: Optional[int] = None
+        self._sync_time = 0.0
+
+    def get(self) -> int:
+        """
+        获取正在下载的任务数，缓存过期时重新同步
+        """
+        if self._count is None or time.time() - self._sync_time > self.ttl:
+            self.sync()
+        return self._count or 0
+
+    def sync(self):
+        """
+        从下载器同步正在下载的任务数
+        """
+        count = self._fetch_func()
+        self._sync_time = time.time()
+        # 同步失败时保留本地计数，避免异常时放开下载任务数限制
+        if count is not None:
+            self._count = count
+        elif self._count is None:
+            self._count = 0
+
+    def increase(self, count: int = 1):
+        """
+        新增下载任务后本地累加
+        """
+        if self._count is not None:
+            self._count += count
+
+
 class BrushFlow(_PluginBase):
     # region 全局定义
 
@@ -259,7 +673,7 @@ class BrushFlow(_PluginBase):
     # 插件图标
     plugin_icon = "brush.jpg"
     # 插件版本
-    plugin_version = "4.3.3"
+    plugin_version = "4.4.2"
     # 插件作者
     plugin_author = "jxxghp,InfinityPacer"
     # 作者主页
@@ -284,6 +698,23 @@ class BrushFlow(_PluginBase):
     # 退出事件
     _event = threading.Event()
     _scheduler = None
+    # 带宽采样器
+    _bandwidth_sampler: Optional[BandwidthSampler] = None
+    # 刷流任务存储
+    _task_store: Optional[BrushTaskStore] = None
+    _task_store_lock = threading.Lock()
+    # 统计数据校准间隔（秒）
+    _statistic_reconcile_interval = 6 * 3600
+    # 上次统计数据校准时间
+    _statistic_reconcile_time = 0
+    # 正在下载任务数缓存，仅在刷流周期内有效
+    _downloading_count_cache: Optional[DownloadingCountCache] = None
+    # 正在下载任务数缓存有效期（秒）
+    _downloading_count_ttl = 60
+    # 并发获取站点种子的最大线程数
+    _prefetch_workers = 5
+    # 并发获取单个站点种子的超时时间（秒）
+    _prefetch_timeout = 120
     # tabs
     _tabs = None
 
@@ -350,6 +781,16 @@ class BrushFlow(_PluginBase):
         if not self.service_info:
             return
 
+        # 配置了总上传/下载带宽时，启动后台带宽采样
+        if brush_config.enabled and (brush_config.maxupspeed or brush_config.maxdlspeed):
+            self._bandwidth_sampler = BandwidthSampler(downloader=brush_config.downloader,
+                                                       sample_func=self.__sample_downloader_bandwidth,
+                                                       window=brush_config.bandwidth_window or 15,
+                                                       ewma=brush_config.bandwidth_ewma)
+            self._bandwidth_sampler.start()
+            logger.info(f"下载器 {brush_config.downloader} 带宽采样服务启动，"
+                        f"采样窗口 {brush_config.bandwidth_window or 15} 秒")
+
         # 检查是否启用了一次性任务
         if brush_config.onlyonce:
             self._scheduler = BackgroundScheduler(timezone=settings.TZ)
@@ -1192,6 +1633,30 @@ class BrushFlow(_PluginBase):
                                                 ]
                                             }
                                         ]
+                                    },
+                                    {
+                                        'component': 'VRow',
+                                        'content': [
+                                            {
+                                                'component': 'VCol',
+                                                'props': {
+                                                    'cols': 12,
+                                                    'md': 4
+                                                },
+                                                'content': [
+                                                    {
+                                                        'component': 'VTextField',
+                                                        'props': {
+                                                            'model': 'bandwidth_window',
+                                                            'label': '带宽采样窗口（秒）',
+                                                            'placeholder': '总带宽取此时长内的平均值，默认15',
+                                                            'type': 'number',
+                                                            "min": "3"
+                                                        }
+                                                    }
+                                                ]
+                                            }
+                                        ]
                                     }
                                 ]
                             },
@@ -1638,6 +2103,79 @@ class BrushFlow(_PluginBase):
                                                         }
                                                     }
                                                 ]
+                                            },
+                                            {
+                                                'component': 'VCol',
+                                                'props': {
+                                                    'cols': 12,
+                                                    'md': 4
+                                                },
+                                                'content': [
+                                                    {
+                                                        'component': 'VSwitch',
+                                                        'props': {
+                                                            'model': 'bandwidth_ewma',
+                                                            'label': '带宽指数加权平均',
+                                                        }
+                                                    }
+                                                ]
+                                            },
+                                            {
+                                                'component': 'VCol',
+                                                'props': {
+                                                    'cols': 12,
+                                                    'md': 4
+                                                },
+                                                'content': [
+                                                    {
+                                                        'component': 'VSwitch',
+                                                        'props': {
+                                                            'model': 'brush_prefetch',
+                                                            'label': '并发获取站点种子',
+                                                        }
+                                                    }
+                                                ]
+                                            }
+                                        ]
+                                    },
+                                    {
+                                        'component': 'VRow',
+                                        'content': [
+                                            {
+                                                'component': 'VCol',
+                                                'props': {
+                                                    'cols': 12,
+                                                    'md': 4
+                                                },
+                                                'content': [
+                                                    {
+                                                        'component': 'VSelect',
+                                                        'props': {
+                                                            'model': 'proxy_delete_score',
+                                                            'label': '动态删除顺序',
+                                                            'items': [
+                                                                {'title': title, 'value': key}
+                                                                for key, (title, _) in BrushDeletePlanner.SCORES.items()
+                                                            ]
+                                                        }
+                                                    }
+                                                ]
+                                            },
+                                            {
+                                                'component': 'VCol',
+                                                'props': {
+                                                    'cols': 12,
+                                                    'md': 4
+                                                },
+                                                'content': [
+                                                    {
+                                                        'component': 'VSwitch',
+                                                        'props': {
+                                                            'model': 'proxy_delete_dryrun',
+                                                            'label': '动态阈值删除预演（仅生成计划）',
+                                                        }
+                                                    }
+                                                ]
                                             }
                                         ]
                                     }
@@ -1813,7 +2351,11 @@ class BrushFlow(_PluginBase):
             "except_subscribe": True,
             "brush_sequential": False,
             "proxy_delete": False,
+            "proxy_delete_score": "seeding_time",
+            "proxy_delete_dryrun": False,
             "del_no_free": False,
+            "bandwidth_ewma": False,
+            "brush_prefetch": False,
             "freeleech": "free",
             "hr": "yes",
             "enable_site_config": False,
@@ -1822,7 +2364,7 @@ class BrushFlow(_PluginBase):
 
     def get_page(self) -> List[dict]:
         # 种子明细
-        torrents = self.get_data("torrents") or {}
+        torrents = self.__get_tasks(BrushTaskStore.KIND_TORRENTS)
 
         if not torrents:
             return [
@@ -1862,6 +2404,11 @@ class BrushFlow(_PluginBase):
             } for data in data_list
         ]
 
+        # 各站点统计
+        site_statistic_elements = self.__get_site_statistic_elements()
+        # 最近一次动态删除计划
+        delete_plan_elements = self.__get_delete_plan_elements()
+
         # 拼装页面
         return [
             {
@@ -1902,6 +2449,149 @@ class BrushFlow(_PluginBase):
                             }
                         ]
                     }
+                ] + site_statistic_elements + delete_plan_elements
+            }
+        ]
+
+    def __get_site_statistic_elements(self) -> List[dict]:
+        """
+        组装各站点统计汇总的页面元素，包括刷流中和已归档的任务
+        """
+        site_statistics = self.__get_task_store().get_site_statistics()
+        if not site_statistics:
+            return []
+
+        headers = [
+            {'title': '站点', 'key': 'site', 'sortable': True},
+            {'title': '种子数', 'key': 'count', 'sortable': True},
+            {'title': '删除数', 'key': 'deleted', 'sortable': True},
+            {'title': '上传量', 'key': 'uploaded', 'sortable': True},
+            {'title': '下载量', 'key': 'downloaded', 'sortable': True},
+            {'title': '分享率', 'key': 'ratio', 'sortable': True},
+            {'title': '做种体积', 'key': 'seeding_size', 'sortable': True},
+        ]
+        items = [
+            {
+                'site': site_name or "N/A",
+                'count': int(stat.get("count") or 0),
+                'deleted': int(stat.get("deleted") or 0),
+                'uploaded': StringUtils.str_filesize(stat.get("uploaded") or 0),
+                'downloaded': StringUtils.str_filesize(stat.get("downloaded") or 0),
+                'ratio': round((stat.get("uploaded") or 0) / stat.get("downloaded"), 2)
+                if stat.get("downloaded") else 0,
+                'seeding_size': StringUtils.str_filesize(stat.get("seeding_size") or 0)
+            } for site_name, stat in sorted(site_statistics.items(),
+                                            key=lambda x: x[1].get("uploaded") or 0, reverse=True)
+        ]
+        return [
+            {
+                'component': 'VRow',
+                'props': {
+                    'class': 'd-none d-sm-block',
+                },
+                'content': [
+                    {
+                        'component': 'VCol',
+                        'props': {
+                            'cols': 12,
+                        },
+                        'content': [
+                            {
+                                'component': 'VCard',
+                                'props': {
+                                    'variant': 'tonal',
+                                    'title': '站点统计'
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VDataTableVirtual',
+                                        'props': {
+                                            'class': 'text-sm',
+                                            'headers': headers,
+                                            'items': items,
+                                            'height': '20rem',
+                                            'density': 'compact',
+                                            'fixed-header': True,
+                                            'hide-no-data': True,
+                                            'hover': True
+                                        }
+                                    }
+                                ]
+                            }
+                        ]
+                    }
+                ]
+            }
+        ]
+
+    def __get_delete_plan_elements(self) -> List[dict]:
+        """
+        组装最近一次动态删除计划的页面元素
+        """
+        delete_plan = self.get_data("delete_plan")
+        if not delete_plan:
+            return []
+
+        headers = [
+            {'title': '站点', 'key': 'site', 'sortable': True},
+            {'title': '标题', 'key': 'title', 'sortable': True},
+            {'title': '大小', 'key': 'size', 'sortable': True},
+            {'title': '做种时间', 'key': 'seeding_time', 'sortable': True},
+            {'title': '分享率', 'key': 'ratio', 'sortable': True},
+            {'title': '阶段', 'key': 'stage', 'sortable': True},
+            {'title': '原因', 'key': 'reason', 'sortable': False},
+        ]
+        items = [
+            {
+                'site': item.get("site_name"),
+                'title': item.get("title"),
+                'size': StringUtils.str_filesize(item.get("size") or 0),
+                'seeding_time': f"{(item.get('seeding_time') or 0) / 3600:.1f} 小时",
+                'ratio': round(item.get("ratio") or 0, 2),
+                'stage': f"{item.get('stage')}（预演）" if item.get("dry_run") else item.get("stage"),
+                'reason': item.get("reason")
+            } for item in delete_plan.get("items") or []
+        ]
+        title = (f"动态删除计划（{'预演' if delete_plan.get('dry_run') else '已执行'}，{delete_plan.get('time')}，"
+                 f"{delete_plan.get('score')}，做种体积 {self.__bytes_to_gb(delete_plan.get('origin_size') or 0):.1f} GB"
+                 f" -> {self.__bytes_to_gb(delete_plan.get('total_size') or 0):.1f} GB）")
+        return [
+            {
+                'component': 'VRow',
+                'props': {
+                    'class': 'd-none d-sm-block',
+                },
+                'content': [
+                    {
+                        'component': 'VCol',
+                        'props': {
+                            'cols': 12,
+                        },
+                        'content': [
+                            {
+                                'component': 'VCard',
+                                'props': {
+                                    'variant': 'tonal',
+                                    'title': title
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VDataTableVirtual',
+                                        'props': {
+                                            'class': 'text-sm',
+                                            'headers': headers,
+                                            'items': items,
+                                            'height': '20rem',
+                                            'density': 'compact',
+                                            'fixed-header': True,
+                                            'hide-no-data': True,
+                                            'hover': True
+                                        }
+                                    }
+                                ]
+                            }
+                        ]
+                    }
                 ]
             }
         ]
@@ -1911,6 +2601,9 @@ class BrushFlow(_PluginBase):
         退出插件
         """
         try:
+            if self._bandwidth_sampler:
+                self._bandwidth_sampler.stop()
+                self._bandwidth_sampler = None
             if self._scheduler:
                 self._scheduler.remove_all_jobs()
                 if self._scheduler.running:
@@ -1938,71 +2631,109 @@ class BrushFlow(_PluginBase):
 
         with lock:
             logger.info(f"开始执行刷流任务 ...")
+            # 本轮刷流周期内复用下载任务数，新增任务时本地累加
+            self._downloading_count_cache = DownloadingCountCache(fetch_func=self.__fetch_downloading_count,
+                                                                  ttl=self._downloading_count_ttl)
+            try:
+                self.__brush_all_sites()
+            finally:
+                self._downloading_count_cache = None
+
+    def __brush_all_sites(self):
+        """
+        针对所有站点进行刷流
+        """
+        brush_config = self.__get_brush_config()
 
-            torrent_tasks: Dict[str, dict] = self.get_data("torrents") or {}
-            torrents_size = self.__calculate_seeding_torrents_size(torrent_tasks=torrent_tasks)
+        torrent_tasks: Dict[str, dict] = self.__get_tasks(BrushTaskStore.KIND_TORRENTS)
+        torrents_size = self.__get_seeding_torrents_size()
 
-            # 判断能否通过保种体积前置条件
-            size_condition_passed, reason = self.__evaluate_size_condition_for_brush(torrents_size=torrents_size)
-            self.__log_brush_conditions(passed=size_condition_passed, reason=reason)
-            if not size_condition_passed:
-                logger.info(f"刷流任务执行完成")
-                return
+        # 判断能否通过保种体积前置条件
+        size_condition_passed, reason = self.__evaluate_size_condition_for_brush(torrents_size=torrents_size)
+        self.__log_brush_conditions(passed=size_condition_passed, reason=reason)
+        if not size_condition_passed:
+            logger.info(f"刷流任务执行完成")
+            return
 
-            # 判断能否通过刷流前置条件
-            pre_condition_passed, reason = self.__evaluate_pre_conditions_for_brush()
-            self.__log_brush_conditions(passed=pre_condition_passed, reason=reason)
-            if not pre_condition_passed:
-                logger.info(f"刷流任务执行完成")
-                return
+        # 判断能否通过刷流前置条件
+        pre_condition_passed, reason = self.__evaluate_pre_conditions_for_brush()
+        self.__log_brush_conditions(passed=pre_condition_passed, reason=reason)
+        if not pre_condition_passed:
+            logger.info(f"刷流任务执行完成")
+            return
 
-            statistic_info = self.__get_statistic_info()
+        # 获取所有站点的信息，并过滤掉不存在的站点
+        site_infos = []
+        for siteid in brush_config.brushsites:
+            siteinfo = SiteOper().get(siteid)
+            if siteinfo:
+                site_infos.append(siteinfo)
 
-            # 获取所有站点的信息，并过滤掉不存在的站点
-            site_infos = []
-            for siteid in brush_config.brushsites:
-                siteinfo = SiteOper().get(siteid)
-                if siteinfo:
-                    site_infos.append(siteinfo)
+        # 根据是否开启顺序刷流来决定是否需要打乱顺序
+        if not brush_config.brush_sequential:
+            random.shuffle(site_infos)
 
-            # 根据是否开启顺序刷流来决定是否需要打乱顺序
-            if not brush_config.brush_sequential:
-                random.shuffle(site_infos)
+        logger.info(f"即将针对站点 {', '.join(site.name for site in site_infos)} 开始刷流")
 
-            logger.info(f"即将针对站点 {', '.join(site.name for site in site_infos)} 开始刷流")
+        # 获取订阅标题
+        subscribe_titles = self.__get_subscribe_titles()
 
-            # 获取订阅标题
-            subscribe_titles = self.__get_subscribe_titles()
+        # 构建刷流任务索引，用于重复种子校验
+        task_index = BrushTaskIndex(torrent_tasks=torrent_tasks)
 
+        # 开启并发获取时，提前并发获取所有站点的种子，再按站点顺序依次评估和下载
+        executor = None
+        prefetch_futures: Dict[int, Future] = {}
+        if brush_config.brush_prefetch and len(site_infos) > 1:
+            executor = ThreadPoolExecutor(max_workers=min(len(site_infos), self._prefetch_workers),
+                                          thread_name_prefix="BrushFlow-Prefetch")
+            prefetch_futures = {site.id: executor.submit(self.__browse_site_torrents, site)
+                                for site in site_infos}
+            logger.info(f"已开启并发获取站点种子，并发数 {min(len(site_infos), self._prefetch_workers)}")
+
+        try:
             # 处理所有站点
-            for site in site_infos:
+            for index, site in enumerate(site_infos):
+                # 从第二个站点开始，先判断是否还能通过保种体积和刷流前置条件，避免无效等待
+                if index > 0 and not self.__evaluate_conditions_between_sites():
+                    logger.info(f"未通过刷流前置条件，站点 {site.name} 及后续站点停止刷流")
+                    break
+
+                prefetch_torrents = None
+                if site.id in prefetch_futures:
+                    prefetch_torrents = self.__get_prefetch_torrents(site=site,
+                                                                     future=prefetch_futures.get(site.id))
+
                 # 如果站点刷流没有正确响应，说明没有通过前置条件，其他站点也不需要继续刷流了
                 if not self.__brush_site_torrents(siteid=site.id, torrent_tasks=torrent_tasks,
-                                                  statistic_info=statistic_info,
-                                                  subscribe_titles=subscribe_titles):
+                                                  subscribe_titles=subscribe_titles,
+                                                  task_index=task_index,
+                                                  torrents=prefetch_torrents):
                     logger.info(f"站点 {site.name} 刷流中途结束，停止后续刷流")
                     break
                 else:
                     logger.info(f"站点 {site.name} 刷流完成")
+        finally:
+            if executor:
+                executor.shutdown(wait=False, cancel_futures=True)
 
-            # 保存数据
-            self.save_data("torrents", torrent_tasks)
-            # 保存统计数据
-            self.save_data("statistic", statistic_info)
-            logger.info(f"刷流任务执行完成")
+        # 保存数据
+        self.__save_tasks(BrushTaskStore.KIND_TORRENTS, torrent_tasks)
+        logger.info(f"刷流任务执行完成")
 
-    def __brush_site_torrents(self, siteid, torrent_tasks: Dict[str, dict], statistic_info: Dict[str, int],
-                              subscribe_titles: Set[str]) -> bool:
+    def __brush_site_torrents(self, siteid, torrent_tasks: Dict[str, dict], subscribe_titles: Set[str],
+                              task_index: BrushTaskIndex,
+                              torrents: Optional[List[TorrentInfo]] = None) -> bool:
         """
-        针对站点进行刷流
+        针对站点进行刷流，如已提前获取站点种子，则直接使用传入的种子列表
         """
         siteinfo = SiteOper().get(siteid)
         if not siteinfo:
             logger.warning(f"站点不存在：{siteid}")
             return True
 
-        logger.info(f"开始获取站点 {siteinfo.name} 的新种子 ...")
-        torrents = TorrentsChain().browse(domain=siteinfo.domain)
+        if torrents is None:
+            torrents = self.__browse_site_torrents(siteinfo)
         if not torrents:
             logger.info(f"站点 {siteinfo.name} 没有获取到种子")
             return True
@@ -2019,12 +2750,15 @@ class BrushFlow(_PluginBase):
         # 按发布日期降序排列
         torrents.sort(key=lambda x: x.pubdate or '', reverse=True)
 
-        torrents_size = self.__calculate_seeding_torrents_size(torrent_tasks=torrent_tasks)
+        torrents_size = self.__get_seeding_torrents_size()
 
         logger.info(f"正在准备种子刷流，数量 {len(torrents)}")
 
+        # 按预编译的过滤计划批量过滤站点种子
+        filter_reasons = brush_config.filter_plan.evaluate(torrents)
+
         # 过滤种子
-        for torrent in torrents:
+        for torrent, filter_reason in zip(torrents, filter_reasons):
             # 判断能否通过刷流前置条件
             pre_condition_passed, reason = self.__evaluate_pre_conditions_for_brush(include_network_conditions=False)
             self.__log_brush_conditions(passed=pre_condition_passed, reason=reason)
@@ -2042,7 +2776,8 @@ class BrushFlow(_PluginBase):
 
             # 判断能否通过刷流条件
             condition_passed, reason = self.__evaluate_conditions_for_brush(torrent=torrent,
-                                                                            torrent_tasks=torrent_tasks)
+                                                                            task_index=task_index,
+                                                                            filter_reason=filter_reason)
             self.__log_brush_conditions(passed=condition_passed, reason=reason, torrent=torrent)
             if not condition_passed:
                 continue
@@ -2097,15 +2832,54 @@ class BrushFlow(_PluginBase):
                 "downloader": self.service_info.name
             })
             torrent_tasks[hash_string] = torrent_task
+            task_index.add(torrent_task)
+            if self._downloading_count_cache:
+                self._downloading_count_cache.increase()
+            # 立即保存新增任务，统计数据随之增量更新
+            self.__get_task_store().upsert(BrushTaskStore.KIND_TORRENTS, hash_string, torrent_task)
 
             # 统计数据
             torrents_size += torrent.size
-            statistic_info["count"] += 1
             logger.info(f"站点 {siteinfo.name}，新增刷流种子下载：{torrent.title}|{torrent.description}")
             self.__send_add_message(torrent)
 
         return True
 
+    @staticmethod
+    def __browse_site_torrents(siteinfo: Any) -> List[TorrentInfo]:
+        """
+        获取站点的新种子
+        """
+        logger.info(f"开始获取站点 {siteinfo.name} 的新种子 ...")
+        return TorrentsChain().browse(domain=siteinfo.domain) or []
+
+    def __get_prefetch_torrents(self, site: Any, future: Future) -> List[TorrentInfo]:
+        """
+        获取并发预取的站点种子，超时或异常时返回空列表
+        """
+        try:
+            return future.result(timeout=self._prefetch_timeout) or []
+        except FutureTimeoutError:
+            future.cancel()
+            logger.warning(f"站点 {site.name} 获取种子超时（{self._prefetch_timeout} 秒），跳过该站点")
+        except Exception as e:
+            logger.error(f"站点 {site.name} 获取种子失败，错误详情: {e}")
+        return []
+
+    def __evaluate_conditions_between_sites(self) -> bool:
+        """
+        站点之间重新评估保种体积和刷流前置条件
+        """
+        torrents_size = self.__get_seeding_torrents_size()
+        size_condition_passed, reason = self.__evaluate_size_condition_for_brush(torrents_size=torrents_size)
+        self.__log_brush_conditions(passed=size_condition_passed, reason=reason)
+        if not size_condition_passed:
+            return False
+
+        pre_condition_passed, reason = self.__evaluate_pre_conditions_for_brush(include_network_conditions=False)
+        self.__log_brush_conditions(passed=pre_condition_passed, reason=reason)
+        return pre_condition_passed
+
     def __evaluate_size_condition_for_brush(self, torrents_size: float,
                                             add_torrent_size: float = 0.0) -> Tuple[bool, Optional[str]]:
         """
@@ -2115,9 +2889,8 @@ class BrushFlow(_PluginBase):
 
         # 如果没有明确指定增加的种子大小，则检查配置中是否有种子大小下限，如果有，使用这个大小作为增加的种子大小
         preset_condition = False
-        if not add_torrent_size and brush_config.size:
-            size_limits = [float(size) * 1024 ** 3 for size in brush_config.size.split("-")]
-            add_torrent_size = size_limits[0]  # 使用配置的种子大小下限
+        if not add_torrent_size and brush_config.filter_plan.size_range:
+            add_torrent_size = brush_config.filter_plan.size_range[0]  # 使用配置的种子大小下限
             preset_condition = True
 
         total_size = self.__bytes_to_gb(torrents_size + add_torrent_size)  # 预计总做种体积
@@ -2183,94 +2956,29 @@ class BrushFlow(_PluginBase):
 
         return True, None
 
-    def __evaluate_conditions_for_brush(self, torrent, torrent_tasks) -> Tuple[bool, Optional[str]]:
+    def __evaluate_conditions_for_brush(self, torrent, task_index: BrushTaskIndex,
+                                        filter_reason: Optional[str]) -> Tuple[bool, Optional[str]]:
         """
-        过滤不符合条件的种子
+        过滤不符合条件的种子，filter_reason为预编译过滤计划批量过滤的结果
         """
-        brush_config = self.__get_brush_config(torrent.site_name)
-
         # 排除重复种子
         # 默认根据标题和站点名称进行排除
-        task_key = f"{torrent.site_name}{torrent.title}"
-        if any(task_key == f"{task.get('site_name')}{task.get('title')}" for task in torrent_tasks.values()):
+        if task_index.contains_title(site_name=torrent.site_name, title=torrent.title):
             return False, "重复种子"
 
         # 部分站点标题会上新时携带后缀，这里进一步根据种子详情地址进行排除
         if torrent.page_url:
-            task_page_url = f"{torrent.site_name}{torrent.page_url}"
-            if any(task_page_url == f"{task.get('site_name')}{task.get('page_url')}" for task in
-                   torrent_tasks.values()):
+            if task_index.contains_page_url(site_name=torrent.site_name, page_url=torrent.page_url):
                 return False, "重复种子"
 
         # 不同站点如果遇到相同种子，判断前一个种子是否已经在做种，否则排除处理
         if torrent.title:
-            if any(torrent.site_name != f"{task.get('site_name')}" and torrent.title == f"{task.get('title')}"
-                   and not task.get("seed_time") for task in torrent_tasks.values()):
+            if task_index.exists_unfinished_in_other_sites(site_name=torrent.site_name, title=torrent.title):
                 return False, "其他站点存在尚未下载完成的相同种子"
 
-        # 促销条件
-        if brush_config.freeleech and torrent.downloadvolumefactor != 0:
-            return False, "非免费种子"
-        if brush_config.freeleech == "2xfree" and torrent.uploadvolumefactor != 2:
-            return False, "非双倍上传种子"
-
-        # H&R
-        if brush_config.hr == "yes" and torrent.hit_and_run:
-            return False, "存在H&R"
-
-        # 包含规则
-        if brush_config.include and not (
-                re.search(brush_config.include, torrent.title, re.I) or re.search(brush_config.include,
-                                                                                  torrent.description, re.I)):
-            return False, "不符合包含规则"
-
-        # 排除规则
-        if brush_config.exclude and (
-                re.search(brush_config.exclude, torrent.title, re.I) or re.search(brush_config.exclude,
-                                                                                  torrent.description, re.I)):
-            return False, "符合排除规则"
-
-        # 种子大小（GB）
-        if brush_config.size:
-            sizes = [float(size) * 1024 ** 3 for size in brush_config.size.split("-")]
-            if len(sizes) == 1 and torrent.size < sizes[0]:
-                return False, f"种子大小 {self.__bytes_to_gb(torrent.size):.1f} GB，不符合条件"
-            elif len(sizes) > 1 and not sizes[0] <= torrent.size <= sizes[1]:
-                return False, f"种子大小 {self.__bytes_to_gb(torrent.size):.1f} GB，不在指定范围内"
-
-        # 做种人数
-        if brush_config.seeder:
-            seeders_range = [float(n) for n in brush_config.seeder.split("-")]
-            # 检查是否仅指定了一个数字，即做种人数需要小于等于该数字
-            if len(seeders_range) == 1:
-                # 当做种人数大于该数字时，不符合条件
-                if torrent.seeders > seeders_range[0]:
-                    return False, f"做种人数 {torrent.seeders}，超过单个指定值"
-            # 如果指定了一个范围
-            elif len(seeders_range) > 1:
-                # 检查做种人数是否在指定的范围内（包括边界）
-                if not (seeders_range[0] <= torrent.seeders <= seeders_range[1]):
-                    return False, f"做种人数 {torrent.seeders}，不在指定范围内"
-
-        # 发布时间：用户时间 - 站点时间 - 时区偏移
-        # e.g.1: 用户UTC+8，站点UTC，timezone_offset应为+8，种子在UTC 0:00/UTC+8 8:00发布；
-        #        9:17 - 0:00 - 8:00 = 1:17；1小时17分为正确的发布时间与当前的时间差
-        # e.g.2: 用户UTC，站点UTC+8，timezone_offset应为-8，种子在UTC 0:00/UTC+8 8:00发布：
-        #        1:17 - 8:00 - (-8:00) = 1:17；1小时17分为正确的发布时间与当前的时间差
-        # timezone_offset为后加功能，默认为0，方便后续更多与时间相关的功能开发，之前在单独站点配置中使用pubtime计算过时区偏移的用户也不受影响
-        pubdate_minutes = self.__get_pubminutes(torrent.pubdate) - brush_config.timezone_offset
-        # 已支持独立站点配置，取消单独适配站点时区逻辑，可通过配置项「pubtime」自行适配
-        # pubdate_minutes = self.__adjust_site_pubminutes(pubdate_minutes, torrent)
-        if brush_config.pubtime:
-            pubtimes = [float(n) for n in brush_config.pubtime.split("-")]
-            if len(pubtimes) == 1:
-                # 单个值：选择发布时间小于等于该值的种子
-                if pubdate_minutes > pubtimes[0]:
-                    return False, f"发布时间（站点时区）{torrent.pubdate}，当前配置时区偏移 {brush_config.timezone_offset} 小时，{pubdate_minutes:.0f} 分钟前，不符合条件"
-            else:
-                # 范围值：选择发布时间在范围内的种子
-                if not (pubtimes[0] <= pubdate_minutes <= pubtimes[1]):
-                    return False, f"发布时间（站点时区）{torrent.pubdate}，当前配置时区偏移 {brush_config.timezone_offset} 小时，{pubdate_minutes:.0f} 分钟前，不在指定范围内"
+        # 促销、H&R、包含/排除规则、种子大小、做种人数、发布时间等条件
+        if filter_reason:
+            return False, filter_reason
 
         return True, None
 
@@ -2300,8 +3008,8 @@ class BrushFlow(_PluginBase):
 
         with lock:
             logger.info("开始检查刷流下载任务 ...")
-            torrent_tasks: Dict[str, dict] = self.get_data("torrents") or {}
-            unmanaged_tasks: Dict[str, dict] = self.get_data("unmanaged") or {}
+            torrent_tasks: Dict[str, dict] = self.__get_tasks(BrushTaskStore.KIND_TORRENTS)
+            unmanaged_tasks: Dict[str, dict] = self.__get_tasks(BrushTaskStore.KIND_UNMANAGED)
 
             downloader = self.downloader
             seeding_torrents, error = downloader.get_torrents()
@@ -2386,7 +3094,7 @@ class BrushFlow(_PluginBase):
 
             self.__update_and_save_statistic_info(torrent_tasks)
 
-            self.save_data("torrents", torrent_tasks)
+            self.__save_tasks(BrushTaskStore.KIND_TORRENTS, torrent_tasks)
 
             logger.info("刷流下载任务检查完成")
 
@@ -2464,8 +3172,8 @@ class BrushFlow(_PluginBase):
                     logger.info(f"站点 {torrent_task.get('site_name')}，"
                                 f"刷流任务种子移除：{torrent_task.get('title')}|{torrent_task.get('description')}")
 
-        self.save_data("torrents", torrent_tasks)
-        self.save_data("unmanaged", unmanaged_tasks)
+        self.__save_tasks(BrushTaskStore.KIND_TORRENTS, torrent_tasks)
+        self.__save_tasks(BrushTaskStore.KIND_UNMANAGED, unmanaged_tasks)
 
         # 发送汇总消息
         if added_tasks:
@@ -2605,9 +3313,11 @@ class BrushFlow(_PluginBase):
         return True, reason
 
     def __delete_torrent_for_evaluate_conditions(self, torrents: List[Any], torrent_tasks: Dict[str, dict],
-                                                 proxy_delete: bool = False) -> List:
+                                                 proxy_delete: bool = False,
+                                                 torrent_info_map: Dict[str, dict] = None,
+                                                 planner: BrushDeletePlanner = None) -> List:
         """
-        根据条件删除种子并获取已删除列表
+        根据条件删除种子并获取已删除列表，传入删除计划时同步记录到计划中
         """
         delete_hashes = []
 
@@ -2621,7 +3331,9 @@ class BrushFlow(_PluginBase):
             torrent_title = torrent_task.get("title", "")
             torrent_desc = torrent_task.get("description", "")
 
-            torrent_info = self.__get_torrent_info(torrent)
+            torrent_info = torrent_info_map.get(torrent_hash) if torrent_info_map else None
+            if not torrent_info:
+                torrent_info = self.__get_torrent_info(torrent)
 
             # 删除种子的具体实现可能会根据实际情况略有不同
             should_delete, reason = self.__evaluate_conditions_for_delete(site_name=site_name,
@@ -2630,6 +3342,9 @@ class BrushFlow(_PluginBase):
             if should_delete:
                 delete_hashes.append(torrent_hash)
                 reason = "触发动态删除阈值，" + reason if proxy_delete else reason
+                if planner:
+                    planner.add(torrent_hash=torrent_hash, torrent_task=torrent_task, torrent_info=torrent_info,
+                                stage="删除规则", reason=reason)
                 self.__send_delete_message(site_name=site_name, torrent_title=torrent_title, torrent_desc=torrent_desc,
                                            reason=reason)
                 logger.info(f"站点：{site_name}，{reason}，删除种子：{torrent_title}|{torrent_desc}")
@@ -2639,9 +3354,11 @@ class BrushFlow(_PluginBase):
         return delete_hashes
 
     def __delete_torrent_for_evaluate_proxy_pre_conditions(self, torrents: List[Any],
-                                                           torrent_tasks: Dict[str, dict]) -> List:
+                                                           torrent_tasks: Dict[str, dict],
+                                                           torrent_info_map: Dict[str, dict] = None,
+                                                           planner: BrushDeletePlanner = None) -> List:
         """
-        根据动态删除前置条件排除H&R种子后删除种子并获取已删除列表
+        根据动态删除前置条件排除H&R种子后删除种子并获取已删除列表，传入删除计划时同步记录到计划中
         """
         delete_hashes = []
 
@@ -2660,7 +3377,9 @@ class BrushFlow(_PluginBase):
             torrent_title = torrent_task.get("title", "")
             torrent_desc = torrent_task.get("description", "")
 
-            torrent_info = self.__get_torrent_info(torrent)
+            torrent_info = torrent_info_map.get(torrent_hash) if torrent_info_map else None
+            if not torrent_info:
+                torrent_info = self.__get_torrent_info(torrent)
 
             # 删除种子的具体实现可能会根据实际情况略有不同
             should_delete, reason = self.__evaluate_proxy_pre_conditions_for_delete(site_name=site_name,
@@ -2668,6 +3387,9 @@ class BrushFlow(_PluginBase):
                                                                                     torrent_task=torrent_task)
             if should_delete:
                 delete_hashes.append(torrent_hash)
+                if planner:
+                    planner.add(torrent_hash=torrent_hash, torrent_task=torrent_task, torrent_info=torrent_info,
+                                stage="前置条件", reason=reason)
                 self.__send_delete_message(site_name=site_name, torrent_title=torrent_title, torrent_desc=torrent_desc,
                                            reason=reason)
                 logger.info(f"站点：{site_name}，{reason}，删除种子：{torrent_title}|{torrent_desc}")
@@ -2692,129 +3414,148 @@ class BrushFlow(_PluginBase):
         if not (brush_config.proxy_delete and brush_config.delete_size_range):
             return []
 
-        # 获取种子信息Map
+        # 获取种子信息Map，每个种子仅解析一次，后续步骤均复用
         torrent_info_map = {self.__get_hash(torrent): self.__get_torrent_info(torrent=torrent) for torrent in torrents}
 
-        # 计算当前总做种体积
-        total_torrent_size = self.__calculate_seeding_torrents_size(torrent_tasks=torrent_tasks)
+        # 计算当前总做种体积，先保存任务的最新状态以便统计数据同步更新
+        self.__save_tasks(BrushTaskStore.KIND_TORRENTS, torrent_tasks)
+        total_torrent_size = self.__get_seeding_torrents_size()
+
+        # 解析删除阈值范围
+        sizes = [float(size) * 1024 ** 3 for size in brush_config.delete_size_range.split("-")]
+        min_size = sizes[0]  # 至少需要达到的做种体积
+        max_size = sizes[1] if len(sizes) > 1 else sizes[0]  # 触发删除操作的做种体积上限
+
+        # 判断是否为区间删除
+        proxy_size_range = len(sizes) > 1
+
+        # 删除计划，预演模式下动态阈值阶段仅生成计划，不实际删除种子
+        planner = BrushDeletePlanner(total_size=total_torrent_size, min_size=min_size, max_size=max_size,
+                                     score=brush_config.proxy_delete_score, dry_run=brush_config.proxy_delete_dryrun)
+        if planner.dry_run:
+            logger.info("已开启动态删除预演，动态阈值阶段仅生成删除计划，不会实际删除种子")
 
         logger.info(
             f"当前做种体积 {self.__bytes_to_gb(total_torrent_size):.1f} GB，正在准备计算满足动态前置删除条件的种子")
 
         # 执行排除H&R种子后满足前置删除条件的种子
         pre_delete_hashes = self.__delete_torrent_for_evaluate_proxy_pre_conditions(torrents=torrents,
-                                                                                    torrent_tasks=torrent_tasks) or []
+                                                                                    torrent_tasks=torrent_tasks,
+                                                                                    torrent_info_map=torrent_info_map,
+                                                                                    planner=planner) or []
 
-        # 如果存在前置删除种子，这里进行额外判断，总做种体积排除前置删除种子的体积
+        # 如果存在前置删除种子，总做种体积已在删除计划中排除前置删除种子的体积
         if pre_delete_hashes:
-            pre_delete_total_size = sum(torrent_info_map[self.__get_hash(torrent)].get("total_size", 0)
-                                        for torrent in torrents if self.__get_hash(torrent) in pre_delete_hashes)
-            total_torrent_size = total_torrent_size - pre_delete_total_size
-            torrents = [torrent for torrent in torrents if self.__get_hash(torrent) not in pre_delete_hashes]
+            pre_delete_total_size = total_torrent_size - planner.total_size
+            total_torrent_size = planner.total_size
             logger.info(
                 f"满足动态删除前置条件的种子共 {len(pre_delete_hashes)} 个，体积 {self.__bytes_to_gb(pre_delete_total_size):.1f} GB，"
                 f"删除种子后，当前做种体积 {self.__bytes_to_gb(total_torrent_size):.1f} GB")
         else:
             logger.info(f"没有找到任何满足动态删除前置条件的种子")
 
-        # 解析删除阈值范围
-        sizes = [float(size) * 1024 ** 3 for size in brush_config.delete_size_range.split("-")]
-        min_size = sizes[0]  # 至少需要达到的做种体积
-        max_size = sizes[1] if len(sizes) > 1 else sizes[0]  # 触发删除操作的做种体积上限
-
-        # 判断是否为区间删除
-        proxy_size_range = len(sizes) > 1
-
         # 当总体积未超过最大阈值时，不需要执行删除操作
         if total_torrent_size < max_size:
             logger.info(
                 f"当前做种体积 {self.__bytes_to_gb(total_torrent_size):.1f} GB，上限 {self.__bytes_to_gb(max_size):.1f} GB，"
                 f"下限 {self.__bytes_to_gb(min_size):.1f} GB，未进一步触发动态删除")
-            return pre_delete_hashes or []
+            return self.__finish_delete_plan(planner=planner)
         else:
             logger.info(
                 f"当前做种体积 {self.__bytes_to_gb(total_torrent_size):.1f} GB，上限 {self.__bytes_to_gb(max_size):.1f} GB，"
                 f"下限 {self.__bytes_to_gb(min_size):.1f} GB，进一步触发动态删除")
 
-        need_delete_hashes = []
-        need_delete_hashes.extend(pre_delete_hashes)
+        # 排除前置删除的种子
+        torrents = [torrent for torrent in torrents if self.__get_hash(torrent) not in planner.hashes]
 
         # 即使开了动态删除，但是也有可能部分站点单独设置了关闭，这里根据种子托管进行分组，先处理不需要托管的种子，按设置的规则进行删除
         proxy_delete_torrents, not_proxy_delete_torrents = self.__group_torrents_by_proxy_delete(torrents=torrents,
                                                                                                  torrent_tasks=torrent_tasks)
         logger.info(f"托管种子数 {len(proxy_delete_torrents)}，未托管种子数 {len(not_proxy_delete_torrents)}")
         if not_proxy_delete_torrents:
-            not_proxy_delete_hashes = self.__delete_torrent_for_evaluate_conditions(torrents=not_proxy_delete_torrents,
-                                                                                    torrent_tasks=torrent_tasks) or []
-            need_delete_hashes.extend(not_proxy_delete_hashes)
-            total_torrent_size -= sum(
-                torrent_info_map[self.__get_hash(torrent)].get("total_size", 0) for torrent in not_proxy_delete_torrents
-                if self.__get_hash(torrent) in not_proxy_delete_hashes)
+            self.__delete_torrent_for_evaluate_conditions(torrents=not_proxy_delete_torrents,
+                                                          torrent_tasks=torrent_tasks,
+                                                          torrent_info_map=torrent_info_map,
+                                                          planner=planner)
 
         # 如果删除非托管种子后仍未达到最小体积要求，则处理托管种子
-        if total_torrent_size > min_size and proxy_delete_torrents:
-            proxy_delete_hashes = self.__delete_torrent_for_evaluate_conditions(torrents=proxy_delete_torrents,
-                                                                                torrent_tasks=torrent_tasks,
-                                                                                proxy_delete=True) or []
-            need_delete_hashes.extend(proxy_delete_hashes)
-            total_torrent_size -= sum(
-                torrent_info_map[self.__get_hash(torrent)].get("total_size", 0) for torrent in proxy_delete_torrents if
-                self.__get_hash(torrent) in proxy_delete_hashes)
-
-        # 在完成初始删除步骤后，如果总体积仍然超过最小阈值，则进一步找到已完成种子并排除HR种子后按做种时间正序进行删除
-        if total_torrent_size > min_size:
+        if planner.total_size > min_size and proxy_delete_torrents:
+            self.__delete_torrent_for_evaluate_conditions(torrents=proxy_delete_torrents,
+                                                          torrent_tasks=torrent_tasks,
+                                                          proxy_delete=True,
+                                                          torrent_info_map=torrent_info_map,
+                                                          planner=planner)
+
+        # 在完成初始删除步骤后，如果总体积仍然超过最小阈值，则进一步找到已完成种子并排除HR种子后按评分顺序进行删除
+        if planner.total_size > min_size:
             # 重新计算当前的种子列表，排除已删除的种子
             remaining_hashes = list(
-                {self.__get_hash(torrent) for torrent in proxy_delete_torrents} - set(need_delete_hashes))
+                {self.__get_hash(torrent) for torrent in proxy_delete_torrents} - planner.hashes)
             # 这里根据排除后的种子列表，再次从下载器中找到已完成的任务
             downloader = self.downloader
-            completed_torrents = downloader.get_completed_torrents(ids=remaining_hashes)
-            remaining_hashes = {self.__get_hash(torrent) for torrent in completed_torrents}
-            remaining_torrents = [(_hash, torrent_info_map[_hash]) for _hash in remaining_hashes]
-
-            # 准备一个列表，用于存放满足条件的种子，即非HR种子且有明确做种时间
-            filtered_torrents = [(_hash, info['seeding_time']) for _hash, info in remaining_torrents if
-                                 not torrent_tasks[_hash].get("hit_and_run", False)]
-            sorted_torrents = sorted(filtered_torrents, key=lambda x: x[1], reverse=True)
-
-            # 进行额外的删除操作，直到满足最小阈值或没有更多种子可删除
-            for torrent_hash, _ in sorted_torrents:
-                if total_torrent_size <= min_size:
-                    break
-                torrent_task = torrent_tasks.get(torrent_hash, None)
-                torrent_info = torrent_info_map.get(torrent_hash, None)
-                if not torrent_task or not torrent_info:
+            completed_torrents = downloader.get_completed_torrents(ids=remaining_hashes) or []
+
+            # 满足条件的候选种子，即非HR种子且存在种子信息
+            candidates = {}
+            for torrent in completed_torrents:
+                torrent_hash = self.__get_hash(torrent)
+                torrent_task = torrent_tasks.get(torrent_hash)
+                if not torrent_task or torrent_task.get("hit_and_run", False):
                     continue
+                torrent_info = torrent_info_map.get(torrent_hash)
+                if torrent_info:
+                    candidates[torrent_hash] = torrent_info
 
-                need_delete_hashes.append(torrent_hash)
-                total_torrent_size -= torrent_info.get("total_size", 0)
+            # 通过优先队列按评分依次选取种子，直到满足最小阈值或没有更多种子可删除
+            for torrent_hash in planner.select(candidates):
+                torrent_task = torrent_tasks[torrent_hash]
+                torrent_info = candidates[torrent_hash]
+                remaining_size = planner.total_size - (torrent_info.get("total_size") or 0)
 
                 site_name = torrent_task.get("site_name", "")
                 torrent_title = torrent_task.get("title", "")
                 torrent_desc = torrent_task.get("description", "")
-                seeding_time = torrent_task.get("seeding_time", 0)
-                if seeding_time:
-                    reason = (f"触发动态删除阈值，系统自动删除，做种时间 {seeding_time / 3600:.1f} 小时，"
-                              f"当前做种体积 {self.__bytes_to_gb(total_torrent_size):.1f} GB")
-                    # 如果是区间删除，一次性删除的数据过多，取消消息推送
-                    if not proxy_size_range:
-                        self.__send_delete_message(site_name=site_name, torrent_title=torrent_title,
-                                                   torrent_desc=torrent_desc,
-                                                   reason=reason)
-                    logger.info(f"站点：{site_name}，{reason}，删除种子：{torrent_title}|{torrent_desc}")
-
-        delete_sites = {torrent_tasks[hash_key].get('site_name', '') for hash_key in need_delete_hashes if
+                seeding_time = torrent_info.get("seeding_time") or 0
+                reason = (f"触发动态删除阈值，系统自动删除，做种时间 {seeding_time / 3600:.1f} 小时，"
+                          f"当前做种体积 {self.__bytes_to_gb(remaining_size):.1f} GB")
+                planner.add(torrent_hash=torrent_hash, torrent_task=torrent_task, torrent_info=torrent_info,
+                            stage=BrushDeletePlanner.THRESHOLD_STAGE, reason=reason)
+                if planner.dry_run:
+                    logger.info(f"站点：{site_name}，{reason}，预演删除种子：{torrent_title}|{torrent_desc}")
+                    continue
+                # 如果是区间删除，一次性删除的数据过多，取消消息推送
+                if not proxy_size_range:
+                    self.__send_delete_message(site_name=site_name, torrent_title=torrent_title,
+                                               torrent_desc=torrent_desc,
+                                               reason=reason)
+                logger.info(f"站点：{site_name}，{reason}，删除种子：{torrent_title}|{torrent_desc}")
+
+        need_delete_hashes = planner.get_hashes()
+        preview_count = len(planner.items) - len(need_delete_hashes)
+        delete_sites = {torrent_tasks[hash_key].get('site_name', '') for hash_key in planner.hashes if
                         hash_key in torrent_tasks}
         msg = (f"站点：{'，'.join(delete_sites)}\n内容：已完成 {len(need_delete_hashes)} 个种子删除，"
-               f"当前做种体积 {self.__bytes_to_gb(total_torrent_size):.1f} GB\n原因：触发动态删除阈值，系统自动删除")
+               + (f"预演 {preview_count} 个种子删除，" if preview_count else "")
+               + f"当前做种体积 {self.__bytes_to_gb(planner.total_size):.1f} GB\n原因：触发动态删除阈值，系统自动删除")
         logger.info(msg)
 
         # 如果是区间删除，这里则进行统一推送
-        if proxy_size_range:
+        if proxy_size_range and (need_delete_hashes or not planner.dry_run):
             self.__send_message(title="【刷流任务种子删除】", text=msg)
 
         # 返回所有需要删除的种子的哈希列表
-        return need_delete_hashes
+        return self.__finish_delete_plan(planner=planner)
+
+    def __finish_delete_plan(self, planner: BrushDeletePlanner) -> List[str]:
+        """
+        保存动态删除计划，并返回需要实际删除的种子哈希列表，预演模式下不删除动态阈值阶段的种子
+        """
+        self.save_data("delete_plan", planner.to_dict())
+        delete_hashes = planner.get_hashes()
+        if planner.dry_run:
+            logger.info(f"动态删除预演完成，计划删除 {len(planner.items)} 个种子，其中实际删除 {len(delete_hashes)} 个，"
+                        f"预计剩余做种体积 {self.__bytes_to_gb(planner.total_size):.1f} GB")
+        return delete_hashes
 
     def __update_undeleted_torrents_missing_in_downloader(self, torrent_tasks, torrent_check_hashes, torrents):
         """
@@ -2884,42 +3625,24 @@ class BrushFlow(_PluginBase):
 
     def __update_and_save_statistic_info(self, torrent_tasks):
         """
-        更新并保存统计信息
+        保存任务并输出统计信息，统计数据由任务存储随任务变化增量维护，并定期与存储数据进行校准
         """
-        total_count, total_uploaded, total_downloaded, total_deleted = 0, 0, 0, 0
-        active_uploaded, active_downloaded, active_count, total_unarchived = 0, 0, 0, 0
+        self.__save_tasks(BrushTaskStore.KIND_TORRENTS, torrent_tasks)
 
-        statistic_info = self.__get_statistic_info()
-        archived_tasks = self.get_data("archived") or {}
-        combined_tasks = {**torrent_tasks, **archived_tasks}
-
-        for task in combined_tasks.values():
-            if task.get("deleted", False):
-                total_deleted += 1
-            total_downloaded += task.get("downloaded", 0)
-            total_uploaded += task.get("uploaded", 0)
-
-        # 计算torrent_tasks中未标记为删除的活跃任务的统计信息，及待归档的任务数
-        for task in torrent_tasks.values():
-            if not task.get("deleted", False):
-                active_uploaded += task.get("uploaded", 0)
-                active_downloaded += task.get("downloaded", 0)
-                active_count += 1
-            else:
-                total_unarchived += 1
-
-        # 更新统计信息
-        total_count = len(combined_tasks)
-        statistic_info.update({
-            "uploaded": total_uploaded,
-            "downloaded": total_downloaded,
-            "deleted": total_deleted,
-            "unarchived": total_unarchived,
-            "count": total_count,
-            "active": active_count,
-            "active_uploaded": active_uploaded,
-            "active_downloaded": active_downloaded
-        })
+        task_store = self.__get_task_store()
+        if time.time() - self._statistic_reconcile_time > self._statistic_reconcile_interval:
+            task_store.reconcile()
+            self._statistic_reconcile_time = time.time()
+
+        statistic_info = task_store.get_statistics()
+        total_count = statistic_info.get("count") or 0
+        total_deleted = statistic_info.get("deleted") or 0
+        total_uploaded = statistic_info.get("uploaded") or 0
+        total_downloaded = statistic_info.get("downloaded") or 0
+        total_unarchived = statistic_info.get("unarchived") or 0
+        active_count = statistic_info.get("active") or 0
+        active_uploaded = statistic_info.get("active_uploaded") or 0
+        active_downloaded = statistic_info.get("active_downloaded") or 0
 
         logger.info(f"刷流任务统计数据，总任务数：{total_count}，活跃任务数：{active_count}，已删除：{total_deleted}，"
                     f"待归档：{total_unarchived}，"
@@ -2928,9 +3651,6 @@ class BrushFlow(_PluginBase):
                     f"总上传量：{StringUtils.str_filesize(total_uploaded)}，"
                     f"总下载量：{StringUtils.str_filesize(total_downloaded)}")
 
-        self.save_data("statistic", statistic_info)
-        self.save_data("torrents", torrent_tasks)
-
     def __get_brush_config(self, sitename: str = None) -> BrushConfig:
         """
         获取BrushConfig
@@ -2960,6 +3680,7 @@ class BrushFlow(_PluginBase):
             "download_time": "下载超时时间",
             "seed_avgspeed": "平均上传速度",
             "seed_inactivetime": "未活动时间",
+            "bandwidth_window": "带宽采样窗口",
             "up_speed": "单任务上传限速",
             "dl_speed": "单任务下载限速",
             "auto_archive_days": "自动清理记录天数"
@@ -3042,12 +3763,17 @@ class BrushFlow(_PluginBase):
             "except_subscribe": brush_config.except_subscribe,
             "brush_sequential": brush_config.brush_sequential,
             "proxy_delete": brush_config.proxy_delete,
+            "proxy_delete_score": brush_config.proxy_delete_score,
+            "proxy_delete_dryrun": brush_config.proxy_delete_dryrun,
             "active_time_range": brush_config.active_time_range,
             "cron": brush_config.cron,
             "qb_category": brush_config.qb_category,
             "enable_site_config": brush_config.enable_site_config,
             "site_config": brush_config.site_config,
             "del_no_free": brush_config.del_no_free,
+            "bandwidth_window": brush_config.bandwidth_window,
+            "bandwidth_ewma": brush_config.bandwidth_ewma,
+            "brush_prefetch": brush_config.brush_prefetch,
             "_tabs": self._tabs
         }
 
@@ -3570,39 +4296,41 @@ class BrushFlow(_PluginBase):
         """
         获取任务中的种子总大小
         """
-        # 读取种子记录
-        task_info = self.get_data("torrents") or {}
-        if not task_info:
-            return 0
-        total_size = sum([task.get("size") or 0 for task in task_info.values()])
-        return total_size
-
-    def __get_average_bandwidth(self, sample_count: int = 5, interval: float = 3.0) \
-            -> Tuple[Optional[float], Optional[float]]:
-        """
-        多次采样上传和下载带宽，取平均值
-        """
-        upload_speeds = []
-        download_speeds = []
-        start_time = time.time()
-        for _ in range(sample_count):
-            downloader_info = self.__get_downloader_info()
-            if downloader_info:
-                upload_speeds.append(downloader_info.upload_speed or 0)
-                download_speeds.append(downloader_info.download_speed or 0)
-            # 采样间隔
-            time.sleep(interval)
-        end_time = time.time()
-        total_duration = end_time - start_time
-        if not upload_speeds or not download_speeds:
+        return self.__get_task_store().total_size(BrushTaskStore.KIND_TORRENTS)
+
+    def __get_average_bandwidth(self) -> Tuple[Optional[float], Optional[float]]:
+        """
+        从后台采样器读取滑动窗口内的平均上传和下载带宽
+        """
+        sampler = self._bandwidth_sampler
+        if not sampler:
+            return None, None
+        # 采样器刚启动尚无数据时，立即采样一次
+        if not sampler.sample_count:
+            sampler.sample()
+        avg_upload_speed, avg_download_speed = sampler.get_average()
+        if avg_upload_speed is None or avg_download_speed is None:
             return None, None
-        avg_upload_speed = sum(upload_speeds) / len(upload_speeds) if upload_speeds else 0
-        avg_download_speed = sum(download_speeds) / len(download_speeds) if download_speeds else 0
         logger.debug(f"平均上传带宽 {StringUtils.str_filesize(avg_upload_speed)}, "
                      f"平均下载带宽 {StringUtils.str_filesize(avg_download_speed)}, "
-                     f"采样次数={sample_count}, 时长={total_duration:.2f} 秒")
+                     f"采样次数={sampler.sample_count}, EWMA={sampler.ewma}")
         return avg_upload_speed, avg_download_speed
 
+    def __sample_downloader_bandwidth(self) -> Optional[Tuple[float, float]]:
+        """
+        采样下载器实时带宽，供后台采样器调用，下载器不可用时直接跳过而不发送通知
+        """
+        brush_config = self.__get_brush_config()
+        if not brush_config or not brush_config.downloader:
+            return None
+        service = DownloaderHelper().get_service(name=brush_config.downloader)
+        if not service or service.instance.is_inactive():
+            return None
+        downloader_info = self.__get_downloader_info()
+        if not downloader_info:
+            return None
+        return downloader_info.upload_speed or 0, downloader_info.download_speed or 0
+
     def __get_downloader_info(self) -> schemas.DownloaderInfo:
         """
         获取下载器实时信息（所有下载器）
@@ -3625,39 +4353,31 @@ class BrushFlow(_PluginBase):
 
     def __get_downloading_count(self) -> int:
         """
-        获取正在下载的任务数量
+        获取正在下载的任务数量，刷流周期内优先使用缓存
+        """
+        if self._downloading_count_cache:
+            return self._downloading_count_cache.get()
+        return self.__fetch_downloading_count() or 0
+
+    def __fetch_downloading_count(self) -> Optional[int]:
+        """
+        从下载器获取正在下载的任务数量，获取失败时返回None
         """
         try:
             brush_config = self.__get_brush_config()
             downloader = self.downloader
             if not downloader:
-                return 0
+                return None
 
             torrents = downloader.get_downloading_torrents(tags=brush_config.brush_tag)
             if torrents is None:
                 logger.warning("获取下载数量失败，可能是下载器连接发生异常")
-                return 0
+                return None
 
             return len(torrents)
         except Exception as e:
             logger.error(f"获取下载数量发生异常: {e}")
-            return 0
-
-    @staticmethod
-    def __get_pubminutes(pubdate: str) -> float:
-        """
-        将字符串转换为时间，并计算与当前时间差）（分钟）
-        """
-        try:
-            if not pubdate:
-                return 0
-            pubdate = pubdate.replace("T", " ").replace("Z", "")
-            pubdate = datetime.strptime(pubdate, "%Y-%m-%d %H:%M:%S")
-            now = datetime.now()
-            return (now - pubdate).total_seconds() // 60
-        except Exception as e:
-            logger.error(f"发布时间 {pubdate} 获取分钟失败，错误详情: {e}")
-            return 0
+            return None
 
     @staticmethod
     def __adjust_site_pubminutes(pub_minutes: float, torrent: TorrentInfo) -> float:
@@ -3817,12 +4537,11 @@ class BrushFlow(_PluginBase):
         except ValueError:
             return False
 
-    @staticmethod
-    def __calculate_seeding_torrents_size(torrent_tasks: Dict[str, dict]) -> float:
+    def __get_seeding_torrents_size(self) -> float:
         """
-        计算保种种子体积
+        获取保种种子体积，由任务存储增量维护，调用前需确保任务的最新状态已保存
         """
-        return sum(task.get("size", 0) for task in torrent_tasks.values() if not task.get("deleted", False))
+        return self.__get_task_store().get_kind_statistics(BrushTaskStore.KIND_TORRENTS).get("seeding_size") or 0
 
     def __auto_archive_tasks(self, torrent_tasks: Dict[str, dict]) -> None:
         """
@@ -3832,9 +4551,6 @@ class BrushFlow(_PluginBase):
             logger.info("自动归档记录天数小于等于0，取消自动归档")
             return
 
-        # 用于存储已删除的数据
-        archived_tasks: Dict[str, dict] = self.get_data("archived") or {}
-
         current_time = time.time()
         archive_threshold_seconds = self._brush_config.auto_archive_days * 86400  # 将天数转换为秒数
 
@@ -3848,46 +4564,87 @@ class BrushFlow(_PluginBase):
             if (value.get("deleted") and isinstance(deleted_time, (int, float)) and
                     current_time - deleted_time > archive_threshold_seconds):
                 keys_to_delete.add(key)
-                archived_tasks[key] = value
                 continue
 
             # 场景 2: 检查没有明确删除时间的历史数据
             if value.get("deleted") and deleted_time is None:
                 keys_to_delete.add(key)
-                archived_tasks[key] = value
                 continue
 
-        # 从原始字典中移除已删除的条目
+        if not keys_to_delete:
+            return
+
+        # 先保存任务的最新状态，再将对应记录直接移动到归档中
+        self.__save_tasks(BrushTaskStore.KIND_TORRENTS, torrent_tasks)
+        self.__get_task_store().move(hashes=keys_to_delete, from_kind=BrushTaskStore.KIND_TORRENTS,
+                                     to_kind=BrushTaskStore.KIND_ARCHIVED)
+
+        # 从原始字典中移除已归档的条目
         for key in keys_to_delete:
             del torrent_tasks[key]
 
-        self.save_data("archived", archived_tasks)
+        logger.info(f"已自动归档 {len(keys_to_delete)} 个刷流任务")
 
     def __clear_tasks(self):
         """
         清除统计数据
         彻底重置所有刷流数据，如当前还存在正在做种的刷流任务，待定时检查任务执行后，会自动纳入刷流管理
         """
-        self.save_data("torrents", {})
-        self.save_data("archived", {})
-        self.save_data("unmanaged", {})
-        self.save_data("statistic", {})
+        self.__get_task_store().clear()
+        self.del_data("statistic")
+        self.del_data("delete_plan")
+
+    def __get_task_store(self) -> BrushTaskStore:
+        """
+        获取刷流任务存储，首次使用时迁移插件数据中的历史任务
+        """
+        if self._task_store:
+            return self._task_store
+        with self._task_store_lock:
+            if not self._task_store:
+                task_store = BrushTaskStore(db_path=self.get_data_path() / "brushflow.db")
+                self.__migrate_plugin_data_tasks(task_store=task_store)
+                self._task_store = task_store
+        return self._task_store
+
+    def __migrate_plugin_data_tasks(self, task_store: BrushTaskStore):
+        """
+        将旧版本保存在插件数据中的刷流任务迁移到任务存储
+        """
+        kinds = [BrushTaskStore.KIND_TORRENTS, BrushTaskStore.KIND_ARCHIVED, BrushTaskStore.KIND_UNMANAGED]
+        legacy_tasks = {kind: self.get_data(kind) for kind in kinds}
+        if not any(legacy_tasks.values()):
+            return
+        if not task_store.is_empty():
+            logger.warning("任务存储中已存在刷流任务，跳过插件数据中的历史任务迁移")
+            return
+        for kind, tasks in legacy_tasks.items():
+            if tasks:
+                task_store.save(kind, tasks)
+        logger.info(f"刷流任务已迁移到独立存储，"
+                    f"{'，'.join(f'{kind} {len(tasks or {})} 条' for kind, tasks in legacy_tasks.items())}")
+        for kind in kinds:
+            self.del_data(kind)
+        # 统计数据改为由任务存储维护
+        self.del_data("statistic")
+
+    def __get_tasks(self, kind: str) -> Dict[str, dict]:
+        """
+        获取指定分类的刷流任务
+        """
+        return self.__get_task_store().load(kind)
 
-    def __get_statistic_info(self) -> Dict[str, int]:
+    def __save_tasks(self, kind: str, tasks: Dict[str, dict]):
+        """
+        增量保存指定分类的刷流任务
+        """
+        self.__get_task_store().save(kind, tasks)
+
+    def __get_statistic_info(self) -> Dict[str, float]:
         """
         获取统计数据
         """
-        statistic_info = self.get_data("statistic") or {
-            "count": 0,
-            "deleted": 0,
-            "uploaded": 0,
-            "downloaded": 0,
-            "unarchived": 0,
-            "active": 0,
-            "active_uploaded": 0,
-            "active_downloaded": 0
-        }
-        return statistic_info
+        return self.__get_task_store().get_statistics()
 
     @staticmethod
     def __is_valid_time_range(time_range: str) -> bool:
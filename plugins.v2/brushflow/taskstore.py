@@ -0,0 +1,327 @@
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.log import logger
+
+# 单个任务的统计指标：站点名称、是否删除、种子大小、上传量、下载量
+TaskMetrics = Tuple[Optional[str], int, float, float, float]
+
+
+class BrushTaskStore:
+    """
+    刷流任务存储，每个种子一行，按分类（torrents/archived/unmanaged）、Hash、站点建立索引，
+    保存时仅写入发生变化的任务，并随写入增量维护各分类、各站点的统计汇总
+    """
+
+    # 刷流中的任务
+    KIND_TORRENTS = "torrents"
+    # 已归档的任务
+    KIND_ARCHIVED = "archived"
+    # 移除刷流管理的任务
+    KIND_UNMANAGED = "unmanaged"
+
+    # 统计汇总项
+    STAT_KEYS = ("count", "deleted", "uploaded", "downloaded",
+                 "active", "active_uploaded", "active_downloaded", "seeding_size")
+
+    def __init__(self, db_path: Path):
+        self._db_path = str(db_path)
+        self._lock = threading.RLock()
+        # 各分类最近一次与数据库同步的任务快照，Hash -> (序列化后的任务, 统计指标)
+        self._snapshots: Dict[str, Dict[str, Tuple[str, TaskMetrics]]] = {}
+        # 各分类、各站点的统计汇总，首次使用时从数据库加载
+        self._aggregates: Optional[Dict[str, Dict[str, Dict[str, float]]]] = None
+        self.__init_db()
+
+    @contextmanager
+    def __session(self):
+        """
+        打开数据库连接，退出时提交事务并关闭连接
+        """
+        conn = sqlite3.connect(self._db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def __init_db(self):
+        with self._lock, self.__session() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS brush_task (
+                    kind TEXT NOT NULL,
+                    hash TEXT NOT NULL,
+                    site_name TEXT,
+                    deleted INTEGER NOT NULL DEFAULT 0,
+                    size REAL NOT NULL DEFAULT 0,
+                    uploaded REAL NOT NULL DEFAULT 0,
+                    downloaded REAL NOT NULL DEFAULT 0,
+                    time REAL,
+                    data TEXT NOT NULL,
+                    PRIMARY KEY (kind, hash)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_brush_task_hash ON brush_task (hash)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_brush_task_site ON brush_task (kind, site_name)")
+
+    @staticmethod
+    def __dumps(task: dict) -> str:
+        return json.dumps(task, ensure_ascii=False, sort_keys=True, default=str)
+
+    @staticmethod
+    def __metrics(task: dict) -> TaskMetrics:
+        return (task.get("site_name"), 1 if task.get("deleted") else 0,
+                task.get("size") or 0, task.get("uploaded") or 0, task.get("downloaded") or 0)
+
+    def is_empty(self) -> bool:
+        """
+        是否没有任何任务
+        """
+        with self._lock, self.__session() as conn:
+            return conn.execute("SELECT 1 FROM brush_task LIMIT 1").fetchone() is None
+
+    def load(self, kind: str) -> Dict[str, dict]:
+        """
+        加载指定分类的全部任务，并记录快照用于后续增量保存
+        """
+        with self._lock, self.__session() as conn:
+            rows = conn.execute("SELECT hash, data, site_name, deleted, size, uploaded, downloaded "
+                                "FROM brush_task WHERE kind = ?", (kind,)).fetchall()
+            self._snapshots[kind] = {row[0]: (row[1], tuple(row[2:])) for row in rows}
+        tasks = {}
+        for row in rows:
+            try:
+                tasks[row[0]] = json.loads(row[1])
+            except Exception as e:
+                logger.error(f"刷流任务 {row[0]} 数据解析失败：{e}")
+        return tasks
+
+    def save(self, kind: str, tasks: Dict[str, dict]):
+        """
+        增量保存指定分类的任务，只写入新增或变化的任务，并删除已不存在的任务
+        """
+        with self._lock:
+            snapshot = self.__get_snapshot(kind)
+            upserts = {}
+            for torrent_hash, task in tasks.items():
+                data = self.__dumps(task)
+                if snapshot.get(torrent_hash, (None,))[0] != data:
+                    upserts[torrent_hash] = (data, self.__metrics(task), task.get("time"))
+            deletes = [torrent_hash for torrent_hash in snapshot if torrent_hash not in tasks]
+            if upserts or deletes:
+                self.__write(kind=kind, snapshot=snapshot, upserts=upserts, deletes=deletes)
+                logger.debug(f"刷流任务存储 {kind} 增量保存完成，更新 {len(upserts)} 条，删除 {len(deletes)} 条")
+
+    def upsert(self, kind: str, torrent_hash: str, task: dict):
+        """
+        新增或更新单个任务
+        """
+        with self._lock:
+            snapshot = self.__get_snapshot(kind)
+            self.__write(kind=kind, snapshot=snapshot,
+                         upserts={torrent_hash: (self.__dumps(task), self.__metrics(task), task.get("time"))})
+
+    def move(self, hashes: Iterable[str], from_kind: str, to_kind: str):
+        """
+        将任务从一个分类移动到另一个分类，目标分类中已存在的同Hash任务会被覆盖
+        """
+        hashes = list(hashes)
+        if not hashes:
+            return
+        with self._lock, self.__session() as conn:
+            aggregates = self.__get_aggregates(conn)
+            for chunk in self.__chunks(hashes):
+                placeholders = ",".join("?" * len(chunk))
+                rows = conn.execute(f"SELECT kind, site_name, deleted, size, uploaded, downloaded FROM brush_task "
+                                    f"WHERE kind IN (?, ?) AND hash IN ({placeholders})",
+                                    (from_kind, to_kind, *chunk)).fetchall()
+                conn.execute(f"DELETE FROM brush_task WHERE kind = ? AND hash IN ({placeholders})",
+                             (to_kind, *chunk))
+                conn.execute(f"UPDATE brush_task SET kind = ? WHERE kind = ? AND hash IN ({placeholders})",
+                             (to_kind, from_kind, *chunk))
+                for row_kind, *metrics in rows:
+                    self.__apply(aggregates, row_kind, tuple(metrics), -1)
+                    if row_kind == from_kind:
+                        self.__apply(aggregates, to_kind, tuple(metrics), 1)
+            for kind in (from_kind, to_kind):
+                self._snapshots.pop(kind, None)
+
+    def delete(self, kind: str, hashes: Iterable[str]):
+        """
+        删除指定分类中的任务
+        """
+        hashes = list(hashes)
+        if not hashes:
+            return
+        with self._lock:
+            snapshot = self.__get_snapshot(kind)
+            self.__write(kind=kind, snapshot=snapshot, deletes=[h for h in hashes if h in snapshot])
+
+    def clear(self, kinds: Optional[List[str]] = None):
+        """
+        清空任务，未指定分类时清空全部
+        """
+        with self._lock, self.__session() as conn:
+            if kinds:
+                conn.executemany("DELETE FROM brush_task WHERE kind = ?", [(kind,) for kind in kinds])
+                for kind in kinds:
+                    self._snapshots[kind] = {}
+                    if self._aggregates is not None:
+                        self._aggregates.pop(kind, None)
+            else:
+                conn.execute("DELETE FROM brush_task")
+                self._snapshots.clear()
+                self._aggregates = {}
+
+    def get_kind_statistics(self, kind: str, site_name: str = None) -> Dict[str, float]:
+        """
+        获取指定分类的统计汇总，可按站点过滤
+        """
+        with self._lock:
+            sites = self.__get_aggregates().get(kind) or {}
+            if site_name is not None:
+                return dict(sites.get(site_name) or self.__empty_stat())
+            total = self.__empty_stat()
+            for stat in sites.values():
+                for key in self.STAT_KEYS:
+                    total[key] += stat[key]
+            return total
+
+    def get_statistics(self) -> Dict[str, float]:
+        """
+        获取刷流任务整体统计，包括刷流中和已归档的任务
+        """
+        torrents = self.get_kind_statistics(self.KIND_TORRENTS)
+        archived = self.get_kind_statistics(self.KIND_ARCHIVED)
+        return {
+            "count": torrents["count"] + archived["count"],
+            "deleted": torrents["deleted"] + archived["deleted"],
+            "uploaded": torrents["uploaded"] + archived["uploaded"],
+            "downloaded": torrents["downloaded"] + archived["downloaded"],
+            "unarchived": torrents["deleted"],
+            "active": torrents["active"],
+            "active_uploaded": torrents["active_uploaded"],
+            "active_downloaded": torrents["active_downloaded"],
+            "seeding_size": torrents["seeding_size"]
+        }
+
+    def get_site_statistics(self) -> Dict[str, Dict[str, float]]:
+        """
+        获取各站点的统计汇总，包括刷流中和已归档的任务
+        """
+        with self._lock:
+            aggregates = self.__get_aggregates()
+            result: Dict[str, Dict[str, float]] = {}
+            for kind in (self.KIND_TORRENTS, self.KIND_ARCHIVED):
+                for site_name, stat in (aggregates.get(kind) or {}).items():
+                    site_stat = result.setdefault(site_name or "", self.__empty_stat())
+                    for key in self.STAT_KEYS:
+                        site_stat[key] += stat[key]
+            return result
+
+    def reconcile(self) -> bool:
+        """
+        从数据库重新计算统计汇总，修正增量维护过程中可能产生的偏差，返回是否存在偏差
+        """
+        with self._lock, self.__session() as conn:
+            previous = self._aggregates
+            self._aggregates = self.__load_aggregates(conn)
+        drifted = previous is not None and self.__normalize(previous) != self.__normalize(self._aggregates)
+        if drifted:
+            logger.warning("刷流任务统计汇总存在偏差，已按存储数据重新计算")
+        return drifted
+
+    def __write(self, kind: str, snapshot: Dict[str, Tuple[str, TaskMetrics]],
+                upserts: Dict[str, Tuple[str, TaskMetrics, Optional[float]]] = None, deletes: List[str] = None):
+        """
+        写入数据库，同时更新快照及统计汇总
+        """
+        upserts = upserts or {}
+        deletes = deletes or []
+        with self.__session() as conn:
+            aggregates = self.__get_aggregates(conn)
+            if deletes:
+                conn.executemany("DELETE FROM brush_task WHERE kind = ? AND hash = ?",
+                                 [(kind, torrent_hash) for torrent_hash in deletes])
+            if upserts:
+                conn.executemany("INSERT OR REPLACE INTO brush_task "
+                                 "(kind, hash, site_name, deleted, size, uploaded, downloaded, time, data) "
+                                 "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                 [(kind, torrent_hash, *metrics, task_time, data)
+                                  for torrent_hash, (data, metrics, task_time) in upserts.items()])
+        for torrent_hash in deletes:
+            old = snapshot.pop(torrent_hash, None)
+            if old:
+                self.__apply(aggregates, kind, old[1], -1)
+        for torrent_hash, value in upserts.items():
+            old = snapshot.get(torrent_hash)
+            if old:
+                self.__apply(aggregates, kind, old[1], -1)
+            self.__apply(aggregates, kind, value[1], 1)
+            snapshot[torrent_hash] = value[:2]
+
+    def __get_snapshot(self, kind: str) -> Dict[str, Tuple[str, TaskMetrics]]:
+        snapshot = self._snapshots.get(kind)
+        if snapshot is None:
+            with self.__session() as conn:
+                rows = conn.execute("SELECT hash, data, site_name, deleted, size, uploaded, downloaded "
+                                    "FROM brush_task WHERE kind = ?", (kind,)).fetchall()
+            snapshot = {row[0]: (row[1], tuple(row[2:])) for row in rows}
+            self._snapshots[kind] = snapshot
+        return snapshot
+
+    def __get_aggregates(self, conn: sqlite3.Connection = None) -> Dict[str, Dict[str, Dict[str, float]]]:
+        if self._aggregates is None:
+            if conn:
+                self._aggregates = self.__load_aggregates(conn)
+            else:
+                with self.__session() as new_conn:
+                    self._aggregates = self.__load_aggregates(new_conn)
+        return self._aggregates
+
+    def __load_aggregates(self, conn: sqlite3.Connection) -> Dict[str, Dict[str, Dict[str, float]]]:
+        aggregates: Dict[str, Dict[str, Dict[str, float]]] = {}
+        rows = conn.execute("""
+            SELECT kind, site_name, COUNT(*), SUM(deleted), SUM(uploaded), SUM(downloaded),
+                   SUM(1 - deleted), SUM(CASE WHEN deleted = 0 THEN uploaded ELSE 0 END),
+                   SUM(CASE WHEN deleted = 0 THEN downloaded ELSE 0 END),
+                   SUM(CASE WHEN deleted = 0 THEN size ELSE 0 END)
+            FROM brush_task GROUP BY kind, site_name
+        """).fetchall()
+        for kind, site_name, *values in rows:
+            aggregates.setdefault(kind, {})[site_name] = dict(zip(self.STAT_KEYS, (v or 0 for v in values)))
+        return aggregates
+
+    def __apply(self, aggregates: Dict[str, Dict[str, Dict[str, float]]], kind: str,
+                metrics: TaskMetrics, sign: int):
+        site_name, deleted, size, uploaded, downloaded = metrics
+        stat = aggregates.setdefault(kind, {}).setdefault(site_name, self.__empty_stat())
+        stat["count"] += sign
+        stat["deleted"] += sign * deleted
+        stat["uploaded"] += sign * uploaded
+        stat["downloaded"] += sign * downloaded
+        if not deleted:
+            stat["active"] += sign
+            stat["active_uploaded"] += sign * uploaded
+            stat["active_downloaded"] += sign * downloaded
+            stat["seeding_size"] += sign * size
+        if not stat["count"]:
+            aggregates[kind].pop(site_name, None)
+
+    def __empty_stat(self) -> Dict[str, float]:
+        return {key: 0 for key in self.STAT_KEYS}
+
+    @staticmethod
+    def __normalize(aggregates: Dict[str, Dict[str, Dict[str, float]]]) -> dict:
+        return {(kind, site_name): tuple(round(value, 2) for value in stat.values())
+                for kind, sites in aggregates.items() for site_name, stat in sites.items() if stat.get("count")}
+
+    @staticmethod
+    def __chunks(items: List[str], size: int = 500):
+        for i in range(0, len(items), size):
+            yield items[i:i + size]
@@ -1,4 +1,6 @@
+import os
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Any, List, Dict, Tuple, Optional
@@ -18,6 +20,186 @@ from app.schemas.types import EventType
 from app.utils.string import StringUtils
 
 
+class TrackerStatusCollector:
+    """
+    种子tracker状态收集器，每个种子的tracker只获取一次，结果按种子hash缓存供本次运行的各轮筛选复用
+    """
+
+    def __init__(self, workers: int = 8):
+        self._workers = workers
+        # 种子hash -> tracker列表
+        self._trackers: Dict[str, List[dict]] = {}
+        # tracker地址 -> 域名
+        self._domains: Dict[str, str] = {}
+
+    def collect(self, downloader_obj: Any, torrents: List[Any]):
+        """
+        收集全部种子的tracker，下载器支持时通过一次请求批量获取，否则使用有界线程池并发获取
+        """
+        self._trackers = {}
+        bulk_trackers = self.__fetch_bulk(downloader_obj)
+        pending = []
+        for torrent in torrents:
+            torrent_hash = torrent.get("hash")
+            if bulk_trackers is not None and torrent_hash in bulk_trackers:
+                self._trackers[torrent_hash] = self.__normalize(bulk_trackers[torrent_hash])
+            else:
+                pending.append(torrent)
+        if not pending:
+            return
+        with ThreadPoolExecutor(max_workers=max(1, min(self._workers, len(pending))),
+                                thread_name_prefix="CleanInvalidSeed-Tracker") as executor:
+            for torrent, trackers in zip(pending, executor.map(self.__fetch_trackers, pending)):
+                self._trackers[torrent.get("hash")] = self.__normalize(trackers)
+
+    def get(self, torrent: Any) -> List[dict]:
+        """
+        获取种子的tracker列表，已排除tier为-1的DHT/PeX/LSD
+        """
+        return self._trackers.get(torrent.get("hash")) or []
+
+    def get_domain(self, url: str) -> str:
+        """
+        解析tracker域名，同一地址只解析一次
+        """
+        domain = self._domains.get(url)
+        if domain is None:
+            domain = StringUtils.get_url_netloc(url)[1]
+            self._domains[url] = domain
+        return domain
+
+    @staticmethod
+    def __fetch_trackers(torrent: Any) -> List[dict]:
+        try:
+            return list(torrent.trackers or [])
+        except Exception as e:
+            logger.error(f"获取种子 {torrent.get('name')} 的tracker失败：{str(e)}")
+            return []
+
+    @staticmethod
+    def __fetch_bulk(downloader_obj: Any) -> Optional[Dict[str, List[dict]]]:
+        """
+        通过种子列表接口一次性获取全部tracker（需qBittorrent 5.1及以上版本），不支持时返回None
+        """
+        qbc = getattr(downloader_obj, "qbc", None)
+        if not qbc:
+            return None
+        try:
+            torrents = qbc.torrents_info(include_trackers=True)
+        except Exception as e:
+            logger.debug(f"批量获取tracker失败，将逐个种子获取：{str(e)}")
+            return None
+        bulk_trackers = {torrent.get("hash"): torrent.get("trackers") for torrent in torrents or []
+                         if isinstance(torrent.get("trackers"), list)}
+        return bulk_trackers or None
+
+    def __normalize(self, trackers: List[Any]) -> List[dict]:
+        result = []
+        for tracker in trackers or []:
+            if tracker.get("tier") == -1:
+                continue
+            url = tracker.get("url") or ""
+            result.append({
+                "url": url,
+                "domain": self.get_domain(url),
+                "status": tracker.get("status"),
+                "msg": tracker.get("msg"),
+            })
+        return result
+
+
+class PathTrie:
+    """
+    路径前缀树，按路径层级保存下载器中的做种路径，匹配耗时只与路径层级数相关
+    """
+
+    def __init__(self, paths: List[str] = None):
+        self._root: Dict[str, dict] = {}
+        for path in paths or []:
+            self.insert(path)
+
+    @staticmethod
+    def __split(path: str) -> List[str]:
+        return [part for part in str(path).replace("\\", "/").split("/") if part]
+
+    def insert(self, path: str):
+        """
+        加入路径
+        """
+        if not path:
+            return
+        node = self._root
+        for part in self.__split(path):
+            node = node.setdefault(part, {})
+
+    def contains_prefix(self, path: str) -> bool:
+        """
+        判断是否存在以该路径开头（按路径层级）的做种路径
+        """
+        parts = self.__split(path)
+        if not parts:
+            return False
+        node = self._root
+        for part in parts:
+            node = node.get(part)
+            if node is None:
+                return False
+        return True
+
+
+class DirectorySizeCache:
+    """
+    目录大小缓存，基于os.scandir遍历，目录的inode及修改时间未变化时复用上次统计的文件大小及子目录清单
+    """
+
+    def __init__(self):
+        # 目录路径 -> (inode, 修改时间, 直接包含的文件总大小, 子目录名称)
+        self._entries: Dict[str, Tuple[int, int, int, List[str]]] = {}
+
+    def get_size(self, path: Path | str) -> int:
+        """
+        获取文件或目录的总大小
+        """
+        path = str(path)
+        try:
+            stat = os.stat(path, follow_symlinks=False)
+        except OSError:
+            return 0
+        if not os.path.isdir(path) or os.path.islink(path):
+            return stat.st_size
+        return self.__get_dir_size(path, stat)
+
+    def __get_dir_size(self, path: str, stat: os.stat_result) -> int:
+        entry = self._entries.get(path)
+        if entry and entry[0] == stat.st_ino and entry[1] == stat.st_mtime_ns:
+            files_size, subdirs = entry[2], entry[3]
+        else:
+            files_size, subdirs = 0, []
+            try:
+                with os.scandir(path) as it:
+                    for item in it:
+                        try:
+                            if item.is_dir(follow_symlinks=False):
+                                subdirs.append(item.name)
+                            elif item.is_file(follow_symlinks=False):
+                                files_size += item.stat(follow_symlinks=False).st_size
+                        except OSError:
+                            continue
+            except OSError as e:
+                logger.warn(f"读取目录 {path} 失败：{str(e)}")
+                return 0
+            self._entries[path] = (stat.st_ino, stat.st_mtime_ns, files_size, subdirs)
+        total_size = files_size
+        for name in subdirs:
+            subdir = os.path.join(path, name)
+            try:
+                subdir_stat = os.stat(subdir, follow_symlinks=False)
+            except OSError:
+                continue
+            total_size += self.__get_dir_size(subdir, subdir_stat)
+        return total_size
+
+
 class CleanInvalidSeed(_PluginBase):
     # 插件名称
     plugin_name = "清理QB无效做种"
@@ -26,7 +208,7 @@ class CleanInvalidSeed(_PluginBase):
     # 插件图标
     plugin_icon = "clean_a.png"
     # 插件版本
-    plugin_version = "2.0"
+    plugin_version = "2.2"
     # 插件作者
     plugin_author = "DzAvril"
     # 作者主页
@@ -64,6 +246,10 @@ class CleanInvalidSeed(_PluginBase):
         "err torrent banned",
     ]
     _custom_error_msg = ""
+    # 并发获取tracker的线程数
+    _tracker_workers = 8
+    # 源文件目录大小缓存
+    _size_cache: Optional[DirectorySizeCache] = None
 
     def init_plugin(self, config: dict = None):
 
@@ -360,16 +546,17 @@ class CleanInvalidSeed(_PluginBase):
             custom_msgs = (
                 self._custom_error_msg.split("\n") if self._custom_error_msg else []
             )
-            error_msgs = self._error_msg + custom_msgs
+            error_msgs = set(self._error_msg + custom_msgs)
+            # 一次性获取全部种子的tracker，供后续各轮筛选复用
+            tracker_collector = TrackerStatusCollector(workers=self._tracker_workers)
+            tracker_collector.collect(downloader_obj=downloader_obj, torrents=all_torrents)
             # 第一轮筛选出所有未工作的种子
             for torrent in all_torrents:
-                trackers = torrent.trackers
+                trackers = tracker_collector.get(torrent)
                 is_invalid = True
                 is_tracker_working = False
                 for tracker in trackers:
-                    if tracker.get("tier") == -1:
-                        continue
-                    tracker_domian = StringUtils.get_url_netloc((tracker.get("url")))[1]
+                    tracker_domian = tracker.get("domain")
                     # 有一个tracker工作即为有效做种
                     if (tracker.get("status") == 2) or (tracker.get("status") == 3):
                         is_tracker_working = True
@@ -400,11 +587,9 @@ class CleanInvalidSeed(_PluginBase):
             invalid_torrent_tuple_list = []
             deleted_torrent_tuple_list = []
             for torrent in temp_invalid_torrents:
-                trackers = torrent.trackers
+                trackers = tracker_collector.get(torrent)
                 for tracker in trackers:
-                    if tracker.get("tier") == -1:
-                        continue
-                    tracker_domian = StringUtils.get_url_netloc((tracker.get("url")))[1]
+                    tracker_domian = tracker.get("domain")
                     if tracker_domian in working_tracker_set:
                         # tracker是正常的，说明该种子是无效的
                         invalid_torrent_tuple_list.append(
@@ -414,7 +599,7 @@ class CleanInvalidSeed(_PluginBase):
                                 torrent.tags,
                                 torrent.size,
                                 tracker_domian,
-                                tracker.msg,
+                                tracker.get("msg"),
                             )
                         )
                         if self._delete_invalid_torrents or self._label_only:
@@ -446,7 +631,7 @@ class CleanInvalidSeed(_PluginBase):
                                         torrent.tags,
                                         torrent.size,
                                         tracker_domian,
-                                        tracker.msg,
+                                        tracker.get("msg"),
                                     )
                                 )
                         break
@@ -472,35 +657,26 @@ class CleanInvalidSeed(_PluginBase):
 
             for index in range(len(tracker_not_working_torrents)):
                 torrent = tracker_not_working_torrents[index]
-                trackers = torrent.trackers
+                trackers = tracker_collector.get(torrent)
                 tracker_msg = ""
                 for tracker in trackers:
-                    if tracker.get("tier") == -1:
-                        continue
-                    tracker_domian = StringUtils.get_url_netloc((tracker.get("url")))[1]
-                    tracker_msg += f" {tracker_domian}：{tracker.msg} "
+                    tracker_msg += f" {tracker.get('domain')}：{tracker.get('msg')} "
                 tracker_not_working_msg += f"{index + 1}. {torrent.name}，分类：{torrent.category}，标签：{torrent.tags}, 大小：{StringUtils.str_filesize(torrent.size)}，Trackers: {tracker_msg}\n"
 
             for index in range(len(invalid_torrents_exclude_categories)):
                 torrent = invalid_torrents_exclude_categories[index]
-                trackers = torrent.trackers
+                trackers = tracker_collector.get(torrent)
                 tracker_msg = ""
                 for tracker in trackers:
-                    if tracker.get("tier") == -1:
-                        continue
-                    tracker_domian = StringUtils.get_url_netloc((tracker.get("url")))[1]
-                    tracker_msg += f" {tracker_domian}：{tracker.msg} "
+                    tracker_msg += f" {tracker.get('domain')}：{tracker.get('msg')} "
                 exclude_categories_msg += f"{index + 1}. {torrent.name}，分类：{torrent.category}，标签：{torrent.tags}, 大小：{StringUtils.str_filesize(torrent.size)}，Trackers: {tracker_msg}\n"
 
             for index in range(len(invalid_torrents_exclude_labels)):
                 torrent = invalid_torrents_exclude_labels[index]
-                trackers = torrent.trackers
+                trackers = tracker_collector.get(torrent)
                 tracker_msg = ""
                 for tracker in trackers:
-                    if tracker.get("tier") == -1:
-                        continue
-                    tracker_domian = StringUtils.get_url_netloc((tracker.get("url")))[1]
-                    tracker_msg += f" {tracker_domian}：{tracker.msg} "
+                    tracker_msg += f" {tracker.get('domain')}：{tracker.get('msg')} "
                 exclude_labels_msg += f"{index + 1}. {torrent.name}，分类：{torrent.category}，标签：{torrent.tags}, 大小：{StringUtils.str_filesize(torrent.size)}，Trackers: {tracker_msg}\n"
 
             for index in range(len(deleted_torrent_tuple_list)):
@@ -588,9 +764,11 @@ class CleanInvalidSeed(_PluginBase):
             source_path_map[mp_path] = qb_path
             source_paths.append(mp_path)
         # 所有做种源文件路径
-        content_path_set = set()
-        for torrent in all_torrents:
-            content_path_set.add(torrent.content_path)
+        content_path_trie = PathTrie([torrent.content_path for torrent in all_torrents])
+        if not self._size_cache:
+            self._size_cache = DirectorySizeCache()
+        # 未做种的无效源文件
+        orphan_files: List[Tuple[Path, int]] = []
 
         message = "检测未做种无效源文件：\n"
         for source_path_str in source_paths:
@@ -621,22 +799,27 @@ class CleanInvalidSeed(_PluginBase):
                 qb_path = (str(source_file)).replace(
                     source_path_str, source_path_map[source_path_str]
                 )
-                # todo: 优化性能
-                is_exist = False
-                for content_path in content_path_set:
-                    if qb_path in content_path:
-                        is_exist = True
-                        break
+                if not content_path_trie.contains_prefix(qb_path):
+                    orphan_files.append((source_file, self._size_cache.get_size(source_file)))
 
-                if not is_exist:
-                    deleted_file_cnt += 1
-                    message += f"{deleted_file_cnt}. {str(source_file)}\n"
-                    total_size += self.get_size(source_file)
-                    if self._delete_invalid_files:
-                        if source_file.is_file():
-                            source_file.unlink()
-                        elif source_file.is_dir():
-                            shutil.rmtree(source_file)
+        # 按占用空间从大到小排列，优先展示可释放空间较大的源文件
+        orphan_files.sort(key=lambda item: item[1], reverse=True)
+        for source_file, size in orphan_files:
+            deleted_file_cnt += 1
+            message += f"{deleted_file_cnt}. {str(source_file)}，大小：{StringUtils.str_filesize(size)}\n"
+            total_size += size
+            if self._delete_invalid_files:
+                if source_file.is_file():
+                    source_file.unlink()
+                elif source_file.is_dir():
+                    shutil.rmtree(source_file)
+        # 保存无效源文件报告
+        self.save_data("orphan_report", {
+            "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "deleted": bool(self._delete_invalid_files),
+            "total_size": total_size,
+            "files": [{"path": str(source_file), "size": size} for source_file, size in orphan_files]
+        })
 
         message += f"检测到{deleted_file_cnt}个未做种的无效源文件，共占用{StringUtils.str_filesize(total_size)}空间。\n"
         if self._delete_invalid_files:
@@ -651,17 +834,6 @@ class CleanInvalidSeed(_PluginBase):
             )
         logger.info("检测无效源文件任务结束")
 
-    @staticmethod
-    def get_size(path: Path):
-        total_size = 0
-        if path.is_file():
-            return path.stat().st_size
-        # rglob 方法用于递归遍历所有文件和目录
-        for entry in path.rglob("*"):
-            if entry.is_file():
-                total_size += entry.stat().st_size
-        return total_size
-
     def get_form(self) -> Tuple[List[dict], Dict[str, Any]]:
         return [
             {
@@ -992,7 +1164,56 @@ class CleanInvalidSeed(_PluginBase):
         }
 
     def get_page(self) -> List[dict]:
-        pass
+        """
+        展示最近一次检测到的未做种无效源文件，按占用空间从大到小排列
+        """
+        report = self.get_data("orphan_report")
+        if not report or not report.get("files"):
+            return [
+                {
+                    "component": "div",
+                    "text": "暂无数据",
+                    "props": {
+                        "class": "text-center",
+                    }
+                }
+            ]
+        headers = [
+            {"title": "路径", "key": "path", "sortable": True},
+            {"title": "大小", "key": "size", "sortable": True},
+        ]
+        items = [
+            {
+                "path": file.get("path"),
+                "size": StringUtils.str_filesize(file.get("size") or 0),
+            } for file in report.get("files")
+        ]
+        title = (f"未做种的无效源文件（{report.get('time')}，共{len(items)}个，"
+                 f"{'已释放' if report.get('deleted') else '可释放'}{StringUtils.str_filesize(report.get('total_size') or 0)}）")
+        return [
+            {
+                "component": "VCard",
+                "props": {
+                    "variant": "tonal",
+                    "title": title
+                },
+                "content": [
+                    {
+                        "component": "VDataTableVirtual",
+                        "props": {
+                            "class": "text-sm",
+                            "headers": headers,
+                            "items": items,
+                            "height": "30rem",
+                            "density": "compact",
+                            "fixed-header": True,
+                            "hide-no-data": True,
+                            "hover": True
+                        }
+                    }
+                ]
+            }
+        ]
 
     def stop_service(self):
         """
@@ -2,8 +2,10 @@ import hashlib
 import os
 import re
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from pathlib import Path
+from queue import Queue, Empty
 from threading import Event
 from typing import Any, Dict, List, Optional, Tuple, Union
 
@@ -21,6 +23,8 @@ from app.helper.sites import SitesHelper
 from app.helper.torrent import TorrentHelper
 from app.log import logger
 from app.plugins import _PluginBase
+from app.plugins.crossseed.seedcache import SeedCache
+from app.plugins.crossseed.torrentindex import TorrentMetaIndex
 from app.schemas import NotificationType, ServiceInfo
 from app.schemas.types import EventType
 from app.utils.string import StringUtils
@@ -171,6 +175,38 @@ class CrossSeedHelper(object):
         return remote_torrent_infos, None
 
 
+class SiteQueryBatcher(object):
+    """
+    站点查询自适应分批，根据站点的响应耗时及出错情况调整每批查询的种子数
+    """
+
+    def __init__(self, size: int = 100, min_size: int = 20, max_size: int = 400,
+                 fast_seconds: float = 2, slow_seconds: float = 6):
+        self.size = size
+        self.min_size = min_size
+        self.max_size = max_size
+        # 响应耗时低于该值时扩大批次
+        self.fast_seconds = fast_seconds
+        # 响应耗时高于该值时缩小批次
+        self.slow_seconds = slow_seconds
+        # 连续出错次数
+        self.errors = 0
+
+    def feedback(self, elapsed: float, success: bool):
+        """
+        根据本批次的查询结果调整批次大小
+        """
+        if not success:
+            self.errors += 1
+            self.size = max(self.min_size, self.size // 2)
+            return
+        self.errors = 0
+        if elapsed > self.slow_seconds:
+            self.size = max(self.min_size, self.size * 2 // 3)
+        elif elapsed < self.fast_seconds:
+            self.size = min(self.max_size, self.size * 3 // 2)
+
+
 class CrossSeed(_PluginBase):
     # 插件名称
     plugin_name = "青蛙辅种助手"
@@ -179,7 +215,7 @@ class CrossSeed(_PluginBase):
     # 插件图标
     plugin_icon = "qingwa.png"
     # 插件版本
-    plugin_version = "3.0.1"
+    plugin_version = "3.0.4"
     # 插件作者
     plugin_author = "233@qingwa"
     # 作者主页
@@ -212,14 +248,26 @@ class CrossSeed(_PluginBase):
     # 待校全种子hash清单
     _recheck_torrents = {}
     _is_recheck_running = False
-    # 辅种缓存，出错的种子不再重复辅种，可清除
-    _error_caches = []
+    # 辅种缓存，出错的种子在过期前不再重复辅种，可清除
+    _error_caches: Optional[SeedCache] = None
     # 辅种缓存，辅种成功的种子，可清除
-    _success_caches = []
+    _success_caches: Optional[SeedCache] = None
     # 辅种缓存，出错的种子不再重复辅种，且无法清除。种子被删除404等情况
-    _permanent_error_caches = []
+    _permanent_error_caches: Optional[SeedCache] = None
+    # 单个辅种缓存的容量上限，超出时淘汰最久未使用的记录
+    _cache_maxsize = 100000
+    # 出错种子的缓存过期时间（秒）
+    _error_cache_ttl = 3 * 24 * 3600
     _torrentpaths = []
     _site_cs_infos = []
+    # 本地种子文件元数据索引
+    _torrent_index: Optional[TorrentMetaIndex] = None
+    # 并发解析种子文件的线程数
+    _parse_workers = 4
+    # 并发查询的站点数
+    _query_workers = 4
+    # 站点连续查询出错次数上限，超过后停止查询该站点
+    _query_max_errors = 5
     # 辅种计数
     total = 0
     realtotal = 0
@@ -245,9 +293,6 @@ class CrossSeed(_PluginBase):
             self._nolabels = config.get("nolabels")
             self._nopaths = config.get("nopaths")
             self._clearcache = config.get("clearcache")
-            self._permanent_error_caches = [] if self._clearcache else config.get("permanent_error_caches") or []
-            self._error_caches = [] if self._clearcache else config.get("error_caches") or []
-            self._success_caches = [] if self._clearcache else config.get("success_caches") or []
 
             # 过滤掉已删除的站点
             inner_site_list = SiteOper().list_order_by_pri()
@@ -315,6 +360,9 @@ class CrossSeed(_PluginBase):
 
             self.__update_config()
 
+        # 加载辅种缓存
+        self.__load_caches(config or {})
+
         # 停止现有任务
         self.stop_service()
 
@@ -750,10 +798,55 @@ class CrossSeed(_PluginBase):
             "sites": self._sites,
             "notify": self._notify,
             "nolabels": self._nolabels,
-            "nopaths": self._nopaths,
-            "success_caches": self._success_caches,
-            "error_caches": self._error_caches,
-            "permanent_error_caches": self._permanent_error_caches
+            "nopaths": self._nopaths
+        })
+
+    def __load_caches(self, config: dict):
+        """
+        加载辅种缓存，缓存保存在插件数据中，并迁移历史版本保存在配置中的缓存
+        """
+        caches = {} if self._clearcache else self.get_data("seed_caches") or {}
+        self._success_caches = SeedCache(maxsize=self._cache_maxsize,
+                                         items=caches.get("success"))
+        self._error_caches = SeedCache(maxsize=self._cache_maxsize, ttl=self._error_cache_ttl,
+                                       items=caches.get("error"))
+        self._permanent_error_caches = SeedCache(maxsize=self._cache_maxsize,
+                                                 items=caches.get("permanent_error"))
+        if not self._clearcache:
+            # 历史版本的缓存保存在配置中，保存配置时不再写入
+            self._success_caches.update(config.get("success_caches"))
+            self._error_caches.update(config.get("error_caches"))
+            self._permanent_error_caches.update(config.get("permanent_error_caches"))
+        self.__save_caches()
+
+    def __get_torrent_index(self) -> TorrentMetaIndex:
+        """
+        获取本地种子文件元数据索引
+        """
+        if not self._torrent_index:
+            self._torrent_index = TorrentMetaIndex(self.get_data_path() / "torrent_index.db")
+        return self._torrent_index
+
+    def __get_local_torrent_info(self, torrent_path: Path) -> Tuple[Optional[TorInfo], str]:
+        """
+        通过元数据索引读取种子文件信息，种子文件未变化时无需重新解析
+        """
+        meta, err = self.__get_torrent_index().get(torrent_path)
+        if not meta:
+            return None, err
+        info_hash, pieces_hash, announce = meta
+        local_tor = TorInfo.local(torrent_path=str(torrent_path), info_hash=info_hash, pieces_hash=pieces_hash)
+        local_tor.torrent_announce = announce
+        return local_tor, ""
+
+    def __save_caches(self):
+        """
+        保存辅种缓存
+        """
+        self.save_data("seed_caches", {
+            "success": self._success_caches.dump(),
+            "error": self._error_caches.dump(),
+            "permanent_error": self._permanent_error_caches.dump()
         })
 
     def auto_seed(self):
@@ -772,6 +865,9 @@ class CrossSeed(_PluginBase):
         self.exist = 0
         self.fail = 0
         self.cached = 0
+        torrent_index = self.__get_torrent_index()
+        # 本次扫描到的种子文件，扫描完成后清理索引中已不存在的记录
+        indexed_paths = set()
         # 扫描下载器辅种
         for idx, service in enumerate(self.service_infos.values()):
             downloader = service.name
@@ -779,15 +875,27 @@ class CrossSeed(_PluginBase):
             logger.info(f"开始扫描下载器 {downloader} ...")
             # 获取下载器中已完成的种子
             torrents = downloader_obj.get_completed_torrents()
+            if torrents is None:
+                # 下载器无法连接时保留其种子目录下的索引记录，避免下次全部重新解析
+                logger.warn(f"下载器 {downloader} 获取已完成种子失败")
+                indexed_paths.update(torrent_index.paths_under(self._torrentpaths[idx]))
+                continue
             if torrents:
                 logger.info(f"下载器 {downloader} 已完成种子数：{len(torrents)}")
             else:
                 logger.info(f"下载器 {downloader} 没有已完成种子")
                 continue
+            # 预先并发解析新增或变化的种子文件，其余种子直接使用索引中的元数据
+            torrent_paths = [Path(self._torrentpaths[idx]) / f"{self.__get_hash(torrent, service.type)}.torrent"
+                             for torrent in torrents]
+            indexed_paths.update(str(path) for path in torrent_paths)
+            parsed_count = torrent_index.prefetch(torrent_paths, workers=self._parse_workers)
+            logger.info(f"下载器 {downloader} 新解析种子文件数：{parsed_count}，索引种子文件数：{len(torrent_index)}")
             hash_strs = []
             for torrent in torrents:
                 if self._event.is_set():
                     logger.info("辅种服务停止")
+                    torrent_index.flush()
                     return
                     # 获取种子hash
                 hash_str = self.__get_hash(torrent, service.type)
@@ -817,7 +925,7 @@ class CrossSeed(_PluginBase):
 
                 # 读取种子文件具体信息
                 if not torrent_info:
-                    torrent_info, err = self.cross_helper.get_local_torrent_info(torrent_path)
+                    torrent_info, err = self.__get_local_torrent_info(torrent_path)
                     if not torrent_info:
                         logger.error(f"未能读取到种子文件具体信息：{torrent_path} {err}")
                         continue
@@ -883,7 +991,8 @@ class CrossSeed(_PluginBase):
             else:
                 logger.info("没有需要辅种的种子")
         # 保存缓存
-        self.__update_config()
+        self.__save_caches()
+        torrent_index.flush(keep_paths=indexed_paths)
         # 发送消息
         if self._notify:
             if self.success or self.fail:
@@ -971,72 +1080,133 @@ class CrossSeed(_PluginBase):
         logger.info(f"去重后，总共需要辅种查询的种子数：{len(pieces_hash_set)}")
         pieces_hashes = list(pieces_hash_set)
 
-        # 分站点逐个批次辅种
-        # 逐个站点查询可辅种数据
-        chunk_size = 100
+        # 过滤已经停用的站点
+        site_configs = []
         for site_config in self._site_cs_infos:
-            # 检查站点是否已经停用
             db_site = SiteOper().get(site_config.id)
             if db_site and not db_site.is_active:
                 logger.info(f"站点{site_config.name}已停用，跳过辅种")
                 continue
-            remote_tors: List[TorInfo] = []
-            total_size = len(pieces_hashes)
-            for i in range(0, len(pieces_hashes), chunk_size):
+            site_configs.append(site_config)
+        if not site_configs:
+            return
+
+        # 各站点并发查询可辅种数据，每个站点内部按各自的请求间隔依次分批查询，查询结果按批次依次进入下载阶段
+        results: Queue = Queue()
+        executor = ThreadPoolExecutor(max_workers=min(len(site_configs), self._query_workers),
+                                      thread_name_prefix="CrossSeed-Query")
+        try:
+            for site_config in site_configs:
+                executor.submit(self.__query_site_torrents, site_config, pieces_hashes, results)
+            pending = len(site_configs)
+            while pending:
                 if self._event.is_set():
                     logger.info("辅种服务停止")
                     return
+                try:
+                    site_config, chunk_tors = results.get(timeout=1)
+                except Empty:
+                    continue
+                # 站点查询完成
+                if chunk_tors is None:
+                    pending -= 1
+                    continue
+                self.__seed_site_torrents(site_config=site_config,
+                                          remote_tors=chunk_tors,
+                                          site_pieces_hash_set=site_pieces_hash_set,
+                                          save_paths=save_paths,
+                                          service=service)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        logger.info(f"下载器 {service.name} 辅种完成")
+
+    def __query_site_torrents(self, site_config: CSSiteConfig, pieces_hashes: List[str], results: Queue):
+        """
+        分批查询站点可辅种的种子，在线程池中执行，每批结果放入队列，查询结束时放入None
+        """
+        batcher = SiteQueryBatcher()
+        total_size = len(pieces_hashes)
+        remote_count = 0
+        pos = 0
+        try:
+            while pos < total_size:
+                if self._event.is_set():
+                    return
                 # 切片操作
-                chunk = pieces_hashes[i:i + chunk_size]
+                chunk = pieces_hashes[pos:pos + batcher.size]
                 # 处理分组
+                start_time = time.time()
                 chunk_tors, err_msg = self.cross_helper.get_target_torrent(site_config, chunk)
+                # 扣除请求间隔后的实际响应耗时
+                elapsed = time.time() - start_time - (site_config.query_gap if chunk_tors is not None else 0)
                 if not chunk_tors and err_msg:
                     logger.info(
-                        f"查询站点{site_config.name}可辅种的信息出错 {err_msg},进度={i + 1}/{total_size}"
+                        f"查询站点{site_config.name}可辅种的信息出错 {err_msg},进度={pos + 1}/{total_size}"
                     )
+                    batcher.feedback(elapsed=elapsed, success=False)
+                    if batcher.errors >= self._query_max_errors:
+                        logger.warn(f"站点{site_config.name}连续{batcher.errors}次查询出错，停止查询该站点")
+                        return
+                    # 出错时同样遵守站点的请求间隔
+                    if self._event.wait(site_config.query_gap):
+                        return
+                    # 批次大于下限时缩小批次重试，否则跳过该批次
+                    if len(chunk) > batcher.min_size:
+                        continue
                 else:
                     logger.info(
-                        f"站点{site_config.name}本批次的可辅种/查询数={len(chunk_tors)}/{len(chunk)},进度={i + 1}/{total_size}"
+                        f"站点{site_config.name}本批次的可辅种/查询数={len(chunk_tors)}/{len(chunk)},进度={pos + 1}/{total_size}"
                     )
-                    remote_tors = remote_tors + chunk_tors
-
-            logger.info(f"站点{site_config.name}返回可以辅种的种子总数为{len(remote_tors)}")
-
-            # 去除已经下载过的种子
-            local_cnt = 0
-            not_local_tors = []
-            for tor_info in remote_tors:
-                if (
-                        tor_info
-                        and tor_info.site_name
-                        and tor_info.pieces_hash
-                        and tor_info.get_name_pieces_tag() in site_pieces_hash_set
-                ):
-                    local_cnt = local_cnt + 1
-                else:
-                    not_local_tors.append(tor_info)
-            logger.info(f"站点{site_config.name}正在做种或已经辅种过的种子数为{local_cnt}")
-
-            for tor_info in not_local_tors:
-                if self._event.is_set():
-                    logger.info("辅种服务停止")
-                    return
-                if not tor_info:
-                    continue
-                if not tor_info.torrent_id or not tor_info.pieces_hash:
-                    continue
-                if tor_info.get_name_id_tag() in self._success_caches:
-                    logger.info(f"{tor_info.get_name_id_tag()} 已处理过辅种，跳过 ...")
-                    continue
-                if tor_info.get_name_id_tag() in self._error_caches or tor_info.get_name_id_tag() in self._permanent_error_caches:
-                    logger.info(f"种子 {tor_info.get_name_id_tag()} 辅种失败且已缓存，跳过 ...")
-                    continue
-                # 添加任务
-                self.__download_torrent(tor=tor_info, site_config=site_config,
-                                        service=service,
-                                        save_path=save_paths.get(tor_info.pieces_hash))
+                    batcher.feedback(elapsed=elapsed, success=True)
+                    if chunk_tors:
+                        remote_count += len(chunk_tors)
+                        results.put((site_config, chunk_tors))
+                pos += len(chunk)
+            logger.info(f"站点{site_config.name}返回可以辅种的种子总数为{remote_count}")
+        except Exception as e:
+            logger.error(f"查询站点{site_config.name}可辅种的信息出错：{str(e)}")
+        finally:
+            results.put((site_config, None))
 
-        logger.info(f"下载器 {service.name} 辅种完成")
+    def __seed_site_torrents(self, site_config: CSSiteConfig, remote_tors: List[TorInfo],
+                             site_pieces_hash_set: set, save_paths: dict, service: ServiceInfo):
+        """
+        针对站点返回的一批可辅种种子，去除已经下载过的种子后添加辅种下载
+        """
+        # 去除已经下载过的种子
+        local_cnt = 0
+        not_local_tors = []
+        for tor_info in remote_tors:
+            if (
+                    tor_info
+                    and tor_info.site_name
+                    and tor_info.pieces_hash
+                    and tor_info.get_name_pieces_tag() in site_pieces_hash_set
+            ):
+                local_cnt = local_cnt + 1
+            else:
+                not_local_tors.append(tor_info)
+        logger.info(f"站点{site_config.name}本批次正在做种或已经辅种过的种子数为{local_cnt}")
+
+        for tor_info in not_local_tors:
+            if self._event.is_set():
+                logger.info("辅种服务停止")
+                return
+            if not tor_info:
+                continue
+            if not tor_info.torrent_id or not tor_info.pieces_hash:
+                continue
+            if tor_info.get_name_id_tag() in self._success_caches:
+                logger.info(f"{tor_info.get_name_id_tag()} 已处理过辅种，跳过 ...")
+                continue
+            if tor_info.get_name_id_tag() in self._error_caches or tor_info.get_name_id_tag() in self._permanent_error_caches:
+                logger.info(f"种子 {tor_info.get_name_id_tag()} 辅种失败且已缓存，跳过 ...")
+                continue
+            # 添加任务
+            self.__download_torrent(tor=tor_info, site_config=site_config,
+                                    service=service,
+                                    save_path=save_paths.get(tor_info.pieces_hash))
 
     @staticmethod
     def __download(service: ServiceInfo, content: Union[bytes, str],
@@ -1106,10 +1276,10 @@ class CrossSeed(_PluginBase):
             self.cached += 1
             # 加入失败缓存
             if error_msg and ('无法打开链接' in error_msg or '触发站点流控' in error_msg):
-                self._error_caches.append(tor.get_name_id_tag())
+                self._error_caches.add(tor.get_name_id_tag())
             else:
                 # 种子不存在的情况
-                self._permanent_error_caches.append(tor.get_name_id_tag())
+                self._permanent_error_caches.add(tor.get_name_id_tag())
             logger.error(f"下载种子文件失败：{tor.get_name_id_tag()}")
             return False
 
@@ -1120,7 +1290,7 @@ class CrossSeed(_PluginBase):
             tors, msg = downloader_obj.get_torrents(ids=[tmp_tor_info.info_hash])
             if tors:
                 self.exist += 1
-                self._success_caches.append(tor.get_name_id_tag())
+                self._success_caches.add(tor.get_name_id_tag())
                 logger.info(f"下载的种子{tor.get_name_id_tag()}已存在, 跳过")
                 return True
         else:
@@ -1136,7 +1306,7 @@ class CrossSeed(_PluginBase):
             self.fail += 1
             self.cached += 1
             # 加入失败缓存
-            self._error_caches.append(tor.get_name_id_tag())
+            self._error_caches.add(tor.get_name_id_tag())
             return False
         else:
             self.success += 1
@@ -1149,7 +1319,7 @@ class CrossSeed(_PluginBase):
             # 下载成功
             logger.info(f"成功添加辅种下载，站点种子：{tor.get_name_id_tag()}")
             # 成功也加入缓存，有一些改了路径校验不通过的，手动删除后，下一次又会辅上
-            self._success_caches.append(tor.get_name_id_tag())
+            self._success_caches.add(tor.get_name_id_tag())
             return True
 
     def __add_recheck_torrents(self, service: ServiceInfo, download_id: str):
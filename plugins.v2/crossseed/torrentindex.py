@@ -0,0 +1,258 @@
+import hashlib
+import mmap
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from bencode import bdecode, bencode
+
+from app.log import logger
+
+# 种子元数据：info_hash、pieces_hash、announce
+TorrentMeta = Tuple[str, str, Optional[str]]
+
+
+class TorrentMetaIndex:
+    """
+    本地种子文件元数据索引，按(种子路径, 修改时间, 文件大小)缓存info_hash、pieces_hash及announce，
+    仅在种子文件新增或变化时重新解析
+    """
+
+    def __init__(self, db_path: Path):
+        self._db_path = str(db_path)
+        self._lock = threading.RLock()
+        # 种子路径 -> (修改时间, 文件大小, 元数据)
+        self._entries: Dict[str, Tuple[float, int, TorrentMeta]] = {}
+        # 尚未写入数据库的种子路径
+        self._dirty: set = set()
+        self.__init_db()
+
+    @contextmanager
+    def __session(self):
+        """
+        打开数据库连接，退出时提交事务并关闭连接
+        """
+        conn = sqlite3.connect(self._db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def __init_db(self):
+        with self._lock, self.__session() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS torrent_meta (
+                    path TEXT PRIMARY KEY,
+                    mtime REAL NOT NULL,
+                    size INTEGER NOT NULL,
+                    info_hash TEXT NOT NULL,
+                    pieces_hash TEXT NOT NULL,
+                    announce TEXT
+                )
+            """)
+            rows = conn.execute(
+                "SELECT path, mtime, size, info_hash, pieces_hash, announce FROM torrent_meta").fetchall()
+        self._entries = {path: (mtime, size, (info_hash, pieces_hash, announce))
+                         for path, mtime, size, info_hash, pieces_hash, announce in rows}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, torrent_path: Path | str) -> Tuple[Optional[TorrentMeta], str]:
+        """
+        获取种子文件元数据，索引未命中或种子文件发生变化时重新解析
+        """
+        path = str(torrent_path)
+        try:
+            stat = os.stat(path)
+        except OSError as err:
+            return None, str(err)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry and entry[0] == stat.st_mtime and entry[1] == stat.st_size:
+                return entry[2], ""
+        meta, err = self.parse(path)
+        if meta:
+            self.__put(path, stat, meta)
+        return meta, err
+
+    def prefetch(self, torrent_paths: Iterable[Path | str], workers: int = 4) -> int:
+        """
+        批量并发解析索引中不存在或已变化的种子文件
+        :return: 本次解析的种子文件数
+        """
+        pending: List[Tuple[str, os.stat_result]] = []
+        with self._lock:
+            for torrent_path in torrent_paths:
+                path = str(torrent_path)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entry = self._entries.get(path)
+                if entry and entry[0] == stat.st_mtime and entry[1] == stat.st_size:
+                    continue
+                pending.append((path, stat))
+        if not pending:
+            return 0
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(pending))),
+                                thread_name_prefix="CrossSeed-Parse") as executor:
+            results = executor.map(lambda item: self.parse(item[0]), pending)
+            for (path, stat), (meta, err) in zip(pending, results):
+                if meta:
+                    self.__put(path, stat, meta)
+                else:
+                    logger.debug(f"解析种子文件出错：{path} {err}")
+        return len(pending)
+
+    def paths_under(self, directory: Path | str) -> List[str]:
+        """
+        获取索引中位于指定目录下的种子路径
+        """
+        directory = Path(directory)
+        with self._lock:
+            return [path for path in self._entries if Path(path).parent == directory]
+
+    def flush(self, keep_paths: Optional[Iterable[Path | str]] = None):
+        """
+        将新增或变化的元数据写入数据库，传入keep_paths时同时清理其余已不存在的种子记录
+        """
+        with self._lock:
+            removed = []
+            if keep_paths is not None:
+                keep = {str(path) for path in keep_paths}
+                removed = [path for path in self._entries if path not in keep]
+                for path in removed:
+                    del self._entries[path]
+                    self._dirty.discard(path)
+            rows = [(path,) + self._entries[path][:2] + self._entries[path][2] for path in self._dirty]
+            if not rows and not removed:
+                return
+            with self.__session() as conn:
+                if rows:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO torrent_meta (path, mtime, size, info_hash, pieces_hash, announce) "
+                        "VALUES (?, ?, ?, ?, ?, ?)", rows)
+                if removed:
+                    conn.executemany("DELETE FROM torrent_meta WHERE path = ?", [(path,) for path in removed])
+            self._dirty.clear()
+
+    def clear(self):
+        """
+        清空索引
+        """
+        with self._lock, self.__session() as conn:
+            conn.execute("DELETE FROM torrent_meta")
+            self._entries.clear()
+            self._dirty.clear()
+
+    def __put(self, path: str, stat: os.stat_result, meta: TorrentMeta):
+        with self._lock:
+            self._entries[path] = (stat.st_mtime, stat.st_size, meta)
+            self._dirty.add(path)
+
+    @staticmethod
+    def parse(torrent_path: str) -> Tuple[Optional[TorrentMeta], str]:
+        """
+        解析种子文件元数据，通过内存映射按字节定位info及pieces，无需解码整个种子结构，
+        定位失败时回退到完整解码
+        """
+        try:
+            with open(torrent_path, "rb") as f:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                    return TorrentMetaIndex.__scan(buf), ""
+        except Exception as err:
+            logger.debug(f"定位种子文件结构失败，尝试完整解码：{torrent_path} {err}")
+        try:
+            with open(torrent_path, "rb") as f:
+                torrent = bdecode(f.read())
+            info = torrent["info"]
+            announce = torrent.get("announce")
+            return (hashlib.sha1(bencode(info)).hexdigest(),
+                    hashlib.sha1(info["pieces"]).hexdigest(),
+                    announce.decode("utf-8", "ignore") if isinstance(announce, bytes) else announce), ""
+        except Exception as err:
+            return None, str(err)
+
+    @staticmethod
+    def __scan(buf: mmap.mmap) -> TorrentMeta:
+        """
+        扫描bencode结构，获取info字典的原始字节范围、pieces的字节范围及announce
+        """
+        if buf[0:1] != b"d":
+            raise ValueError("种子文件格式错误")
+        view = memoryview(buf)
+        try:
+            info_range, announce = None, None
+            pos = 1
+            while buf[pos:pos + 1] != b"e":
+                key_start, key_end, pos = TorrentMetaIndex.__string_range(buf, pos)
+                value_start = pos
+                pos = TorrentMetaIndex.__skip(buf, pos)
+                key = buf[key_start:key_end]
+                if key == b"info":
+                    info_range = (value_start, pos)
+                elif key == b"announce":
+                    start, end, _ = TorrentMetaIndex.__string_range(buf, value_start)
+                    announce = buf[start:end].decode("utf-8", "ignore")
+            if not info_range:
+                raise ValueError("种子文件缺少info")
+            pieces_range = None
+            pos = info_range[0] + 1
+            while buf[pos:pos + 1] != b"e":
+                key_start, key_end, pos = TorrentMetaIndex.__string_range(buf, pos)
+                if buf[key_start:key_end] == b"pieces":
+                    start, end, pos = TorrentMetaIndex.__string_range(buf, pos)
+                    pieces_range = (start, end)
+                else:
+                    pos = TorrentMetaIndex.__skip(buf, pos)
+            if not pieces_range:
+                raise ValueError("种子文件缺少pieces")
+            info_hash = hashlib.sha1(view[info_range[0]:info_range[1]]).hexdigest()
+            pieces_hash = hashlib.sha1(view[pieces_range[0]:pieces_range[1]]).hexdigest()
+            return info_hash, pieces_hash, announce
+        finally:
+            view.release()
+
+    @staticmethod
+    def __string_range(buf: mmap.mmap, pos: int) -> Tuple[int, int, int]:
+        """
+        获取bencode字符串内容的字节范围
+        :return: 内容起始位置、内容结束位置、下一个元素位置
+        """
+        colon = buf.find(b":", pos)
+        if colon < 0:
+            raise ValueError("种子文件格式错误")
+        start = colon + 1
+        end = start + int(buf[pos:colon])
+        if end > len(buf):
+            raise ValueError("种子文件格式错误")
+        return start, end, end
+
+    @staticmethod
+    def __skip(buf: mmap.mmap, pos: int) -> int:
+        """
+        跳过一个bencode元素，返回下一个元素位置
+        """
+        token = buf[pos:pos + 1]
+        if token == b"i":
+            end = buf.find(b"e", pos)
+            if end < 0:
+                raise ValueError("种子文件格式错误")
+            return end + 1
+        if token in (b"l", b"d"):
+            pos += 1
+            while buf[pos:pos + 1] != b"e":
+                if not buf[pos:pos + 1]:
+                    raise ValueError("种子文件格式错误")
+                pos = TorrentMetaIndex.__skip(buf, pos)
+            return pos + 1
+        if token.isdigit():
+            return TorrentMetaIndex.__string_range(buf, pos)[2]
+        raise ValueError("种子文件格式错误")
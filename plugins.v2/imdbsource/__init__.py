@@ -1,3 +1,4 @@
+import functools
 import re
 import urllib.parse
 from datetime import datetime
@@ -12,9 +13,13 @@ from app.core.config import settings
 from app.core.context import MediaInfo
 from app.core.event import eventmanager, Event
 from app.core.meta import MetaBase
+from app.db import SessionFactory
+from app.db.models import TransferHistory
 from app.plugins import _PluginBase
 from app.plugins.imdbsource.imdbhelper import ImdbHelper
 from app.plugins.imdbsource.officialapi import INTERESTS_ID
+from app.plugins.imdbsource.recognizecache import RecognizeCache
+from app.plugins.imdbsource.titleindex import TitleIndex
 from app.plugins.imdbsource.schema import StaffPickEntry, ImdbTitle, StaffPickApiResponse, ImdbMediaInfo, SearchParams
 from app.log import logger
 from app.schemas import DiscoverSourceEventData, MediaRecognizeConvertEventData, RecommendSourceEventData
@@ -30,7 +35,7 @@ class ImdbSource(_PluginBase):
     # 插件图标
     plugin_icon = "IMDb_IOS-OSX_App.png"
     # 插件版本
-    plugin_version = "1.6.2"
+    plugin_version = "1.6.5"
     # 插件作者
     plugin_author = "wumode"
     # 作者主页
@@ -51,6 +56,7 @@ class ImdbSource(_PluginBase):
     _component_size: str = 'medium'
     _chinese_component: bool = False
     _recognition_mode: str = 'auxiliary'
+    _concurrent_recognize: bool = False
     _interval: int = 10
 
     # 私有属性
@@ -59,6 +65,20 @@ class ImdbSource(_PluginBase):
     _original_method: Optional[Callable] = None
     _original_async_method: Optional[Callable[..., Coroutine[Any, Any, Optional[MediaInfo]]]] = None
     _staff_picks_cache: Optional[StaffPickApiResponse] = None
+    # 并发识别的最大并发查询数
+    _recognize_concurrency: int = 4
+    # 识别结果缓存
+    _recognize_cache: Optional[RecognizeCache] = None
+    # 识别成功结果的缓存有效期（秒）
+    _cache_ttl: int = 30 * 24 * 3600
+    # 未识别到结果的缓存有效期（秒）
+    _negative_cache_ttl: int = 24 * 3600
+    # 本地条目索引
+    _title_index: Optional[TitleIndex] = None
+    # 本地条目索引最多保留的条目数
+    _title_index_size: int = 20000
+    # 本地条目索引名称近似匹配的最低相似度
+    _title_similarity: float = 0.9
 
     def init_plugin(self, config: dict = None):
 
@@ -124,14 +144,21 @@ class ImdbSource(_PluginBase):
                     self._interests = [self._interests]
             self._component_size = config.get("component_size") or "medium"
             self._recognition_mode = config.get("recognition_mode") or "auxiliary"
+            self._concurrent_recognize = config.get("concurrent_recognize")
             self._update_config()
 
-        self._imdb_helper = ImdbHelper(proxies=settings.PROXY if self._proxy else None)
+        self._close_title_index()
+        self._imdb_helper = ImdbHelper(proxies=settings.PROXY if self._proxy else None,
+                                       concurrency=self._recognize_concurrency if self._concurrent_recognize else 1,
+                                       title_index=self._init_title_index()
+                                       if self._enabled and self._recognize_media else None)
         if "media-amazon.com" not in settings.SECURITY_IMAGE_DOMAINS:
             settings.SECURITY_IMAGE_DOMAINS.append("media-amazon.com")
         if "media-imdb.com" not in settings.SECURITY_IMAGE_DOMAINS:
             settings.SECURITY_IMAGE_DOMAINS.append("media-imdb.com")
         if self._enabled:
+            if self._recognize_media:
+                self._init_recognize_cache()
 
             if self._recognize_media and self._recognition_mode == 'auxiliary':
                 # 替换 ChainBase.recognize_media
@@ -152,6 +179,59 @@ class ImdbSource(_PluginBase):
         else:
             self.stop_service()
 
+    def _init_recognize_cache(self):
+        """
+        初始化识别结果缓存，并使用整理历史中已知的 IMDb ID 与 TMDB ID 预热
+        """
+        self._close_recognize_cache()
+        try:
+            self._recognize_cache = RecognizeCache(self.get_data_path() / "recognize_cache.db",
+                                                   ttl=self._cache_ttl,
+                                                   negative_ttl=self._negative_cache_ttl)
+        except Exception as e:
+            logger.error(f"初始化识别结果缓存失败：{str(e)}")
+            self._recognize_cache = None
+            return
+        try:
+            with SessionFactory() as db:
+                mappings = db.query(TransferHistory.imdbid, TransferHistory.type, TransferHistory.tmdbid).filter(
+                    TransferHistory.imdbid.isnot(None), TransferHistory.tmdbid.isnot(None)).distinct().all()
+            count = self._recognize_cache.warm_up(mappings)
+            if count:
+                logger.info(f"已从整理历史预热 {count} 条 IMDb ID 映射")
+        except Exception as e:
+            logger.warn(f"从整理历史预热识别结果缓存失败：{str(e)}")
+
+    def _init_title_index(self) -> Optional[TitleIndex]:
+        """
+        初始化本地条目索引
+        """
+        try:
+            self._title_index = TitleIndex(self.get_data_path() / "title_index.db",
+                                           max_titles=self._title_index_size,
+                                           similarity=self._title_similarity)
+        except Exception as e:
+            logger.error(f"初始化本地条目索引失败：{str(e)}")
+            return None
+        logger.info(f"已加载本地条目索引：{len(self._title_index)} 条")
+        return self._title_index
+
+    def _close_title_index(self):
+        """
+        写入本地条目索引中剩余的记录并关闭
+        """
+        if self._title_index:
+            self._title_index.close()
+            self._title_index = None
+
+    def _close_recognize_cache(self):
+        """
+        写入识别结果缓存中剩余的记录并关闭
+        """
+        if self._recognize_cache:
+            self._recognize_cache.close()
+            self._recognize_cache = None
+
     def get_service(self) -> List[Dict[str, Any]]:
         if self.get_state() and self._staff_picks:
             return [
@@ -682,6 +762,29 @@ class ImdbSource(_PluginBase):
                             }
                         ],
                     },
+                    {
+                        "component": "VRow",
+                        "content": [
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 3
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VSwitch',
+                                        'props': {
+                                            'model': 'concurrent_recognize',
+                                            'label': '并发识别',
+                                            'hint': '同时查询各候选名称及类型，按原有优先级取结果',
+                                            'persistent-hint': True
+                                        }
+                                    }
+                                ]
+                            }
+                        ],
+                    },
                     {
                         'component': 'VExpansionPanels',
                         'props': {
@@ -882,6 +985,7 @@ class ImdbSource(_PluginBase):
             "interests": ['Anime', 'Documentary', 'Sitcom'],
             "component_size": "medium",
             "recognition_mode": "auxiliary",
+            "concurrent_recognize": False,
             "interval": 10
         }
 
@@ -892,6 +996,8 @@ class ImdbSource(_PluginBase):
         """
         退出插件
         """
+        self._close_recognize_cache()
+        self._close_title_index()
         if (getattr(ChainBase.recognize_media, "_patched_by", object()) == id(self) and
                 self._original_method):
             ChainBase.recognize_media = self._original_method
@@ -923,6 +1029,7 @@ class ImdbSource(_PluginBase):
                 "interests": self._interests,
                 "component_size": self._component_size,
                 "recognition_mode": self._recognition_mode,
+                "concurrent_recognize": self._concurrent_recognize,
                 "chinese_component": self._chinese_component,
                 "interval": self._interval
             }
@@ -1775,31 +1882,16 @@ class ImdbSource(_PluginBase):
         # 简体名称
         zh_name = zhconv.convert(meta.cn_name, 'zh-hans') if meta.cn_name else None
         names = list(dict.fromkeys([k for k in [meta.cn_name, zh_name, meta.en_name] if k]))
-        for name in names:
-            if meta.begin_season:
-                logger.info(f"正在识别 {name} 第{meta.begin_season}季 ...")
-            else:
-                logger.info(f"正在识别 {name} ...")
-            if meta.type == MediaType.UNKNOWN and not meta.year:
-                info = self._imdb_helper.match_by(name)
-            else:
-                if meta.type == MediaType.TV:
-                    info = self._imdb_helper.match(name=name, year=meta.year, mtype=meta.type, season_year=meta.year,
-                                                   season_number=meta.begin_season)
-                    if not info:
-                        # 去掉年份再查一次
-                        info = self._imdb_helper.match(name=name, mtype=meta.type)
-                else:
-                    # 有年份先按电影查
-                    info = self._imdb_helper.match(name=name, year=meta.year, mtype=MediaType.MOVIE)
-                    # 没有再按电视剧查
-                    if not info:
-                        info = self._imdb_helper.match(name=name, year=meta.year, mtype=MediaType.TV)
-                    if not info:
-                        # 去掉年份和类型再查一次
-                        info = self._imdb_helper.match_by(name=name)
-            if info:
-                break
+        cache_key = RecognizeCache.query_key(names, mtype=meta.type.value if meta.type else None,
+                                             year=meta.year, season=meta.begin_season)
+        cached, info = self._get_cached_recognize(cache_key)
+        if cached and not info:
+            logger.info(f"{meta.name} 近期未能通过 IMDb 识别，跳过")
+            return None
+        if not cached:
+            with ImdbHelper.search_failures() as failures:
+                info = self._match_names(meta, names)
+            self._save_cached_recognize(cache_key, info, failures)
         if info:
             info = self._imdb_helper.update_info(info.id, info=info)
             mediainfo = ImdbHelper.convert_mediainfo(info)
@@ -1844,6 +1936,75 @@ class ImdbSource(_PluginBase):
         # 简体名称
         zh_name = zhconv.convert(meta.cn_name, 'zh-hans') if meta.cn_name else None
         names = list(dict.fromkeys([k for k in [meta.cn_name, zh_name, meta.en_name] if k]))
+        cache_key = RecognizeCache.query_key(names, mtype=meta.type.value if meta.type else None,
+                                             year=meta.year, season=meta.begin_season)
+        cached, info = self._get_cached_recognize(cache_key)
+        if cached and not info:
+            logger.info(f"{meta.name} 近期未能通过 IMDb 识别，跳过")
+            return None
+        if not cached:
+            with ImdbHelper.search_failures() as failures:
+                if self._concurrent_recognize:
+                    info = await self._async_concurrent_match(meta, names)
+                else:
+                    info = await self._async_match_names(meta, names)
+            self._save_cached_recognize(cache_key, info, failures)
+        if info:
+            info = await self._imdb_helper.async_update_info(info.id, info=info)
+            mediainfo = ImdbHelper.convert_mediainfo(info)
+            mediainfo.tmdb_id = await self.async_imdb_to_tmdb(info.id, mediainfo)
+            cat = ImdbHelper.get_category(ImdbHelper.type_to_mtype(info.type.value),
+                                          info.dict(by_alias=True, exclude_none=True))
+            mediainfo.set_category(cat)
+            logger.info(f"{meta.name} IMDb 识别结果：{mediainfo.type.value} "
+                        f"{mediainfo.title_year} "
+                        f"{mediainfo.imdb_id}")
+            return mediainfo
+        return None
+
+    def _match_names(self, meta: MetaBase, names: List[str]) -> Optional[ImdbMediaInfo]:
+        """
+        逐个查询各候选名称，返回第一个匹配结果
+        :param meta: 识别的元数据
+        :param names: 候选名称
+        :return: 匹配的媒体信息
+        """
+        info = None
+        for name in names:
+            if meta.begin_season:
+                logger.info(f"正在识别 {name} 第{meta.begin_season}季 ...")
+            else:
+                logger.info(f"正在识别 {name} ...")
+            if meta.type == MediaType.UNKNOWN and not meta.year:
+                info = self._imdb_helper.match_by(name)
+            else:
+                if meta.type == MediaType.TV:
+                    info = self._imdb_helper.match(name=name, year=meta.year, mtype=meta.type,
+                                                   season_year=meta.year, season_number=meta.begin_season)
+                    if not info:
+                        # 去掉年份再查一次
+                        info = self._imdb_helper.match(name=name, mtype=meta.type)
+                else:
+                    # 有年份先按电影查
+                    info = self._imdb_helper.match(name=name, year=meta.year, mtype=MediaType.MOVIE)
+                    # 没有再按电视剧查
+                    if not info:
+                        info = self._imdb_helper.match(name=name, year=meta.year, mtype=MediaType.TV)
+                    if not info:
+                        # 去掉年份和类型再查一次
+                        info = self._imdb_helper.match_by(name=name)
+            if info:
+                break
+        return info
+
+    async def _async_match_names(self, meta: MetaBase, names: List[str]) -> Optional[ImdbMediaInfo]:
+        """
+        逐个查询各候选名称，返回第一个匹配结果
+        :param meta: 识别的元数据
+        :param names: 候选名称
+        :return: 匹配的媒体信息
+        """
+        info = None
         for name in names:
             if meta.begin_season:
                 logger.info(f"正在识别 {name} 第{meta.begin_season}季 ...")
@@ -1861,27 +2022,79 @@ class ImdbSource(_PluginBase):
                         info = await self._imdb_helper.async_match(name=name, mtype=meta.type)
                 else:
                     # 有年份先按电影查
-                    info = await self._imdb_helper.async_match(name=name, year=meta.year, mtype=MediaType.MOVIE)
+                    info = await self._imdb_helper.async_match(name=name, year=meta.year,
+                                                               mtype=MediaType.MOVIE)
                     # 没有再按电视剧查
                     if not info:
-                        info = await self._imdb_helper.async_match(name=name, year=meta.year, mtype=MediaType.TV)
+                        info = await self._imdb_helper.async_match(name=name, year=meta.year,
+                                                                   mtype=MediaType.TV)
                     if not info:
                         # 去掉年份和类型再查一次
                         info = await self._imdb_helper.async_match_by(name=name)
             if info:
                 break
-        if info:
-            info = await self._imdb_helper.async_update_info(info.id, info=info)
-            mediainfo = ImdbHelper.convert_mediainfo(info)
-            mediainfo.tmdb_id = await self.async_imdb_to_tmdb(info.id, mediainfo)
-            cat = ImdbHelper.get_category(ImdbHelper.type_to_mtype(info.type.value),
-                                          info.dict(by_alias=True, exclude_none=True))
-            mediainfo.set_category(cat)
-            logger.info(f"{meta.name} IMDb 识别结果：{mediainfo.type.value} "
-                        f"{mediainfo.title_year} "
-                        f"{mediainfo.imdb_id}")
-            return mediainfo
-        return None
+        return info
+
+    async def _async_concurrent_match(self, meta: MetaBase, names: List[str]) -> Optional[ImdbMediaInfo]:
+        """
+        并发查询各候选名称，按逐个识别时的先后顺序返回第一个匹配结果
+        :param meta: 识别的元数据
+        :param names: 候选名称
+        :return: 匹配的媒体信息
+        """
+        if meta.begin_season:
+            logger.info(f"正在并发识别 {'、'.join(names)} 第{meta.begin_season}季 ...")
+        else:
+            logger.info(f"正在并发识别 {'、'.join(names)} ...")
+        helper = self._imdb_helper
+        lookups = []
+        for name in names:
+            if meta.type == MediaType.UNKNOWN and not meta.year:
+                lookups.append(functools.partial(helper.async_match_by, name))
+            elif meta.type == MediaType.TV:
+                lookups.extend(helper.async_match_steps(name=name, year=meta.year, mtype=meta.type,
+                                                        season_year=meta.year,
+                                                        season_number=meta.begin_season))
+                # 去掉年份再查一次
+                lookups.extend(helper.async_match_steps(name=name, mtype=meta.type))
+            else:
+                # 有年份先按电影查，没有再按电视剧查
+                lookups.extend(helper.async_match_steps(name=name, year=meta.year, mtype=MediaType.MOVIE))
+                lookups.extend(helper.async_match_steps(name=name, year=meta.year, mtype=MediaType.TV))
+                # 去掉年份和类型再查一次
+                lookups.append(functools.partial(helper.async_match_by, name=name))
+        return await ImdbHelper.async_first_match(lookups, concurrency=self._recognize_concurrency)
+
+    def _get_cached_recognize(self, cache_key: str) -> Tuple[bool, Optional[ImdbMediaInfo]]:
+        """
+        获取缓存的识别结果
+        :return: 是否命中缓存、识别结果
+        """
+        if not self._recognize_cache:
+            return False, None
+        try:
+            cached, raw = self._recognize_cache.get_recognize(cache_key)
+            return cached, ImdbMediaInfo.parse_raw(raw) if raw else None
+        except Exception as e:
+            logger.debug(f"读取识别结果缓存失败：{str(e)}")
+            return False, None
+
+    def _save_cached_recognize(self, cache_key: str, info: Optional[ImdbMediaInfo], failures: List[str]):
+        """
+        保存识别结果，未识别到的结果仅在全部查询均已完成时保存，避免网络异常期间的查询被当作未找到
+        :param failures: 识别过程中的查询失败记录
+        """
+        if not self._recognize_cache:
+            return
+        if not info and failures:
+            logger.debug(f"识别过程中有 {len(failures)} 次 IMDb 查询失败，不缓存未识别结果")
+            return
+        try:
+            self._recognize_cache.set_recognize(cache_key,
+                                                info.json(by_alias=True, exclude_none=True) if info else None)
+            logger.debug(f"识别结果缓存统计：{self._recognize_cache.stats()}")
+        except Exception as e:
+            logger.debug(f"保存识别结果缓存失败：{str(e)}")
 
     @staticmethod
     def _match_results(data: dict, media_info: Optional[MediaInfo] = None) -> Optional[int]:
@@ -1944,6 +2157,11 @@ class ImdbSource(_PluginBase):
         return most_popular.get("id") if most_popular else None
 
     def imdb_to_tmdb(self, imdb_id: str, media_info: Optional[MediaInfo] = None) -> Optional[int]:
+        mtype = media_info.type.value if media_info and media_info.type else None
+        if self._recognize_cache:
+            cached, tmdb_id = self._recognize_cache.get_tmdb_id(imdb_id, mtype)
+            if cached:
+                return tmdb_id
         api_key = settings.TMDB_API_KEY
         api_url = (
             f"https://{settings.TMDB_API_DOMAIN}/3/find/{imdb_id}"
@@ -1953,9 +2171,17 @@ class ImdbSource(_PluginBase):
                             ).get_json(api_url)
         if not data:
             return None
-        return ImdbSource._match_results(data, media_info)
+        tmdb_id = ImdbSource._match_results(data, media_info)
+        if self._recognize_cache:
+            self._recognize_cache.set_tmdb_id(imdb_id, mtype, tmdb_id)
+        return tmdb_id
 
     async def async_imdb_to_tmdb(self, imdb_id: str, media_info: Optional[MediaInfo] = None) -> Optional[int]:
+        mtype = media_info.type.value if media_info and media_info.type else None
+        if self._recognize_cache:
+            cached, tmdb_id = self._recognize_cache.get_tmdb_id(imdb_id, mtype)
+            if cached:
+                return tmdb_id
         api_key = settings.TMDB_API_KEY
         api_url = (
             f"https://{settings.TMDB_API_DOMAIN}/3/find/{imdb_id}"
@@ -1965,4 +2191,7 @@ class ImdbSource(_PluginBase):
                                        ).get_json(api_url)
         if not data:
             return None
-        return self._match_results(data, media_info)
+        tmdb_id = self._match_results(data, media_info)
+        if self._recognize_cache:
+            self._recognize_cache.set_tmdb_id(imdb_id, mtype, tmdb_id)
+        return tmdb_id
@@ -1,8 +1,12 @@
+import asyncio
 import base64
+import functools
 from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
 from json import JSONDecodeError
 import json
-from typing import Dict, List, Optional, Union, AsyncGenerator
+from typing import Awaitable, Callable, Dict, Iterator, List, Optional, Union, AsyncGenerator
 
 from pydantic import ValidationError
 
@@ -20,13 +24,21 @@ from .officialapi import SearchParams, OfficialApiClient, PersistedQueryNotFound
 from .schema import StaffPickApiResponse, ImdbMediaInfo, ImdbApiHash, TitleEdge
 from .schema.imdbapi import ImdbapiPrecisionDate, ImdbApiTitle
 from .schema.imdbtypes import ImdbType, AkasNode, ImdbTitle, ImdbDate
+from .titleindex import TitleIndex
+
+# 当前识别过程中的查询失败记录，用于区分查询失败与未找到
+_search_failures: ContextVar[Optional[List[str]]] = ContextVar("imdb_search_failures", default=None)
 
 
 class ImdbHelper:
     MAX_STATES = 128
 
-    def __init__(self, proxies = None):
+    def __init__(self, proxies = None, concurrency: int = 1, title_index: Optional[TitleIndex] = None):
         self._proxies = proxies
+        # 并发识别的最大并发查询数，为1时逐个查询
+        self._concurrency = max(1, concurrency)
+        # 本地条目索引，识别时优先查找
+        self._title_index = title_index
         self.imdbapi_client = ImdbApiClient(proxies=self._proxies, ua=settings.NORMAL_USER_AGENT)
         self.official_api_client = OfficialApiClient(proxies=self._proxies, ua=settings.NORMAL_USER_AGENT)
         self._imdb_api_hash = ImdbApiHash(
@@ -35,6 +47,29 @@ class ImdbHelper:
         self._search_states = OrderedDict()
         self._title_generators: OrderedDict[SearchParams, AsyncGenerator[TitleEdge, None]] = OrderedDict()
 
+    @staticmethod
+    @contextmanager
+    def search_failures() -> Iterator[List[str]]:
+        """
+        记录代码块中因网络异常等原因失败的查询，列表为空表示全部查询均已完成
+        """
+        failures: List[str] = []
+        token = _search_failures.set(failures)
+        try:
+            yield failures
+        finally:
+            _search_failures.reset(token)
+
+    @staticmethod
+    def _search_failed(message: str):
+        """
+        记录一次查询失败
+        """
+        logger.debug(message)
+        failures = _search_failures.get()
+        if failures is not None:
+            failures.append(message)
+
     def get_interests_id(self) -> Dict[str, str]:
         return self.official_api_client.interests_id
 
@@ -236,6 +271,68 @@ class ImdbHelper:
                 seasons_dict[s] = episode.release_date
         return seasons_dict
 
+    @staticmethod
+    def _search_types(mtypes: List[MediaType]) -> List[ImdbType]:
+        """
+        获取查询各媒体类型时使用的 IMDb 条目类型
+        """
+        search_types: List[ImdbType] = []
+        if MediaType.TV in mtypes:
+            search_types.extend([ImdbType.TV_SERIES, ImdbType.TV_MINI_SERIES, ImdbType.TV_SPECIAL])
+        if MediaType.MOVIE in mtypes:
+            search_types.extend([ImdbType.MOVIE, ImdbType.TV_MOVIE])
+        return search_types
+
+    def _local_match_by(self, name: str, mtypes: List[MediaType], year: Optional[str] = None
+                        ) -> Optional[ImdbMediaInfo]:
+        """
+        在本地条目索引中按名称查找
+        """
+        if not self._title_index:
+            return None
+        types = [t for t in self._search_types(mtypes) if ImdbHelper.type_to_mtype(t.value) in mtypes]
+        info = self._title_index.match(name, types, year)
+        if info:
+            logger.debug(f"{name} 命中本地条目索引：{info.id}，{self._title_index.stats()}")
+        return info
+
+    def _local_match_by_season(self, name: str, season_year: str, season_number: int) -> Optional[ImdbMediaInfo]:
+        """
+        在本地条目索引中按电视剧名称及季信息查找
+        """
+        if not self._title_index:
+            return None
+        info = self._title_index.match_season(name, [ImdbType.TV_SERIES, ImdbType.TV_MINI_SERIES],
+                                              season_year, season_number)
+        if info:
+            logger.debug(f"{name} 第{season_number}季 命中本地条目索引：{info.id}，{self._title_index.stats()}")
+        return info
+
+    def _index_titles(self, results: List[ImdbApiTitle], titles: List[ImdbTitle]):
+        """
+        将查询到的条目及别名加入本地条目索引
+        """
+        if not self._title_index or not titles:
+            return
+        titles_dict: Dict[str, ImdbTitle] = {title.id: title for title in titles}
+        try:
+            self._title_index.add((result, [edge.node for edge in titles_dict[result.id].akas.edges])
+                                  for result in results if result.id in titles_dict)
+        except Exception as e:
+            logger.debug(f"更新本地条目索引失败：{str(e)}")
+
+    def _index_seasons(self, imdb_id: str, release_dates: Dict[str, ImdbapiPrecisionDate]):
+        """
+        将电视剧各季的首播年份加入本地条目索引
+        """
+        if not self._title_index or not release_dates:
+            return
+        try:
+            self._title_index.set_seasons(imdb_id, {s: release_date.year if release_date else None
+                                                    for s, release_date in release_dates.items()})
+        except Exception as e:
+            logger.debug(f"更新本地条目索引失败：{str(e)}")
+
     def match_by(self, name: str, mtype: Optional[MediaType] = None, year: Optional[str] = None) -> Optional[ImdbMediaInfo]:
         """
         根据名称同时查询电影和电视剧，没有类型也没有年份时使用
@@ -246,18 +343,20 @@ class ImdbHelper:
         """
 
         mtypes = [MediaType.MOVIE, MediaType.TV] if not mtype else [mtype]
-        search_types: List[ImdbType] = []
-        if MediaType.TV in mtypes:
-            search_types.extend([ImdbType.TV_SERIES, ImdbType.TV_MINI_SERIES, ImdbType.TV_SPECIAL])
-        if MediaType.MOVIE in mtypes:
-            search_types.extend([ImdbType.MOVIE, ImdbType.TV_MOVIE])
+        info = self._local_match_by(name, mtypes, year)
+        if info:
+            return info
+        search_types = self._search_types(mtypes)
         if year:
             multi_res = self.imdbapi_client.advanced_search(query=name, year=int(year),
                                                             media_types=search_types)
         else:
             multi_res = self.imdbapi_client.advanced_search(query=name, media_types=search_types)
         ret_info = None
-        if multi_res is None or len(multi_res) == 0:
+        if multi_res is None:
+            self._search_failed(f"{name} 查询 IMDb 失败")
+            return None
+        if len(multi_res) == 0:
             logger.debug(f"{name} 未找到相关媒体息!")
             return None
         multi_res = [r for r in multi_res if r.id and ImdbHelper.type_to_mtype(r.type.value) in mtypes]
@@ -267,7 +366,10 @@ class ImdbHelper:
             reverse=True
         )
         items = self.official_api_client.vertical_list_page_items([x.id for x in multi_res])
+        if items is None and multi_res:
+            self._search_failed(f"{name} 查询 IMDb 条目详情失败")
         titles = items.titles if items else []
+        self._index_titles(multi_res, titles)
 
         for result in multi_res:
             title = next((t for t in titles if t.id == result.id), None)
@@ -289,18 +391,20 @@ class ImdbHelper:
     async def async_match_by(self, name: str, mtype: Optional[MediaType] = None, year: Optional[str] = None
                              ) -> Optional[ImdbMediaInfo]:
         mtypes = [MediaType.MOVIE, MediaType.TV] if not mtype else [mtype]
-        search_types: List[ImdbType] = []
-        if MediaType.TV in mtypes:
-            search_types.extend([ImdbType.TV_SERIES, ImdbType.TV_MINI_SERIES, ImdbType.TV_SPECIAL])
-        if MediaType.MOVIE in mtypes:
-            search_types.extend([ImdbType.MOVIE, ImdbType.TV_MOVIE])
+        info = self._local_match_by(name, mtypes, year)
+        if info:
+            return info
+        search_types = self._search_types(mtypes)
         if year:
             multi_res = await self.imdbapi_client.async_advanced_search(query=name, year=int(year),
                                                                         media_types=search_types)
         else:
             multi_res = await self.imdbapi_client.async_advanced_search(query=name, media_types=search_types)
         ret_info = None
-        if multi_res is None or len(multi_res) == 0:
+        if multi_res is None:
+            self._search_failed(f"{name} 查询 IMDb 失败")
+            return None
+        if len(multi_res) == 0:
             logger.debug(f"{name} 未找到相关媒体息!")
             return None
         multi_res = [r for r in multi_res if r.id and ImdbHelper.type_to_mtype(r.type.value) in mtypes]
@@ -310,13 +414,16 @@ class ImdbHelper:
             reverse=True
         )
         items = await self.official_api_client.async_vertical_list_page_items([x.id for x in multi_res])
+        if items is None and multi_res:
+            self._search_failed(f"{name} 查询 IMDb 条目详情失败")
         titles = items.titles if items else []
+        self._index_titles(multi_res, titles)
 
         for result in multi_res:
             title = next((t for t in titles if t.id == result.id), None)
             if not title:
                 continue
-            akas = title.akas
+            akas = [edge.node for edge in title.akas.edges]
             start_year = result.start_year
             if year and str(start_year) != year:
                 continue
@@ -340,6 +447,9 @@ class ImdbHelper:
 
         def __season_match(imdb_id: str, _season_year: str, _season_number: int) -> bool:
             release_dates = self._tv_release_data_by_season(imdb_id)
+            if not release_dates:
+                self._search_failed(f"{imdb_id} 查询 IMDb 剧集信息失败")
+            self._index_seasons(imdb_id, release_dates)
             for s, release_date in release_dates.items():
                 if not release_date or not release_date.year:
                     continue
@@ -347,15 +457,24 @@ class ImdbHelper:
                     return True
             return False
 
+        info = self._local_match_by_season(name, season_year, season_number)
+        if info:
+            return info
         search_types = [ImdbType.TV_SERIES, ImdbType.TV_MINI_SERIES, ImdbType.TV_SPECIAL]
         res = self.imdbapi_client.advanced_search(query=name, media_types=search_types)
+        if res is None:
+            self._search_failed(f"{name} 查询 IMDb 失败")
+            return None
         if not res:
             logger.debug(f"{name} 未找到季{season_number}相关信息!")
             return None
         tvs: List[ImdbApiTitle] = [r for r in res if r.id and ImdbHelper.type_to_mtype(r.type.value) == MediaType.TV]
         tvs = sorted(tvs, key=lambda x: x.start_year or 0, reverse=True)
         items = self.official_api_client.vertical_list_page_items([x.id for x in tvs])
+        if items is None and tvs:
+            self._search_failed(f"{name} 查询 IMDb 条目详情失败")
         titles = items.titles if items else []
+        self._index_titles(tvs, titles)
         titles_dict: Dict[str, ImdbTitle] = {}
         for title in titles:
             titles_dict[title.id] = title
@@ -381,6 +500,9 @@ class ImdbHelper:
 
         async def __season_match(imdb_id: str, _season_year: str, _season_number: int) -> bool:
             release_dates = await self._async_tv_release_data_by_season(imdb_id)
+            if not release_dates:
+                self._search_failed(f"{imdb_id} 查询 IMDb 剧集信息失败")
+            self._index_seasons(imdb_id, release_dates)
             for s, release_date in release_dates.items():
                 if not release_date or not release_date.year:
                     continue
@@ -388,18 +510,29 @@ class ImdbHelper:
                     return True
             return False
 
+        info = self._local_match_by_season(name, season_year, season_number)
+        if info:
+            return info
         search_types = [ImdbType.TV_SERIES, ImdbType.TV_MINI_SERIES, ImdbType.TV_SPECIAL]
         res = await self.imdbapi_client.async_advanced_search(query=name, media_types=search_types)
+        if res is None:
+            self._search_failed(f"{name} 查询 IMDb 失败")
+            return None
         if not res:
             logger.debug(f"{name} 未找到季{season_number}相关信息!")
             return None
         tvs: List[ImdbApiTitle] = [r for r in res if r.id and ImdbHelper.type_to_mtype(r.type.value) == MediaType.TV]
         tvs = sorted(tvs, key=lambda x: x.start_year or 0, reverse=True)
         items = await self.official_api_client.async_vertical_list_page_items([x.id for x in tvs])
+        if items is None and tvs:
+            self._search_failed(f"{name} 查询 IMDb 条目详情失败")
         titles = items.titles if items else []
+        self._index_titles(tvs, titles)
         titles_dict: Dict[str, ImdbTitle] = {}
         for title in titles:
             titles_dict[title.id] = title
+        # 候选剧集：(剧集, 别名, 是否需要核对季的年份)
+        candidates = []
         for tv in tvs:
             # 年份
             title = titles_dict.get(tv.id)
@@ -408,13 +541,29 @@ class ImdbHelper:
             akas: List[AkasNode] = [e.node for e in title.akas.edges]
             tv_year = tv.start_year
             if self.compare_names(name, [tv.primary_title or '', tv.original_title or '']) and str(tv_year) == season_year:
-                info = ImdbMediaInfo.from_title(tv, akas=akas)
-                return info
+                candidates.append((tv, akas, False))
+                break
             names = [aka.text for aka in akas]
             if not tv or not self.compare_names(name, names):
                 continue
-            if await __season_match(imdb_id=tv.id, _season_year=season_year, _season_number=season_number):
-                info = ImdbMediaInfo.from_title(tv, akas=akas)
+            candidates.append((tv, akas, True))
+
+        async def __candidate_match(_tv: ImdbApiTitle, _akas: List[AkasNode], _check_season: bool
+                                    ) -> Optional[ImdbMediaInfo]:
+            if _check_season and not await __season_match(imdb_id=_tv.id, _season_year=season_year,
+                                                           _season_number=season_number):
+                return None
+            return ImdbMediaInfo.from_title(_tv, akas=_akas)
+
+        if self._concurrency > 1:
+            # 并发核对各候选剧集的季信息
+            return await self.async_first_match(
+                [functools.partial(__candidate_match, tv, akas, check_season) for tv, akas, check_season in candidates],
+                concurrency=self._concurrency
+            )
+        for tv, akas, check_season in candidates:
+            info = await __candidate_match(tv, akas, check_season)
+            if info:
                 return info
         return None
 
@@ -476,6 +625,59 @@ class ImdbHelper:
                 break
         return info
 
+    def async_match_steps(self, name: str,
+                          mtype: MediaType,
+                          year: Optional[str] = None,
+                          season_year: Optional[str] = None,
+                          season_number: Optional[int] = None,
+                          ) -> List[Callable[[], Awaitable[Optional[ImdbMediaInfo]]]]:
+        """
+        按 async_match 的查询顺序拆分出各步查询，用于并发识别
+        """
+        if not name:
+            return []
+        steps = []
+        if mtype == MediaType.TV and season_year and season_number:
+            steps.append(functools.partial(self.async_match_by_season, name, season_year, season_number))
+        year_range = [year, str(int(year) + 1), str(int(year) - 1)] if year else [None]
+        for year in year_range:
+            steps.append(functools.partial(self.async_match_by, name, mtype, year))
+        return steps
+
+    @staticmethod
+    async def async_first_match(lookups: List[Callable[[], Awaitable[Optional[ImdbMediaInfo]]]],
+                                concurrency: int) -> Optional[ImdbMediaInfo]:
+        """
+        限制并发数同时执行多个查询，按查询顺序返回第一个成功的结果，并取消其余未完成的查询
+        :param lookups: 按优先级排列的查询
+        :param concurrency: 最大并发数
+        :return: 匹配的媒体信息
+        """
+        if not lookups:
+            return None
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def __run(lookup: Callable[[], Awaitable[Optional[ImdbMediaInfo]]]) -> Optional[ImdbMediaInfo]:
+            async with semaphore:
+                return await lookup()
+
+        tasks = [asyncio.ensure_future(__run(lookup)) for lookup in lookups]
+        try:
+            for task in tasks:
+                try:
+                    info = await task
+                except Exception as e:
+                    ImdbHelper._search_failed(f"IMDb 查询失败：{str(e)}")
+                    continue
+                if info:
+                    return info
+            return None
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
     def update_info(self, title_id: str, info: ImdbMediaInfo) -> ImdbMediaInfo:
         """
         Given a Title ID, update its media information.
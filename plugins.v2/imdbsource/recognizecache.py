@@ -0,0 +1,224 @@
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.log import logger
+from app.utils.string import StringUtils
+
+
+class RecognizeCache:
+    """
+    IMDb 识别结果持久化缓存，保存 IMDb ID 到 TMDB ID 的映射及识别名称到识别结果的映射，
+    未识别到的结果同样缓存，但有效期较短；
+    读取只访问内存，写入先更新内存再由后台线程批量写入数据库，不阻塞调用方
+    """
+
+    def __init__(self, db_path: Path, ttl: float = 30 * 24 * 3600, negative_ttl: float = 24 * 3600):
+        self._db_path = str(db_path)
+        # 识别成功结果的有效期（秒）
+        self._ttl = ttl
+        # 未识别到结果的有效期（秒）
+        self._negative_ttl = negative_ttl
+        self._lock = threading.Lock()
+        # IMDb ID -> 媒体类型 -> (TMDB ID, 更新时间)
+        self._tmdb: Dict[str, Dict[str, Tuple[Optional[int], float]]] = {}
+        # 识别查询 -> (识别结果JSON, 更新时间)
+        self._recognize: Dict[str, Tuple[Optional[str], float]] = {}
+        self._stats: Dict[str, Dict[str, int]] = {
+            "tmdb": {"hits": 0, "negative_hits": 0, "misses": 0},
+            "recognize": {"hits": 0, "negative_hits": 0, "misses": 0},
+        }
+        # 待写入数据库的记录：(SQL, 参数)，None 表示停止写入线程
+        self._queue: "queue.Queue[Optional[Tuple[str, tuple]]]" = queue.Queue()
+        self.__init_db()
+        self._writer = threading.Thread(target=self.__write_loop, name="ImdbSource-RecognizeCache", daemon=True)
+        self._writer.start()
+
+    @contextmanager
+    def __session(self):
+        """
+        打开数据库连接，退出时提交事务并关闭连接
+        """
+        conn = sqlite3.connect(self._db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def __init_db(self):
+        """
+        初始化数据库，清理已过期的记录并将其余记录加载到内存
+        """
+        now = time.time()
+        with self.__session() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS imdb_tmdb (
+                    imdb_id TEXT NOT NULL,
+                    mtype TEXT NOT NULL,
+                    tmdb_id INTEGER,
+                    updated REAL NOT NULL,
+                    PRIMARY KEY (imdb_id, mtype)
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS recognize (
+                    query TEXT PRIMARY KEY,
+                    info TEXT,
+                    updated REAL NOT NULL
+                )
+            """)
+            conn.execute("DELETE FROM imdb_tmdb WHERE updated < ? OR (tmdb_id IS NULL AND updated < ?)",
+                         (now - self._ttl, now - self._negative_ttl))
+            conn.execute("DELETE FROM recognize WHERE updated < ? OR (info IS NULL AND updated < ?)",
+                         (now - self._ttl, now - self._negative_ttl))
+            tmdb_rows = conn.execute("SELECT imdb_id, mtype, tmdb_id, updated FROM imdb_tmdb").fetchall()
+            recognize_rows = conn.execute("SELECT query, info, updated FROM recognize").fetchall()
+        for imdb_id, mtype, tmdb_id, updated in tmdb_rows:
+            self._tmdb.setdefault(imdb_id, {})[mtype] = (tmdb_id, updated)
+        self._recognize = {query: (info, updated) for query, info, updated in recognize_rows}
+
+    def __write_loop(self):
+        """
+        后台写入线程，合并队列中已有的记录后批量写入
+        """
+        while True:
+            item = self._queue.get()
+            stop = item is None
+            items: List[Tuple[str, tuple]] = [] if stop else [item]
+            while not stop:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                else:
+                    items.append(item)
+            if items:
+                try:
+                    with self.__session() as conn:
+                        for sql, params in items:
+                            conn.execute(sql, params)
+                except Exception as e:
+                    logger.error(f"写入识别结果缓存失败：{str(e)}")
+            if stop:
+                return
+
+    @staticmethod
+    def query_key(names: List[str], mtype: Optional[str] = None, year: Optional[str] = None,
+                  season: Optional[int] = None) -> str:
+        """
+        生成识别查询的缓存键，名称忽略大小写和特殊字符
+        """
+        names = [StringUtils.clear(name).strip().upper() for name in names if name]
+        return f"{mtype or ''}|{year or ''}|{season or ''}|" + "|".join(names)
+
+    def get_tmdb_id(self, imdb_id: str, mtype: Optional[str] = None) -> Tuple[bool, Optional[int]]:
+        """
+        获取 IMDb ID 对应的 TMDB ID，未指定媒体类型时可使用任意类型下的记录
+        :return: 是否命中缓存、TMDB ID
+        """
+        with self._lock:
+            entries = self._tmdb.get(imdb_id) or {}
+            if mtype:
+                return self.__check("tmdb", entries.get(mtype))
+            # 未指定类型时优先使用同样未指定类型的记录，其次使用已识别到的任意类型记录
+            candidates = [entries.get("")] + [entry for key, entry in entries.items()
+                                              if key and entry[0] is not None]
+            entry = next((entry for entry in candidates if entry and self.__valid(entry)), None)
+            return self.__check("tmdb", entry)
+
+    def set_tmdb_id(self, imdb_id: str, mtype: Optional[str], tmdb_id: Optional[int]):
+        """
+        保存 IMDb ID 对应的 TMDB ID，tmdb_id 为空表示未找到
+        """
+        now = time.time()
+        with self._lock:
+            self._tmdb.setdefault(imdb_id, {})[mtype or ""] = (tmdb_id, now)
+        self._queue.put(("INSERT OR REPLACE INTO imdb_tmdb (imdb_id, mtype, tmdb_id, updated) VALUES (?, ?, ?, ?)",
+                         (imdb_id, mtype or "", tmdb_id, now)))
+
+    def get_recognize(self, query: str) -> Tuple[bool, Optional[str]]:
+        """
+        获取识别结果
+        :return: 是否命中缓存、识别结果JSON
+        """
+        with self._lock:
+            return self.__check("recognize", self._recognize.get(query))
+
+    def set_recognize(self, query: str, info: Optional[str]):
+        """
+        保存识别结果，info 为空表示未识别到
+        """
+        now = time.time()
+        with self._lock:
+            self._recognize[query] = (info, now)
+        self._queue.put(("INSERT OR REPLACE INTO recognize (query, info, updated) VALUES (?, ?, ?)",
+                         (query, info, now)))
+
+    def warm_up(self, mappings: Iterable[Tuple[str, str, int]]) -> int:
+        """
+        使用已知的 IMDb ID、媒体类型、TMDB ID 预热缓存，不覆盖已有记录
+        :return: 新增的记录数
+        """
+        now = time.time()
+        rows = []
+        with self._lock:
+            for imdb_id, mtype, tmdb_id in mappings:
+                if not imdb_id or not tmdb_id:
+                    continue
+                entries = self._tmdb.setdefault(imdb_id, {})
+                if (mtype or "") in entries:
+                    continue
+                entries[mtype or ""] = (tmdb_id, now)
+                rows.append((imdb_id, mtype or "", tmdb_id, now))
+        if rows:
+            with self.__session() as conn:
+                conn.executemany("INSERT OR IGNORE INTO imdb_tmdb (imdb_id, mtype, tmdb_id, updated) "
+                                 "VALUES (?, ?, ?, ?)", rows)
+        return len(rows)
+
+    def clear(self):
+        """
+        清空缓存
+        """
+        with self._lock:
+            self._tmdb.clear()
+            self._recognize.clear()
+        self._queue.put(("DELETE FROM imdb_tmdb", ()))
+        self._queue.put(("DELETE FROM recognize", ()))
+
+    def close(self):
+        """
+        写入剩余记录并停止后台写入线程
+        """
+        self._queue.put(None)
+        self._writer.join(timeout=10)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        缓存命中统计
+        """
+        with self._lock:
+            return {kind: dict(counter) for kind, counter in self._stats.items()}
+
+    def __valid(self, entry: Tuple[Optional[Any], float]) -> bool:
+        ttl = self._ttl if entry[0] is not None else self._negative_ttl
+        return time.time() - entry[1] <= ttl
+
+    def __check(self, kind: str, entry: Optional[Tuple[Optional[Any], float]]) -> Tuple[bool, Optional[Any]]:
+        """
+        检查缓存记录是否有效并计数，调用方需持有锁
+        """
+        counter = self._stats[kind]
+        if entry and self.__valid(entry):
+            counter["hits" if entry[0] is not None else "negative_hits"] += 1
+            return True, entry[0]
+        counter["misses"] += 1
+        return False, None
@@ -0,0 +1,381 @@
+import json
+import queue
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from app.log import logger
+from app.utils.string import StringUtils
+
+from .schema import ImdbMediaInfo
+from .schema.imdbapi import ImdbApiTitle
+from .schema.imdbtypes import ImdbType, AkasNode
+
+# 名称中的阿拉伯数字及罗马数字（1-39），用于区分续集
+_NUMBER_RE = re.compile(r"\b(\d+|X{0,3}(?:IX|IV|V?I{0,3}))\b", re.I)
+_ROMAN_VALUES = {"I": 1, "V": 5, "X": 10}
+
+
+class _TitleEntry(object):
+    """
+    索引中的单个条目
+    """
+    __slots__ = ("info", "names", "seasons")
+
+    def __init__(self, info: ImdbMediaInfo, names: Set[str], seasons: Optional[Dict[str, int]] = None):
+        self.info = info
+        # 规范化后的名称，包括主标题、原始标题及别名
+        self.names = names
+        # 季序号 -> 该季首播年份
+        self.seasons = seasons
+
+
+class TitleIndex:
+    """
+    IMDb 条目本地索引，记录查询过程中见到的条目名称、别名、年份、类型及各季年份，
+    识别时先按规范化名称在本地查找，未命中时再请求 IMDb；
+    查找只访问内存，新增的条目由后台线程批量写入数据库，不阻塞调用方
+    """
+
+    def __init__(self, db_path: Optional[Path] = None, max_titles: int = 20000, similarity: float = 0.9):
+        self._db_path = str(db_path) if db_path else None
+        # 内存中最多保留的条目数
+        self._max_titles = max_titles
+        # 名称近似匹配的最低三元组相似度，为0时只做精确匹配
+        self._similarity = similarity
+        self._lock = threading.RLock()
+        # IMDb ID -> 条目，按最近使用排序
+        self._titles: "OrderedDict[str, _TitleEntry]" = OrderedDict()
+        # 规范化名称 -> IMDb ID
+        self._names: Dict[str, Set[str]] = {}
+        # 三元组 -> 规范化名称
+        self._trigrams: Dict[str, Set[str]] = {}
+        # 规范化名称 -> 名称中的数字，近似匹配时数字须一致
+        self._numbers: Dict[str, Tuple[int, ...]] = {}
+        self._hits = 0
+        self._fuzzy_hits = 0
+        self._misses = 0
+        # 待写入数据库的记录：(SQL, 参数列表)，None 表示停止写入线程
+        self._queue: "queue.Queue[Optional[Tuple[str, List[tuple]]]]" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        if self._db_path:
+            self.__init_db()
+            self.__load()
+            self._writer = threading.Thread(target=self.__write_loop, name="ImdbSource-TitleIndex", daemon=True)
+            self._writer.start()
+
+    def __len__(self) -> int:
+        return len(self._titles)
+
+    @contextmanager
+    def __session(self):
+        """
+        打开数据库连接，退出时提交事务并关闭连接
+        """
+        conn = sqlite3.connect(self._db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def __init_db(self):
+        with self.__session() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS titles (
+                    imdb_id TEXT PRIMARY KEY,
+                    info TEXT NOT NULL,
+                    seasons TEXT,
+                    updated REAL NOT NULL
+                )
+            """)
+
+    def __load(self):
+        """
+        从数据库加载最近更新的条目
+        """
+        with self.__session() as conn:
+            rows = conn.execute("SELECT info, seasons FROM titles ORDER BY updated DESC LIMIT ?",
+                                (self._max_titles,)).fetchall()
+        with self._lock:
+            for info, seasons in reversed(rows):
+                try:
+                    self.__put(ImdbMediaInfo.parse_raw(info), json.loads(seasons) if seasons else None)
+                except Exception as e:
+                    logger.debug(f"加载 IMDb 条目索引失败：{str(e)}")
+
+    def __write_loop(self):
+        """
+        后台写入线程，合并队列中已有的记录后批量写入
+        """
+        while True:
+            item = self._queue.get()
+            stop = item is None
+            items: List[Tuple[str, List[tuple]]] = [] if stop else [item]
+            while not stop:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                else:
+                    items.append(item)
+            if items:
+                try:
+                    with self.__session() as conn:
+                        for sql, rows in items:
+                            conn.executemany(sql, rows)
+                except Exception as e:
+                    logger.error(f"写入 IMDb 条目索引失败：{str(e)}")
+            if stop:
+                return
+
+    def __persist(self, sql: str, rows: List[tuple]):
+        """
+        提交到后台线程写入数据库
+        """
+        if self._writer:
+            self._queue.put((sql, rows))
+
+    @staticmethod
+    def normalize(name: str) -> str:
+        """
+        规范化名称，忽略大小写和特殊字符，与 ImdbHelper.compare_names 的比较规则一致
+        """
+        return StringUtils.clear(name).strip().upper() if name else ""
+
+    @staticmethod
+    def trigrams(name: str) -> Set[str]:
+        """
+        拆分规范化名称的三元组
+        """
+        padded = f"  {name} "
+        return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+    @staticmethod
+    def numbers(name: str) -> Tuple[int, ...]:
+        """
+        提取名称中的阿拉伯数字及罗马数字，规范化会去掉空格，因此需要从原始名称中提取
+        """
+        values = []
+        for token in _NUMBER_RE.findall(name or ""):
+            if not token:
+                continue
+            if token.isdigit():
+                values.append(int(token))
+                continue
+            value = 0
+            digits = [_ROMAN_VALUES[c] for c in token.upper()]
+            for i, digit in enumerate(digits):
+                value += -digit if i + 1 < len(digits) and digit < digits[i + 1] else digit
+            values.append(value)
+        return tuple(sorted(values))
+
+    @staticmethod
+    def sort_key(info: ImdbMediaInfo) -> str:
+        """
+        候选条目排序，与 ImdbHelper.match_by 一致：电影优先，年份新的优先
+        """
+        return ('1' if info.type in [ImdbType.MOVIE, ImdbType.TV_MOVIE] else '0') + f"{info.start_year}"
+
+    def __put(self, info: ImdbMediaInfo, seasons: Optional[Dict[str, int]] = None):
+        """
+        写入内存索引，调用方需持有锁
+        """
+        old = self._titles.pop(info.id, None)
+        if old:
+            self.__unlink(info.id, old)
+            if seasons is None:
+                seasons = old.seasons
+        # 规范化名称 -> 名称中的数字
+        names: Dict[str, Tuple[int, ...]] = {}
+        for title in [info.primary_title, info.original_title] + [aka.text for aka in info.akas]:
+            name = self.normalize(title)
+            if name and name not in names:
+                names[name] = self.numbers(title)
+        self._titles[info.id] = _TitleEntry(info=info, names=set(names), seasons=seasons)
+        for name in names:
+            if name not in self._names:
+                self._names[name] = set()
+                self._numbers[name] = names[name]
+                for trigram in self.trigrams(name):
+                    self._trigrams.setdefault(trigram, set()).add(name)
+            self._names[name].add(info.id)
+        while len(self._titles) > self._max_titles:
+            imdb_id, entry = self._titles.popitem(last=False)
+            self.__unlink(imdb_id, entry)
+
+    def __unlink(self, imdb_id: str, entry: _TitleEntry):
+        """
+        从名称索引中移除条目，调用方需持有锁
+        """
+        for name in entry.names:
+            ids = self._names.get(name)
+            if not ids:
+                continue
+            ids.discard(imdb_id)
+            if ids:
+                continue
+            del self._names[name]
+            self._numbers.pop(name, None)
+            for trigram in self.trigrams(name):
+                names = self._trigrams.get(trigram)
+                if names:
+                    names.discard(name)
+                    if not names:
+                        del self._trigrams[trigram]
+
+    def add(self, titles: Iterable[Tuple[ImdbApiTitle, List[AkasNode]]]):
+        """
+        将 IMDb 返回的条目及其别名加入索引
+        :param titles: (条目, 别名)
+        """
+        infos = [ImdbMediaInfo.from_title(title, akas=akas) for title, akas in titles if title and title.id]
+        if not infos:
+            return
+        with self._lock:
+            for info in infos:
+                self.__put(info)
+        if self._writer:
+            now = time.time()
+            self.__persist("INSERT INTO titles (imdb_id, info, updated) VALUES (?, ?, ?) "
+                           "ON CONFLICT(imdb_id) DO UPDATE SET info = excluded.info, updated = excluded.updated",
+                           [(info.id, info.json(by_alias=True, exclude_none=True), now) for info in infos])
+
+    def set_seasons(self, imdb_id: str, seasons: Dict[str, Optional[int]]):
+        """
+        记录电视剧各季的首播年份
+        :param imdb_id: IMDb ID
+        :param seasons: 季序号 -> 首播年份
+        """
+        seasons = {str(season): year for season, year in seasons.items() if year}
+        with self._lock:
+            entry = self._titles.get(imdb_id)
+            if not entry:
+                return
+            entry.seasons = seasons
+        self.__persist("UPDATE titles SET seasons = ?, updated = ? WHERE imdb_id = ?",
+                       [(json.dumps(seasons), time.time(), imdb_id)])
+
+    def __candidates(self, name: str, types: List[ImdbType], fuzzy: bool) -> Tuple[List[_TitleEntry], bool]:
+        """
+        按名称查找候选条目，调用方需持有锁
+        :return: 按优先级排列的候选条目、是否为近似匹配
+        """
+        key = self.normalize(name)
+        if not key:
+            return [], False
+        matched = False
+        ids = self._names.get(key)
+        if not ids and fuzzy and self._similarity > 0:
+            # 按三元组相似度查找最接近的名称，数字不同的名称视为续集等不同条目
+            query = self.trigrams(key)
+            numbers = self.numbers(name)
+            counter: Dict[str, int] = {}
+            for trigram in query:
+                for candidate in self._trigrams.get(trigram, ()):
+                    counter[candidate] = counter.get(candidate, 0) + 1
+            best, best_score = None, 0.0
+            for candidate, shared in counter.items():
+                if self._numbers.get(candidate) != numbers:
+                    continue
+                score = shared / (len(query) + len(self.trigrams(candidate)) - shared)
+                if score > best_score:
+                    best, best_score = candidate, score
+            if best and best_score >= self._similarity:
+                ids = self._names.get(best)
+                matched = True
+        entries = [self._titles[imdb_id] for imdb_id in ids or () if imdb_id in self._titles]
+        entries = [entry for entry in entries if entry.info.type in types]
+        return sorted(entries, key=lambda x: self.sort_key(x.info), reverse=True), matched
+
+    def __result(self, entry: Optional[_TitleEntry], fuzzy: bool) -> Optional[ImdbMediaInfo]:
+        """
+        记录命中统计并返回条目副本，调用方需持有锁
+        """
+        if not entry:
+            self._misses += 1
+            return None
+        self._titles.move_to_end(entry.info.id)
+        if fuzzy:
+            self._fuzzy_hits += 1
+        else:
+            self._hits += 1
+        return entry.info.copy(deep=True)
+
+    def match(self, name: str, types: List[ImdbType], year: Optional[str] = None) -> Optional[ImdbMediaInfo]:
+        """
+        按名称、类型及年份在本地查找条目，有年份时才允许近似匹配
+        :param name: 识别的名称
+        :param types: 允许的条目类型
+        :param year: 首播年份
+        :return: 匹配的媒体信息
+        """
+        with self._lock:
+            entries, fuzzy = self.__candidates(name, types, fuzzy=bool(year))
+            entry = next((entry for entry in entries if not year or str(entry.info.start_year) == year), None)
+            return self.__result(entry, fuzzy)
+
+    def match_season(self, name: str, types: List[ImdbType], season_year: str,
+                     season_number: int) -> Optional[ImdbMediaInfo]:
+        """
+        按电视剧名称及季的年份和序号在本地查找条目，候选条目缺少季信息时视为未命中
+        :param name: 识别的名称
+        :param types: 允许的条目类型
+        :param season_year: 季的年份
+        :param season_number: 季序号
+        :return: 匹配的媒体信息
+        """
+        with self._lock:
+            entries, fuzzy = self.__candidates(name, types, fuzzy=True)
+            entries = sorted(entries, key=lambda x: x.info.start_year or 0, reverse=True)
+            for entry in entries:
+                if str(entry.info.start_year) == season_year:
+                    return self.__result(entry, fuzzy)
+                if entry.seasons is None:
+                    break
+                if str(entry.seasons.get(str(season_number))) == season_year:
+                    return self.__result(entry, fuzzy)
+            return self.__result(None, fuzzy)
+
+    def clear(self):
+        """
+        清空索引
+        """
+        with self._lock:
+            self._titles.clear()
+            self._names.clear()
+            self._trigrams.clear()
+            self._numbers.clear()
+        self.__persist("DELETE FROM titles", [()])
+
+    def close(self):
+        """
+        写入剩余记录并停止后台写入线程
+        """
+        if self._writer:
+            self._queue.put(None)
+            self._writer.join(timeout=10)
+            self._writer = None
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        索引规模及命中统计
+        """
+        with self._lock:
+            total = self._hits + self._fuzzy_hits + self._misses
+            return {
+                "titles": len(self._titles),
+                "names": len(self._names),
+                "hits": self._hits,
+                "fuzzy_hits": self._fuzzy_hits,
+                "misses": self._misses,
+                "hit_rate": round((self._hits + self._fuzzy_hits) / total, 4) if total else 0
+            }
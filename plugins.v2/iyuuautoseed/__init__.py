@@ -1,8 +1,9 @@
 import os
 import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
 from threading import Event
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple, Iterator
 
 import pytz
 from apscheduler.schedulers.background import BackgroundScheduler
@@ -19,6 +20,8 @@ from app.helper.torrent import TorrentHelper
 from app.log import logger
 from app.plugins import _PluginBase
 from app.plugins.iyuuautoseed.iyuu_helper import IyuuHelper
+from app.plugins.iyuuautoseed.ratelimiter import SiteRateLimiter
+from app.plugins.iyuuautoseed.seedcache import SeedCache
 from app.schemas import NotificationType, ServiceInfo
 from app.schemas.types import EventType
 from app.utils.http import RequestUtils
@@ -33,7 +36,7 @@ class IYUUAutoSeed(_PluginBase):
     # 插件图标
     plugin_icon = "IYUU.png"
     # 插件版本
-    plugin_version = "2.14"
+    plugin_version = "2.16"
     # 插件作者
     plugin_author = "jxxghp,CKun"
     # 作者主页
@@ -81,12 +84,23 @@ class IYUUAutoSeed(_PluginBase):
     # 待校全种子hash清单
     _recheck_torrents = {}
     _is_recheck_running = False
-    # 辅种缓存，出错的种子不再重复辅种，可清除
-    _error_caches = []
+    # 辅种缓存，出错的种子在过期前不再重复辅种，可清除
+    _error_caches: Optional[SeedCache] = None
     # 辅种缓存，辅种成功的种子，可清除
-    _success_caches = []
+    _success_caches: Optional[SeedCache] = None
     # 辅种缓存，出错的种子不再重复辅种，且无法清除。种子被删除404等情况
-    _permanent_error_caches = []
+    _permanent_error_caches: Optional[SeedCache] = None
+    # 单个辅种缓存的容量上限，超出时淘汰最久未使用的记录
+    _cache_maxsize = 100000
+    # 出错种子的缓存过期时间（秒）
+    _error_cache_ttl = 3 * 24 * 3600
+    # 并发下载种子文件的线程数
+    _download_workers = 5
+    # 单个站点每秒允许的请求数及突发请求数
+    _site_rate = 0.5
+    _site_burst = 2
+    # 站点请求限流
+    _site_limiter: Optional[SiteRateLimiter] = None
     # 辅种计数
     total = 0
     realtotal = 0
@@ -117,9 +131,6 @@ class IYUUAutoSeed(_PluginBase):
             self._addhosttotag = config.get("addhosttotag")
             self._size = float(config.get("size")) if config.get("size") else 0
             self._clearcache = config.get("clearcache")
-            self._permanent_error_caches = [] if self._clearcache else config.get("permanent_error_caches") or []
-            self._error_caches = [] if self._clearcache else config.get("error_caches") or []
-            self._success_caches = [] if self._clearcache else config.get("success_caches") or []
 
             # 过滤掉已删除的站点
             all_sites = [site.id for site in SiteOper().list_order_by_pri()] + [site.get("id") for site in
@@ -127,6 +138,9 @@ class IYUUAutoSeed(_PluginBase):
             self._sites = [site_id for site_id in all_sites if site_id in self._sites]
             self.__update_config()
 
+        # 加载辅种缓存
+        self.__load_caches(config or {})
+
         # 停止现有任务
         self.stop_service()
 
@@ -673,10 +687,35 @@ class IYUUAutoSeed(_PluginBase):
             "addhosttotag": self._addhosttotag,
             "auto_category": self._auto_category,
             "auto_start": self._auto_start,
-            "size": self._size,
-            "success_caches": self._success_caches,
-            "error_caches": self._error_caches,
-            "permanent_error_caches": self._permanent_error_caches
+            "size": self._size
+        })
+
+    def __load_caches(self, config: dict):
+        """
+        加载辅种缓存，缓存保存在插件数据中，并迁移历史版本保存在配置中的缓存
+        """
+        caches = {} if self._clearcache else self.get_data("seed_caches") or {}
+        self._success_caches = SeedCache(maxsize=self._cache_maxsize,
+                                         items=caches.get("success"))
+        self._error_caches = SeedCache(maxsize=self._cache_maxsize, ttl=self._error_cache_ttl,
+                                       items=caches.get("error"))
+        self._permanent_error_caches = SeedCache(maxsize=self._cache_maxsize,
+                                                 items=caches.get("permanent_error"))
+        if not self._clearcache:
+            # 历史版本的缓存保存在配置中，保存配置时不再写入
+            self._success_caches.update(config.get("success_caches"))
+            self._error_caches.update(config.get("error_caches"))
+            self._permanent_error_caches.update(config.get("permanent_error_caches"))
+        self.__save_caches()
+
+    def __save_caches(self):
+        """
+        保存辅种缓存
+        """
+        self.save_data("seed_caches", {
+            "success": self._success_caches.dump(),
+            "error": self._error_caches.dump(),
+            "permanent_error": self._permanent_error_caches.dump()
         })
 
     def auto_seed(self):
@@ -767,7 +806,7 @@ class IYUUAutoSeed(_PluginBase):
                 logger.info(f"没有需要辅种的种子")
 
         # 保存缓存
-        self.__update_config()
+        self.__save_caches()
         # 发送消息
         if self._notify:
             if self.success or self.fail:
@@ -864,6 +903,12 @@ class IYUUAutoSeed(_PluginBase):
             return
         else:
             logger.info(f"IYUU返回可辅种数：{len(seed_list)}")
+        # 辅种下载器，如果配置了主辅分离使用辅种下载器
+        seed_service = self.auto_service_info if self._auto_downloader else service
+        hash_set = set(hashs)
+        # 待下载的辅种任务
+        seed_tasks = []
+        planned_hashes = set()
         # 遍历
         for current_hash, seed_info in seed_list.items():
             if not seed_info:
@@ -872,9 +917,6 @@ class IYUUAutoSeed(_PluginBase):
             if not isinstance(seed_torrents, list):
                 seed_torrents = [seed_torrents]
 
-            # 本次辅种成功的种子
-            success_torrents = []
-
             for seed in seed_torrents:
                 if not seed:
                     continue
@@ -882,34 +924,40 @@ class IYUUAutoSeed(_PluginBase):
                     continue
                 if not seed.get("sid") or not seed.get("info_hash"):
                     continue
-                if seed.get("info_hash") in hashs:
+                if seed.get("info_hash") in hash_set:
                     logger.info(f"{seed.get('info_hash')} 已在下载器中，跳过 ...")
                     continue
+                if seed.get("info_hash") in planned_hashes:
+                    continue
                 if seed.get("info_hash") in self._success_caches:
                     logger.info(f"{seed.get('info_hash')} 已处理过辅种，跳过 ...")
                     continue
                 if seed.get("info_hash") in self._error_caches or seed.get("info_hash") in self._permanent_error_caches:
                     logger.info(f"种子 {seed.get('info_hash')} 辅种失败且已缓存，跳过 ...")
                     continue
-                # 添加任务 如果配置了主辅分离使用辅种下载器
-                if self._auto_downloader:
-                    success = self.__download_torrent(seed=seed,
-                                                      service=self.auto_service_info,
-                                                      save_path=save_paths.get(current_hash),
-                                                      save_category=save_category.get(current_hash))
-                else:
-                    success = self.__download_torrent(seed=seed,
-                                                      service=service,
-                                                      save_path=save_paths.get(current_hash),
-                                                      save_category=save_category.get(current_hash))
-                if success:
-                    success_torrents.append(seed.get("info_hash"))
-
-            # 辅种成功的去重放入历史
-            if len(success_torrents) > 0:
-                self.__save_history(current_hash=current_hash,
-                                    downloader=service.name,
-                                    success_torrents=success_torrents)
+                seed_task = self.__prepare_seed_task(seed=seed,
+                                                     current_hash=current_hash,
+                                                     save_path=save_paths.get(current_hash),
+                                                     save_category=save_category.get(current_hash))
+                if seed_task:
+                    planned_hashes.add(seed.get("info_hash"))
+                    seed_tasks.append(seed_task)
+
+        # 批量排除已在下载器中的种子
+        seed_tasks = self.__exclude_existing_seeds(service=seed_service, seed_tasks=seed_tasks)
+
+        # 并发下载种子文件，按完成顺序依次串行添加到下载器
+        success_torrents: Dict[str, List[str]] = {}
+        for seed_task, result in self.__fetch_seed_torrents(seed_tasks=seed_tasks):
+            if self.__add_seed_torrent(seed_task=seed_task, result=result, service=seed_service):
+                success_torrents.setdefault(seed_task.get("current_hash"), []).append(
+                    seed_task.get("seed").get("info_hash"))
+
+        # 辅种成功的去重放入历史
+        for current_hash, torrents in success_torrents.items():
+            self.__save_history(current_hash=current_hash,
+                                downloader=service.name,
+                                success_torrents=torrents)
 
         logger.info(f"下载器 {service.name} 辅种完成")
 
@@ -1012,68 +1060,121 @@ class IYUUAutoSeed(_PluginBase):
         logger.error(f"不支持的下载器：{service.type}")
         return None
 
-    def __download_torrent(self, seed: dict, service: ServiceInfo, save_path: str, save_category: str):
+    def __prepare_seed_task(self, seed: dict, current_hash: str,
+                            save_path: str, save_category: str) -> Optional[dict]:
         """
-        下载种子
+        查询种子对应的站点，生成待下载的辅种任务
         torrent: {
                     "sid": 3,
                     "torrent_id": 377467,
                     "info_hash": "a444850638e7a6f6220e2efdde94099c53358159"
                 }
         """
-
-        def __is_special_site(url):
-            """
-            判断是否为特殊站点（是否需要添加https）
-            """
-            if "hdsky.me" in url:
-                return False
-            return True
-
         self.total += 1
         # 获取种子站点及下载地址模板
         site_url, download_page = self.iyuu_helper.get_torrent_url(seed.get("sid"))
         if not site_url or not download_page:
             # 加入缓存
-            self._error_caches.append(seed.get("info_hash"))
+            self._error_caches.add(seed.get("info_hash"))
             self.fail += 1
             self.cached += 1
-            return False
+            return None
         # 查询站点
         site_domain = StringUtils.get_url_domain(site_url)
         # 站点信息
-        sites_helper = SitesHelper()
-        site_info = sites_helper.get_indexer(site_domain)
+        site_info = SitesHelper().get_indexer(site_domain)
         if not site_info or not site_info.get('url'):
             logger.debug(f"没有维护种子对应的站点：{site_url}")
-            return False
+            return None
         if self._sites and site_info.get('id') not in self._sites:
             logger.info("当前站点不在选择的辅种站点范围，跳过 ...")
-            return False
+            return None
         self.realtotal += 1
-        # 查询hash值是否已经在下载器中
-        downloader_obj = service.instance
-        torrent_info, _ = downloader_obj.get_torrents(ids=[seed.get("info_hash")])
-        if torrent_info:
-            logger.info(f"{seed.get('info_hash')} 已在下载器中，跳过 ...")
-            self.exist += 1
-            return False
+        return {
+            "seed": seed,
+            "current_hash": current_hash,
+            "save_path": save_path,
+            "save_category": save_category,
+            "site_domain": site_domain,
+            "site_info": site_info,
+            "download_page": download_page
+        }
+
+    def __exclude_existing_seeds(self, service: ServiceInfo, seed_tasks: List[dict]) -> List[dict]:
+        """
+        一次性查询下载器，排除已在下载器中的种子
+        """
+        if not seed_tasks:
+            return []
+        torrents, _ = service.instance.get_torrents(ids=[task.get("seed").get("info_hash") for task in seed_tasks])
+        existing_hashes = {self.__get_hash(torrent=torrent, dl_type=service.type) for torrent in torrents or []}
+        if not existing_hashes:
+            return seed_tasks
+        remaining_tasks = []
+        for task in seed_tasks:
+            if task.get("seed").get("info_hash") in existing_hashes:
+                logger.info(f"{task.get('seed').get('info_hash')} 已在下载器中，跳过 ...")
+                self.exist += 1
+                continue
+            remaining_tasks.append(task)
+        return remaining_tasks
+
+    def __fetch_seed_torrents(self, seed_tasks: List[dict]) -> Iterator[Tuple[dict, dict]]:
+        """
+        并发下载种子文件，按完成顺序返回辅种任务及下载结果
+        """
+        if not seed_tasks:
+            return
+        if not self._site_limiter:
+            self._site_limiter = SiteRateLimiter(rate=self._site_rate, capacity=self._site_burst)
+        executor = ThreadPoolExecutor(max_workers=min(len(seed_tasks), self._download_workers),
+                                      thread_name_prefix="IYUUAutoSeed-Download")
+        try:
+            futures = {executor.submit(self.__fetch_seed_torrent, task): task for task in seed_tasks}
+            for future in as_completed(futures):
+                if self._event.is_set():
+                    logger.info(f"辅种服务停止")
+                    return
+                task = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logger.error(f"下载种子文件出错：{str(e)}")
+                    result = {"error": str(e)}
+                yield task, result
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def __fetch_seed_torrent(self, seed_task: dict) -> dict:
+        """
+        下载辅种任务的种子文件，在线程池中执行，仅返回结果，计数及缓存统一由调用方处理
+        """
+
+        def __is_special_site(url):
+            """
+            判断是否为特殊站点（是否需要添加https）
+            """
+            if "hdsky.me" in url:
+                return False
+            return True
+
+        seed = seed_task.get("seed")
+        site_info = seed_task.get("site_info")
+        site_domain = seed_task.get("site_domain")
         # 站点流控
-        check, checkmsg = sites_helper.check(site_domain)
+        check, checkmsg = SitesHelper().check(site_domain)
         if check:
             logger.warn(checkmsg)
-            self.fail += 1
-            return False
+            return {"error": checkmsg}
+        # 站点限流，避免短时间内集中请求同一站点
+        if not self._site_limiter.acquire(site=site_domain, event=self._event):
+            return {"error": "辅种服务停止"}
         # 下载种子
         torrent_url = self.__get_download_url(seed=seed,
                                               site=site_info,
-                                              base_url=download_page)
+                                              base_url=seed_task.get("download_page"))
         if not torrent_url:
-            # 加入失败缓存
-            self._error_caches.append(seed.get("info_hash"))
-            self.fail += 1
-            self.cached += 1
-            return False
+            return {"error": "获取种子下载链接失败", "cache": "error"}
         # 强制使用Https
         if __is_special_site(torrent_url):
             if "?" in torrent_url:
@@ -1086,29 +1187,45 @@ class IYUUAutoSeed(_PluginBase):
             cookie=site_info.get("cookie"),
             ua=site_info.get("ua") or settings.USER_AGENT,
             proxy=site_info.get("proxy"))
+        if not content:
+            logger.error(f"下载种子文件失败：{torrent_url}")
+            # 种子不存在的情况加入永久失败缓存
+            if error_msg and ('无法打开链接' in error_msg or '触发站点流控' in error_msg):
+                return {"torrent_url": torrent_url, "error": error_msg, "cache": "error"}
+            return {"torrent_url": torrent_url, "error": error_msg, "cache": "permanent"}
+        return {"torrent_url": torrent_url, "content": content}
+
+    def __add_seed_torrent(self, seed_task: dict, result: dict, service: ServiceInfo) -> bool:
+        """
+        根据种子文件下载结果添加辅种下载任务，仅在调用线程中串行执行
+        """
+        seed = seed_task.get("seed")
+        site_info = seed_task.get("site_info")
+        content = result.get("content")
         if not content:
             # 下载失败
             self.fail += 1
             # 加入失败缓存
-            if error_msg and ('无法打开链接' in error_msg or '触发站点流控' in error_msg):
-                self._error_caches.append(seed.get("info_hash"))
-            else:
-                # 种子不存在的情况
-                self._permanent_error_caches.append(seed.get("info_hash"))
-            logger.error(f"下载种子文件失败：{torrent_url}")
+            if result.get("cache") == "error":
+                self._error_caches.add(seed.get("info_hash"))
+                if not result.get("torrent_url"):
+                    self.cached += 1
+            elif result.get("cache") == "permanent":
+                self._permanent_error_caches.add(seed.get("info_hash"))
             return False
+        torrent_url = result.get("torrent_url")
         # 添加下载，辅种任务默认暂停
         logger.info(f"添加下载任务：{torrent_url} ...")
         download_id = self.__download(service=service,
                                       content=content,
-                                      save_path=save_path,
-                                      save_category=save_category,
+                                      save_path=seed_task.get("save_path"),
+                                      save_category=seed_task.get("save_category"),
                                       site_name=site_info.get("name"))
         if not download_id:
             # 下载失败
             self.fail += 1
             # 加入失败缓存
-            self._error_caches.append(seed.get("info_hash"))
+            self._error_caches.add(seed.get("info_hash"))
             return False
         else:
             self.success += 1
@@ -1122,14 +1239,14 @@ class IYUUAutoSeed(_PluginBase):
                         logger.info(f"{download_id} 跳过校验，请自行检查手动开始任务...")
                 else:
                     # 开始校验种子
-                    downloader_obj.recheck_torrents(ids=[download_id])
+                    service.instance.recheck_torrents(ids=[download_id])
                     self.__add_recheck_torrents(service, download_id)
             else:
                 self.__add_recheck_torrents(service, download_id)
             # 下载成功
             logger.info(f"成功添加辅种下载，站点：{site_info.get('name')}，种子链接：{torrent_url}")
             # 成功也加入缓存，有一些改了路径校验不通过的，手动删除后，下一次又会辅上
-            self._success_caches.append(seed.get("info_hash"))
+            self._success_caches.add(seed.get("info_hash"))
             return True
 
     def __add_recheck_torrents(self, service: ServiceInfo, download_id: str):
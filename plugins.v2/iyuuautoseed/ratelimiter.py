@@ -0,0 +1,68 @@
+import threading
+import time
+from typing import Dict, Optional
+
+
+class TokenBucket(object):
+    """
+    令牌桶，按固定速率补充令牌，用于限制对同一站点的请求频率
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        # 每秒补充的令牌数
+        self._rate = rate
+        # 令牌桶容量，即允许的突发请求数
+        self._capacity = max(capacity, 1)
+        self._tokens = self._capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, event: Optional[threading.Event] = None, timeout: float = None) -> bool:
+        """
+        获取一个令牌，令牌不足时阻塞等待
+        :param event: 退出事件，事件被设置时停止等待
+        :param timeout: 最长等待时间，为空时一直等待
+        :return: 是否获取成功
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self._rate if self._rate > 0 else 1
+            if deadline is not None:
+                wait = min(wait, deadline - time.monotonic())
+                if wait <= 0:
+                    return False
+            if event:
+                if event.wait(wait):
+                    return False
+            else:
+                time.sleep(wait)
+
+
+class SiteRateLimiter(object):
+    """
+    按站点分别维护令牌桶，不同站点之间互不影响
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self._rate = rate
+        self._capacity = capacity
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, site: str, event: Optional[threading.Event] = None, timeout: float = None) -> bool:
+        """
+        获取指定站点的请求令牌
+        """
+        with self._lock:
+            bucket = self._buckets.get(site)
+            if not bucket:
+                bucket = TokenBucket(rate=self._rate, capacity=self._capacity)
+                self._buckets[site] = bucket
+        return bucket.acquire(event=event, timeout=timeout)
@@ -0,0 +1,81 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Union, Iterable
+
+
+class SeedCache(object):
+    """
+    辅种缓存，基于有序字典实现O(1)查询，支持过期时间及容量上限，超出容量时淘汰最久未使用的记录
+    """
+
+    def __init__(self, maxsize: int = 0, ttl: float = 0, items: Union[Dict[str, float], Iterable[str]] = None):
+        # 容量上限，为0时不限制
+        self._maxsize = maxsize
+        # 过期时间（秒），为0时永不过期
+        self._ttl = ttl
+        # key -> 加入时间
+        self._items: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.update(items)
+
+    def __contains__(self, key: Optional[str]) -> bool:
+        if not key:
+            return False
+        with self._lock:
+            added = self._items.get(key)
+            if added is None:
+                return False
+            if self.__expired(added):
+                del self._items[key]
+                return False
+            self._items.move_to_end(key)
+            return True
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def add(self, key: Optional[str], added: float = None):
+        """
+        加入缓存，已存在时刷新加入时间
+        """
+        if not key:
+            return
+        with self._lock:
+            self._items[key] = added or time.time()
+            self._items.move_to_end(key)
+            if self._maxsize:
+                while len(self._items) > self._maxsize:
+                    self._items.popitem(last=False)
+
+    def update(self, items: Union[Dict[str, float], Iterable[str]] = None):
+        """
+        批量加入缓存，兼容历史版本保存的列表格式
+        """
+        if not items:
+            return
+        if isinstance(items, dict):
+            for key, added in sorted(items.items(), key=lambda item: item[1] or 0):
+                self.add(key, added)
+        else:
+            for key in items:
+                self.add(key)
+
+    def clear(self):
+        """
+        清空缓存
+        """
+        with self._lock:
+            self._items.clear()
+
+    def dump(self) -> Dict[str, float]:
+        """
+        导出未过期的缓存记录，用于持久化
+        """
+        with self._lock:
+            for key in [key for key, added in self._items.items() if self.__expired(added)]:
+                del self._items[key]
+            return dict(self._items)
+
+    def __expired(self, added: float) -> bool:
+        return bool(self._ttl) and time.time() - added > self._ttl
@@ -2,7 +2,7 @@ import gc
 import warnings
 from datetime import datetime, timedelta
 from threading import Lock
-from typing import Optional, Any, List, Dict, Tuple
+from typing import Optional, Any, List, Dict, Tuple, Callable
 
 import pytz
 from apscheduler.schedulers.background import BackgroundScheduler
@@ -11,11 +11,13 @@ from app import schemas
 from app.chain.site import SiteChain
 from app.core.config import settings
 from app.core.event import eventmanager, Event
+from app.db import SessionFactory
 from app.db.models.siteuserdata import SiteUserData
 from app.db.site_oper import SiteOper
 from app.helper.sites import SitesHelper
 from app.log import logger
 from app.plugins import _PluginBase
+from app.plugins.sitestatistic.rendercache import RenderCache
 from app.schemas.types import EventType, NotificationType
 from app.utils.string import StringUtils
 
@@ -32,7 +34,7 @@ class SiteStatistic(_PluginBase):
     # 插件图标
     plugin_icon = "statistic.png"
     # 插件版本
-    plugin_version = "1.9"
+    plugin_version = "1.11"
     # 插件作者
     plugin_author = "lightolly,jxxghp"
     # 作者主页
@@ -50,11 +52,16 @@ class SiteStatistic(_PluginBase):
     _dashboard_type: str = "today"
     _notify_type = ""
     _scheduler = None
+    # 站点历史数据缓存：(各站点最新数据, (站点, 日期) -> 数据)
+    _history_cache: Optional[Tuple[List[SiteUserData], Dict[Tuple[str, str], SiteUserData]]] = None
+    # 页面渲染缓存
+    _render_cache = RenderCache()
 
     def init_plugin(self, config: dict = None):
 
         # 停止现有任务
         self.stop_service()
+        self._render_cache.invalidate()
 
         # 配置
         if config:
@@ -204,8 +211,11 @@ class SiteStatistic(_PluginBase):
     @eventmanager.register(EventType.SiteRefreshed)
     def send_msg(self, event: Event):
         """
-        站点数据刷新事件时发送消息
+        站点数据刷新事件时清理历史数据缓存并发送消息
         """
+        with lock:
+            self._history_cache = None
+        self._render_cache.invalidate()
         if not self._notify_type:
             return
         if event.event_data.get('site_id') != "*":
@@ -273,58 +283,77 @@ class SiteStatistic(_PluginBase):
             self.post_message(mtype=NotificationType.SiteMessage,
                               title="站点数据统计", text="\n".join(sorted_messages))
 
-    @staticmethod
-    def __get_data() -> Tuple[str, List[SiteUserData], List[SiteUserData]]:
+    def __get_data(self) -> Tuple[str, List[SiteUserData], List[SiteUserData]]:
         """
         获取最近一次统计的日期、最近一次统计的站点数据、上一次的站点数据
         如果上一次某个站点数据缺失，则 fallback 到该站点之前最近有数据的日期
         """
-        # 优化：只获取最近的站点数据，而不是所有历史数据
-        latest_data: List[SiteUserData] = SiteOper().get_userdata_latest()
+        latest_data, history = self.__get_history()
         if not latest_data:
             return "", [], []
 
         # 过滤未启用或不存在的站点
-        site_domains = [site.domain for site in SiteOper().list_active()]
+        site_domains = {site.domain for site in SiteOper().list_active()}
         latest_data = [data for data in latest_data if data and data.domain in site_domains]
+        if not latest_data:
+            return "", [], []
 
         # 获取最新日期（用于显示）
         latest_day = max(data.updated_day for data in latest_data)
-        
+
         # 按上传量降序排序
         latest_data.sort(key=lambda x: x.upload or 0, reverse=True)
 
         # 为每个站点查找对应的前一天数据
         previous_data = []
         for current_site in latest_data:
-            site_name = current_site.name
-            current_day = current_site.updated_day
-            
-            # 计算该站点的前一天日期
-            previous_day_str = (datetime.strptime(current_day, "%Y-%m-%d") - timedelta(days=1)).strftime("%Y-%m-%d")
-            
-            # 获取前一天的数据
-            previous_data_list = SiteOper().get_userdata_by_date(previous_day_str)
-            previous_by_site = {data.name: data for data in previous_data_list}
-            site_prev = previous_by_site.get(site_name)
-            
-            # 如果前一天没有该站点数据，尝试查找更早的数据
-            if not site_prev or site_prev.err_msg:
-                # 最多回溯7天，避免查询过多历史数据
-                for i in range(2, 8):
-                    fallback_date = (datetime.strptime(current_day, "%Y-%m-%d") - timedelta(days=i)).strftime("%Y-%m-%d")
-                    fallback_data_list = SiteOper().get_userdata_by_date(fallback_date)
-                    fallback_by_site = {data.name: data for data in fallback_data_list}
-                    candidate = fallback_by_site.get(site_name)
-                    if candidate and not candidate.err_msg:
-                        site_prev = candidate
-                        break
-
+            current_day = datetime.strptime(current_site.updated_day, "%Y-%m-%d")
+            site_prev = None
+            # 优先取前一天的数据，缺失或有错误时最多回溯7天
+            for i in range(1, 8):
+                day = (current_day - timedelta(days=i)).strftime("%Y-%m-%d")
+                candidate = history.get((current_site.name, day))
+                if i == 1:
+                    site_prev = candidate
+                if candidate and not candidate.err_msg:
+                    site_prev = candidate
+                    break
             if site_prev:
                 previous_data.append(site_prev)
 
         return latest_day, latest_data, previous_data
 
+    def __get_history(self) -> Tuple[List[SiteUserData], Dict[Tuple[str, str], SiteUserData]]:
+        """
+        获取各站点最新数据及其前7天的历史数据，结果缓存至下一次站点数据刷新
+        """
+        with lock:
+            if self._history_cache is None:
+                self._history_cache = self.__load_history()
+            latest_data, history = self._history_cache
+        return list(latest_data), history
+
+    @staticmethod
+    def __load_history() -> Tuple[List[SiteUserData], Dict[Tuple[str, str], SiteUserData]]:
+        """
+        一次性查询各站点最新数据之前7天的历史数据，按(站点, 日期)建立索引
+        """
+        # 只获取最近的站点数据，而不是所有历史数据
+        latest_data: List[SiteUserData] = SiteOper().get_userdata_latest()
+        if not latest_data:
+            return [], {}
+        days = set()
+        for data in latest_data:
+            if not data or not data.updated_day:
+                continue
+            current_day = datetime.strptime(data.updated_day, "%Y-%m-%d")
+            days.update((current_day - timedelta(days=i)).strftime("%Y-%m-%d") for i in range(1, 8))
+        if not days:
+            return latest_data, {}
+        with SessionFactory() as db:
+            history_data = db.query(SiteUserData).filter(SiteUserData.updated_day.in_(days)).all()
+        return latest_data, {(data.name, data.updated_day): data for data in history_data}
+
     @staticmethod
     def __get_total_elements(today: str, stattistic_data: List[SiteUserData], yesterday_sites_data: List[SiteUserData],
                              dashboard: str = "today") -> List[dict]:
@@ -812,11 +841,19 @@ class SiteStatistic(_PluginBase):
         }
         # 全局配置
         attrs = {}
+        # 站点统计
+        elements = self.__render(name=f"dashboard_{key}_{self._dashboard_type}",
+                                 render=self.__render_dashboard)
+        return cols, attrs, elements
+
+    def __render_dashboard(self) -> List[dict]:
+        """
+        拼装仪表板页面元素
+        """
         # 获取数据
         today, stattistic_data, yesterday_sites_data = self.__get_data()
         # 汇总
-        # 站点统计
-        elements = [
+        return [
             {
                 'component': 'VRow',
                 'content': self.__get_total_elements(
@@ -827,12 +864,33 @@ class SiteStatistic(_PluginBase):
                 )
             }
         ]
-        return cols, attrs, elements
 
     def get_page(self) -> List[dict]:
         """
         拼装插件详情页面，需要返回页面配置，同时附带数据
         """
+        return self.__render(name="page", render=self.__render_page)
+
+    def __render(self, name: str, render: Callable[[], List[dict]]) -> List[dict]:
+        """
+        从缓存获取页面元素，站点数据、最新统计日期或启用站点变化时重新渲染
+        """
+        latest_data, _ = self.__get_history()
+        site_domains = {site.domain for site in SiteOper().list_active()}
+        active_sites = frozenset(data.domain for data in latest_data if data and data.domain in site_domains)
+        latest_day = max((data.updated_day for data in latest_data if data and data.domain in active_sites),
+                         default="")
+        elements, hit = self._render_cache.get(key=(name, latest_day, active_sites), render=render)
+        if not hit:
+            stats = self._render_cache.stats()
+            logger.debug(f"站点数据统计 渲染 {name} 耗时 {stats.get('last_render_time')}ms，"
+                         f"缓存命中 {stats.get('hits')} 次，未命中 {stats.get('misses')} 次")
+        return elements
+
+    def __render_page(self) -> List[dict]:
+        """
+        拼装插件详情页面元素
+        """
 
         def format_bonus(bonus):
             try:
@@ -0,0 +1,65 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+
+class RenderCache(object):
+    """
+    页面渲染结果缓存，按渲染键缓存已拼装的页面元素，并记录命中率及渲染耗时
+    """
+
+    def __init__(self, maxsize: int = 8):
+        # 最多缓存的渲染结果数
+        self._maxsize = maxsize
+        self._items: Dict[Hashable, Any] = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._render_count = 0
+        self._render_time = 0.0
+        self._last_render_time = 0.0
+
+    def get(self, key: Hashable, render: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        获取渲染结果，未命中时调用render渲染并缓存
+        :return: 渲染结果、是否命中缓存
+        """
+        with self._lock:
+            if key in self._items:
+                self._hits += 1
+                return self._items[key], True
+            self._misses += 1
+        start = time.perf_counter()
+        value = render()
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self._render_count += 1
+            self._render_time += elapsed
+            self._last_render_time = elapsed
+            if len(self._items) >= self._maxsize:
+                self._items.pop(next(iter(self._items)))
+            self._items[key] = value
+        return value, False
+
+    def invalidate(self):
+        """
+        清空全部渲染结果
+        """
+        with self._lock:
+            self._items.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        缓存命中及渲染耗时统计，耗时单位：毫秒
+        """
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / total, 4) if total else 0,
+                "render_count": self._render_count,
+                "avg_render_time": round(self._render_time / self._render_count * 1000, 2)
+                if self._render_count else 0,
+                "last_render_time": round(self._last_render_time * 1000, 2)
+            }
@@ -1,4 +1,3 @@
-import re
 import threading
 import time
 from datetime import datetime, timedelta
@@ -8,10 +7,12 @@ import pytz
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
 
+from app import schemas
 from app.core.config import settings
 from app.helper.downloader import DownloaderHelper
 from app.log import logger
 from app.plugins import _PluginBase
+from app.plugins.torrentremover.ruleplan import RemoveRulePlan, TorrentSnapshot
 from app.schemas import NotificationType, ServiceInfo
 from app.utils.string import StringUtils
 
@@ -26,7 +27,7 @@ class TorrentRemover(_PluginBase):
     # 插件图标
     plugin_icon = "delete.jpg"
     # 插件版本
-    plugin_version = "2.2"
+    plugin_version = "2.4"
     # 插件作者
     plugin_author = "jxxghp"
     # 作者主页
@@ -60,6 +61,10 @@ class TorrentRemover(_PluginBase):
     _errorkeywords = None
     _torrentstates = None
     _torrentcategorys = None
+    # 删种条件执行计划
+    _rule_plan: Optional[RemoveRulePlan] = None
+    # 每批次提交给下载器的种子数
+    _batch_size = 200
 
     def init_plugin(self, config: dict = None):
 
@@ -83,6 +88,21 @@ class TorrentRemover(_PluginBase):
             self._torrentstates = config.get("torrentstates") or ""
             self._torrentcategorys = config.get("torrentcategorys") or ""
 
+        # 编译删种条件
+        try:
+            self._rule_plan = RemoveRulePlan.compile(size=self._size,
+                                                     ratio=self._ratio,
+                                                     seeding_time=self._time,
+                                                     upspeed=self._upspeed,
+                                                     pathkeywords=self._pathkeywords,
+                                                     trackerkeywords=self._trackerkeywords,
+                                                     errorkeywords=self._errorkeywords,
+                                                     torrentstates=self._torrentstates,
+                                                     torrentcategorys=self._torrentcategorys)
+        except ValueError as err:
+            self._rule_plan = None
+            logger.error(f"自动删种条件配置错误：{err}")
+
         self.stop_service()
 
         if self.get_state() or self._onlyonce:
@@ -130,7 +150,22 @@ class TorrentRemover(_PluginBase):
         pass
 
     def get_api(self) -> List[Dict[str, Any]]:
-        pass
+        """
+        获取插件API
+        [{
+            "path": "/xx",
+            "endpoint": self.xxx,
+            "methods": ["GET", "POST"],
+            "summary": "API说明"
+        }]
+        """
+        return [{
+            "path": "/preview",
+            "endpoint": self.preview_torrents,
+            "methods": ["GET"],
+            "summary": "删种预览",
+            "description": "按当前删种条件预览将被处理的种子，不执行删除",
+        }]
 
     def get_service(self) -> List[Dict[str, Any]]:
         """
@@ -636,47 +671,28 @@ class TorrentRemover(_PluginBase):
                     downlader_obj = self.__get_downloader(downloader)
                     if self._action == "pause":
                         message_text = f"{downloader.title()} 共暂停{len(torrents)}个种子"
-                        for torrent in torrents:
-                            if self._event.is_set():
-                                logger.info(f"自动删种服务停止")
-                                return
-                            text_item = f"{torrent.get('name')} " \
-                                        f"来自站点：{torrent.get('site')} " \
-                                        f"大小：{StringUtils.str_filesize(torrent.get('size'))}"
-                            # 暂停种子
-                            downlader_obj.stop_torrents(ids=[torrent.get("id")])
-                            logger.info(f"自动删种任务 暂停种子：{text_item}")
-                            message_text = f"{message_text}\n{text_item}"
+                        action_text = "暂停种子"
                     elif self._action == "delete":
                         message_text = f"{downloader.title()} 共删除{len(torrents)}个种子"
-                        for torrent in torrents:
-                            if self._event.is_set():
-                                logger.info(f"自动删种服务停止")
-                                return
-                            text_item = f"{torrent.get('name')} " \
-                                        f"来自站点：{torrent.get('site')} " \
-                                        f"大小：{StringUtils.str_filesize(torrent.get('size'))}"
-                            # 删除种子
-                            downlader_obj.delete_torrents(delete_file=False,
-                                                          ids=[torrent.get("id")])
-                            logger.info(f"自动删种任务 删除种子：{text_item}")
-                            message_text = f"{message_text}\n{text_item}"
+                        action_text = "删除种子"
                     elif self._action == "deletefile":
                         message_text = f"{downloader.title()} 共删除{len(torrents)}个种子及文件"
-                        for torrent in torrents:
-                            if self._event.is_set():
-                                logger.info(f"自动删种服务停止")
-                                return
+                        action_text = "删除种子及文件"
+                    else:
+                        continue
+                    # 按批次处理种子
+                    for i in range(0, len(torrents), self._batch_size):
+                        if self._event.is_set():
+                            logger.info(f"自动删种服务停止")
+                            return
+                        batch = torrents[i:i + self._batch_size]
+                        self.__execute_action(downlader_obj, ids=[torrent.get("id") for torrent in batch])
+                        for torrent in batch:
                             text_item = f"{torrent.get('name')} " \
                                         f"来自站点：{torrent.get('site')} " \
                                         f"大小：{StringUtils.str_filesize(torrent.get('size'))}"
-                            # 删除种子
-                            downlader_obj.delete_torrents(delete_file=True,
-                                                          ids=[torrent.get("id")])
-                            logger.info(f"自动删种任务 删除种子及文件：{text_item}")
+                            logger.info(f"自动删种任务 {action_text}：{text_item}")
                             message_text = f"{message_text}\n{text_item}"
-                    else:
-                        continue
                     if torrents and message_text and self._notify:
                         self.post_message(
                             mtype=NotificationType.SiteMessage,
@@ -686,102 +702,32 @@ class TorrentRemover(_PluginBase):
             except Exception as e:
                 logger.error(f"自动删种任务异常：{str(e)}")
 
-    def __get_qb_torrent(self, torrent: Any) -> Optional[dict]:
+    def __execute_action(self, downloader_obj: Any, ids: List[str]):
         """
-        检查QB下载任务是否符合条件
+        对一批种子执行暂停或删除操作
         """
-        # 完成时间
-        date_done = torrent.completion_on if torrent.completion_on > 0 else torrent.added_on
-        # 现在时间
-        date_now = int(time.mktime(datetime.now().timetuple()))
-        # 做种时间
-        torrent_seeding_time = date_now - date_done if date_done else 0
-        # 平均上传速度
-        torrent_upload_avs = torrent.uploaded / torrent_seeding_time if torrent_seeding_time else 0
-        # 大小 单位：GB
-        sizes = self._size.split('-') if self._size else []
-        minsize = float(sizes[0]) * 1024 * 1024 * 1024 if sizes else 0
-        maxsize = float(sizes[-1]) * 1024 * 1024 * 1024 if sizes else 0
-        # 分享率
-        if self._ratio and torrent.ratio <= float(self._ratio):
-            return None
-        # 做种时间 单位：小时
-        if self._time and torrent_seeding_time <= float(self._time) * 3600:
-            return None
-        # 文件大小
-        if self._size and (torrent.size >= int(maxsize) or torrent.size <= int(minsize)):
-            return None
-        if self._upspeed and torrent_upload_avs >= float(self._upspeed) * 1024:
-            return None
-        if self._pathkeywords and not re.findall(self._pathkeywords, torrent.save_path, re.I):
-            return None
-        if self._trackerkeywords and not re.findall(self._trackerkeywords, torrent.tracker, re.I):
-            return None
-        if self._torrentstates and torrent.state not in self._torrentstates:
-            return None
-        if self._torrentcategorys and (not torrent.category or torrent.category not in self._torrentcategorys):
-            return None
-        return {
-            "id": torrent.hash,
-            "name": torrent.name,
-            "site": StringUtils.get_url_sld(torrent.tracker),
-            "size": torrent.size
-        }
+        if not ids:
+            return
+        if self._action == "pause":
+            downloader_obj.stop_torrents(ids=ids)
+        elif self._action == "delete":
+            downloader_obj.delete_torrents(delete_file=False, ids=ids)
+        elif self._action == "deletefile":
+            downloader_obj.delete_torrents(delete_file=True, ids=ids)
 
-    def __get_tr_torrent(self, torrent: Any) -> Optional[dict]:
+    def get_remove_torrents(self, downloader: str):
         """
-        检查TR下载任务是否符合条件
+        获取自动删种任务种子
         """
-        # 完成时间
-        date_done = torrent.date_done or torrent.date_added
-        # 现在时间
-        date_now = int(time.mktime(datetime.now().timetuple()))
-        # 做种时间
-        torrent_seeding_time = date_now - int(time.mktime(date_done.timetuple())) if date_done else 0
-        # 上传量
-        torrent_uploaded = torrent.ratio * torrent.total_size
-        # 平均上传速茺
-        torrent_upload_avs = torrent_uploaded / torrent_seeding_time if torrent_seeding_time else 0
-        # 大小 单位：GB
-        sizes = self._size.split('-') if self._size else []
-        minsize = float(sizes[0]) * 1024 * 1024 * 1024 if sizes else 0
-        maxsize = float(sizes[-1]) * 1024 * 1024 * 1024 if sizes else 0
-        # 分享率
-        if self._ratio and torrent.ratio <= float(self._ratio):
-            return None
-        if self._time and torrent_seeding_time <= float(self._time) * 3600:
-            return None
-        if self._size and (torrent.total_size >= int(maxsize) or torrent.total_size <= int(minsize)):
-            return None
-        if self._upspeed and torrent_upload_avs >= float(self._upspeed) * 1024:
-            return None
-        if self._pathkeywords and not re.findall(self._pathkeywords, torrent.download_dir, re.I):
-            return None
-        if self._trackerkeywords:
-            if not torrent.trackers:
-                return None
-            else:
-                tacker_key_flag = False
-                for tracker in torrent.trackers:
-                    if re.findall(self._trackerkeywords, tracker.get("announce", ""), re.I):
-                        tacker_key_flag = True
-                        break
-                if not tacker_key_flag:
-                    return None
-        if self._errorkeywords and not re.findall(self._errorkeywords, torrent.error_string, re.I):
-            return None
-        return {
-            "id": torrent.hashString,
-            "name": torrent.name,
-            "site": torrent.trackers[0].get("sitename") if torrent.trackers else "",
-            "size": torrent.total_size
-        }
+        snapshot = self.__get_torrent_snapshot(downloader)
+        if not snapshot:
+            return []
+        return self.__match_torrents(snapshot)
 
-    def get_remove_torrents(self, downloader: str):
+    def __get_torrent_snapshot(self, downloader: str) -> Optional[TorrentSnapshot]:
         """
-        获取自动删种任务种子
+        查询下载器种子并生成列式快照
         """
-        remove_torrents = []
         # 下载器对象
         downloader_obj = self.__get_downloader(downloader)
         downloader_config = self.__get_downloader_config(downloader)
@@ -795,46 +741,71 @@ class TorrentRemover(_PluginBase):
         # 查询种子
         torrents, error_flag = downloader_obj.get_torrents(tags=tags or None)
         if error_flag:
+            return None
+        return TorrentSnapshot.from_torrents(downloader_config.type, torrents)
+
+    def __match_torrents(self, snapshot: TorrentSnapshot) -> List[dict]:
+        """
+        按删种条件计划匹配快照中的种子
+        """
+        if not self._rule_plan:
             return []
-        # 处理种子
-        for torrent in torrents:
-            if downloader_config.type == "qbittorrent":
-                item = self.__get_qb_torrent(torrent)
-            else:
-                item = self.__get_tr_torrent(torrent)
-            if not item:
-                continue
-            remove_torrents.append(item)
+        matched = self._rule_plan.evaluate(snapshot)
+        remove_torrents = [snapshot.item(index) for index in matched]
         # 处理辅种
-        if self._samedata and remove_torrents:
-            remove_ids = [t.get("id") for t in remove_torrents]
-            remove_torrents_plus = []
-            for remove_torrent in remove_torrents:
-                name = remove_torrent.get("name")
-                size = remove_torrent.get("size")
-                for torrent in torrents:
-                    if downloader_config.type == "qbittorrent":
-                        plus_id = torrent.hash
-                        plus_name = torrent.name
-                        plus_size = torrent.size
-                        plus_site = StringUtils.get_url_sld(torrent.tracker)
-                    else:
-                        plus_id = torrent.hashString
-                        plus_name = torrent.name
-                        plus_size = torrent.total_size
-                        plus_site = torrent.trackers[0].get("sitename") if torrent.trackers else ""
-                    # 比对名称和大小
-                    if plus_name == name \
-                            and plus_size == size \
-                            and plus_id not in remove_ids:
-                        remove_torrents_plus.append(
-                            {
-                                "id": plus_id,
-                                "name": plus_name,
-                                "site": plus_site,
-                                "size": plus_size
-                            }
-                        )
-            if remove_torrents_plus:
-                remove_torrents.extend(remove_torrents_plus)
+        if self._samedata and matched:
+            ids = snapshot.columns["id"]
+            names = snapshot.columns["name"]
+            sizes = snapshot.columns["size"]
+            remove_ids = {ids[index] for index in matched}
+            # 按(名称, 大小)建立索引，避免逐个比对全部种子
+            same_data_index: Dict[Tuple[str, int], List[int]] = {}
+            for index in range(len(snapshot)):
+                same_data_index.setdefault((names[index], sizes[index]), []).append(index)
+            for index in matched:
+                for plus_index in same_data_index.pop((names[index], sizes[index]), []):
+                    if ids[plus_index] in remove_ids:
+                        continue
+                    remove_ids.add(ids[plus_index])
+                    remove_torrents.append(snapshot.item(plus_index))
         return remove_torrents
+
+    def preview_torrents(self, apikey: str, downloader: str = None) -> schemas.Response:
+        """
+        按当前删种条件预览将被处理的种子，不执行任何操作，可由API调用
+        """
+        if apikey != settings.API_TOKEN:
+            return schemas.Response(success=False, message="API密钥错误")
+        if not self._rule_plan:
+            return schemas.Response(success=False, message="删种条件配置错误，请检查配置")
+        service_infos = self.service_infos or {}
+        results = []
+        for name in [downloader] if downloader else self._downloaders:
+            if name not in service_infos:
+                results.append({"downloader": name, "error": "下载器未配置或未连接"})
+                continue
+            try:
+                fetch_start = time.perf_counter()
+                snapshot = self.__get_torrent_snapshot(name)
+                if snapshot is None:
+                    results.append({"downloader": name, "error": "获取下载器种子失败"})
+                    continue
+                eval_start = time.perf_counter()
+                torrents = self.__match_torrents(snapshot)
+                eval_end = time.perf_counter()
+            except Exception as e:
+                results.append({"downloader": name, "error": str(e)})
+                continue
+            total_size = sum(torrent.get("size") or 0 for torrent in torrents)
+            results.append({
+                "downloader": name,
+                "action": self._action,
+                "total": len(snapshot),
+                "count": len(torrents),
+                "total_size": total_size,
+                "total_size_str": StringUtils.str_filesize(total_size),
+                "fetch_time": round((eval_start - fetch_start) * 1000, 2),
+                "eval_time": round((eval_end - eval_start) * 1000, 2),
+                "torrents": torrents
+            })
+        return schemas.Response(success=True, data={"downloaders": results})
@@ -0,0 +1,182 @@
+import re
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.utils.string import StringUtils
+
+# 规则：(列名, 判断函数)，判断函数返回True表示满足删种条件
+Rule = Tuple[str, Callable[[Any], bool]]
+
+
+class TorrentSnapshot(object):
+    """
+    下载器种子列表的列式快照，每个字段一列，同一行号对应同一个种子
+    """
+
+    def __init__(self, downloader_type: str):
+        self.downloader_type = downloader_type
+        self.torrents: List[Any] = []
+        self.columns: Dict[str, list] = {
+            "id": [],
+            "name": [],
+            "size": [],
+            "ratio": [],
+            "seeding_time": [],
+            "upload_avs": [],
+            "path": [],
+            "trackers": [],
+            "state": [],
+            "category": [],
+            "error": [],
+        }
+
+    def __len__(self) -> int:
+        return len(self.torrents)
+
+    @classmethod
+    def from_torrents(cls, downloader_type: str, torrents: List[Any]) -> "TorrentSnapshot":
+        """
+        从下载器种子列表生成快照，当前时间只取一次
+        """
+        snapshot = cls(downloader_type)
+        date_now = int(time.time())
+        if downloader_type == "qbittorrent":
+            for torrent in torrents:
+                snapshot.__append_qb(torrent, date_now)
+        else:
+            for torrent in torrents:
+                snapshot.__append_tr(torrent, date_now)
+        return snapshot
+
+    def __append_qb(self, torrent: Any, date_now: int):
+        # 完成时间
+        date_done = torrent.completion_on if torrent.completion_on > 0 else torrent.added_on
+        # 做种时间
+        seeding_time = date_now - date_done if date_done else 0
+        columns = self.columns
+        self.torrents.append(torrent)
+        columns["id"].append(torrent.hash)
+        columns["name"].append(torrent.name)
+        columns["size"].append(torrent.size)
+        columns["ratio"].append(torrent.ratio)
+        columns["seeding_time"].append(seeding_time)
+        columns["upload_avs"].append(torrent.uploaded / seeding_time if seeding_time else 0)
+        columns["path"].append(torrent.save_path or "")
+        columns["trackers"].append((torrent.tracker or "",))
+        columns["state"].append(torrent.state)
+        columns["category"].append(torrent.category)
+        columns["error"].append(None)
+
+    def __append_tr(self, torrent: Any, date_now: int):
+        # 完成时间
+        date_done = torrent.date_done or torrent.date_added
+        # 做种时间
+        seeding_time = date_now - int(time.mktime(date_done.timetuple())) if date_done else 0
+        columns = self.columns
+        self.torrents.append(torrent)
+        columns["id"].append(torrent.hashString)
+        columns["name"].append(torrent.name)
+        columns["size"].append(torrent.total_size)
+        columns["ratio"].append(torrent.ratio)
+        columns["seeding_time"].append(seeding_time)
+        # 上传量
+        uploaded = torrent.ratio * torrent.total_size
+        columns["upload_avs"].append(uploaded / seeding_time if seeding_time else 0)
+        columns["path"].append(torrent.download_dir or "")
+        columns["trackers"].append(tuple(tracker.get("announce", "") for tracker in torrent.trackers or []))
+        columns["state"].append(None)
+        columns["category"].append(None)
+        columns["error"].append(torrent.error_string or "")
+
+    def site(self, index: int) -> str:
+        """
+        获取种子所属站点，仅对需要输出的种子计算
+        """
+        torrent = self.torrents[index]
+        if self.downloader_type == "qbittorrent":
+            return StringUtils.get_url_sld(torrent.tracker)
+        return torrent.trackers[0].get("sitename") if torrent.trackers else ""
+
+    def item(self, index: int) -> dict:
+        """
+        输出种子信息
+        """
+        return {
+            "id": self.columns["id"][index],
+            "name": self.columns["name"][index],
+            "site": self.site(index),
+            "size": self.columns["size"][index]
+        }
+
+
+class RemoveRulePlan(object):
+    """
+    删种条件执行计划，在配置加载时一次性完成数值转换及正则编译，按列式快照逐行求值
+    """
+
+    def __init__(self, qb_rules: List[Rule], tr_rules: List[Rule]):
+        self._rules = {
+            "qbittorrent": qb_rules,
+            "transmission": tr_rules
+        }
+
+    @classmethod
+    def compile(cls, size: Optional[str] = None, ratio: Optional[str] = None, seeding_time: Optional[str] = None,
+                upspeed: Optional[str] = None, pathkeywords: Optional[str] = None,
+                trackerkeywords: Optional[str] = None, errorkeywords: Optional[str] = None,
+                torrentstates: Optional[str] = None, torrentcategorys: Optional[str] = None) -> "RemoveRulePlan":
+        """
+        编译删种条件，配置格式错误时抛出ValueError
+        """
+        rules: List[Tuple[Rule, bool, bool]] = []
+        try:
+            # 分享率
+            if ratio:
+                min_ratio = float(ratio)
+                rules.append((("ratio", lambda value: value > min_ratio), True, True))
+            # 做种时间 单位：小时
+            if seeding_time:
+                min_seconds = float(seeding_time) * 3600
+                rules.append((("seeding_time", lambda value: value > min_seconds), True, True))
+            # 大小 单位：GB
+            if size:
+                sizes = size.split('-')
+                minsize = int(float(sizes[0]) * 1024 * 1024 * 1024)
+                maxsize = int(float(sizes[-1]) * 1024 * 1024 * 1024)
+                rules.append((("size", lambda value: minsize < value < maxsize), True, True))
+            # 平均上传速度 单位：KB/s
+            if upspeed:
+                max_speed = float(upspeed) * 1024
+                rules.append((("upload_avs", lambda value: value < max_speed), True, True))
+        except ValueError as err:
+            raise ValueError(f"删种条件数值格式错误：{err}")
+        try:
+            if pathkeywords:
+                path_re = re.compile(pathkeywords, re.I)
+                rules.append((("path", lambda value: bool(path_re.search(value))), True, True))
+            if trackerkeywords:
+                tracker_re = re.compile(trackerkeywords, re.I)
+                rules.append((("trackers", lambda values: any(tracker_re.search(value) for value in values)),
+                              True, True))
+            if errorkeywords:
+                error_re = re.compile(errorkeywords, re.I)
+                rules.append((("error", lambda value: bool(error_re.search(value))), False, True))
+        except re.error as err:
+            raise ValueError(f"删种条件正则表达式错误：{err}")
+        if torrentstates:
+            rules.append((("state", lambda value: value in torrentstates), True, False))
+        if torrentcategorys:
+            rules.append((("category", lambda value: bool(value) and value in torrentcategorys), True, False))
+        return cls(qb_rules=[rule for rule, for_qb, _ in rules if for_qb],
+                   tr_rules=[rule for rule, _, for_tr in rules if for_tr])
+
+    def evaluate(self, snapshot: TorrentSnapshot) -> List[int]:
+        """
+        计算满足全部删种条件的种子行号
+        """
+        rules = [(snapshot.columns[column], func)
+                 for column, func in self._rules.get(snapshot.downloader_type, self._rules["transmission"])]
+        if not rules:
+            return list(range(len(snapshot)))
+        return [index for index in range(len(snapshot))
+                if all(func(column[index]) for column, func in rules)]
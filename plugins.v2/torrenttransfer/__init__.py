@@ -1,8 +1,10 @@
 import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from pathlib import Path
 from threading import Event
-from typing import Any, List, Dict, Tuple, Optional, Union
+from typing import Any, List, Dict, Tuple, Optional, Union, Set, Iterator
 
 import pytz
 from apscheduler.schedulers.background import BackgroundScheduler
@@ -28,7 +30,7 @@ class TorrentTransfer(_PluginBase):
     # 插件图标
     plugin_icon = "seed.png"
     # 插件版本
-    plugin_version = "1.10.2"
+    plugin_version = "1.10.3"
     # 插件作者
     plugin_author = "jxxghp"
     # 作者主页
@@ -72,6 +74,10 @@ class TorrentTransfer(_PluginBase):
     _is_recheck_running = False
     # 任务标签
     _torrent_tags = []
+    # 并发准备种子文件的线程数
+    _transfer_workers = 4
+    # 每处理多少个种子输出一次进度并保存断点
+    _progress_interval = 50
 
     def init_plugin(self, config: dict = None):
 
@@ -779,93 +785,84 @@ class TorrentTransfer(_PluginBase):
             # 删除重复数
             del_dup = 0
 
-            downloader_helper = DownloaderHelper()
+            # 一次性获取目的下载器中的全部种子Hash，获取失败时逐个查询
+            to_hashes = self.__get_downloader_hashes(to_service)
+            if to_hashes is None:
+                logger.warn(f"获取下载器 {to_service.name} 的种子列表失败，将逐个查询种子是否已存在")
+            # 一次性获取源下载器种子文件目录中的文件清单
+            try:
+                torrent_files = set(os.listdir(self._fromtorrentpath))
+            except Exception as e:
+                logger.error(f"读取种子文件目录 {self._fromtorrentpath} 失败：{str(e)}")
+                return
+
+            # 断点续传，优先处理上次中断时未完成的种子
+            checkpoint = self.__get_checkpoint(from_service=from_service, to_service=to_service)
+            resume_hashes = set(checkpoint.get("pending") or [])
+            if resume_hashes:
+                logger.info(f"发现上次未完成的转移任务，剩余种子数：{len(resume_hashes)}，优先继续转移")
+                trans_torrents.sort(key=lambda item: item.get("hash") not in resume_hashes)
+
+            # 批量预过滤：种子文件不存在、已在目的下载器中
+            pending_torrents = []
+            dup_hashes = []
             for torrent_item in trans_torrents:
-                # 检查种子文件是否存在
-                torrent_file = Path(self._fromtorrentpath) / f"{torrent_item.get('hash')}.torrent"
-                if not torrent_file.exists():
-                    logger.error(f"种子文件不存在：{torrent_file}")
+                hash_str = torrent_item.get("hash")
+                if f"{hash_str}.torrent" not in torrent_files:
+                    logger.error(f"种子文件不存在：{Path(self._fromtorrentpath) / f'{hash_str}.torrent'}")
                     # 失败计数
                     fail += 1
                     continue
-
-                # 查询hash值是否已经在目的下载器中
-                torrent_info, _ = to_downloader.get_torrents(ids=[torrent_item.get('hash')])
-                if torrent_info:
-                    # 删除重复的源种子，不能删除文件！
-                    if self._deleteduplicate:
-                        logger.info(f"删除重复的源下载器任务（不含文件）：{torrent_item.get('hash')} ...")
-                        from_downloader.delete_torrents(delete_file=False, ids=[torrent_item.get('hash')])
+                if self.__exists_in_downloader(hash_str=hash_str, service=to_service, hashes=to_hashes):
+                    if hash_str in resume_hashes and self._deletesource \
+                            and self.get_data(key=f"{from_service.name}-{hash_str}"):
+                        # 上次已转移成功但尚未删除源种子
+                        logger.info(f"继续删除上次已转移的源下载器任务（不含文件）：{hash_str} ...")
+                        dup_hashes.append(hash_str)
+                        success += 1
+                    elif self._deleteduplicate:
+                        # 删除重复的源种子，不能删除文件！
+                        logger.info(f"删除重复的源下载器任务（不含文件）：{hash_str} ...")
+                        dup_hashes.append(hash_str)
                         del_dup += 1
                     else:
-                        logger.info(f"{torrent_item.get('hash')} 已在目的下载器中，跳过 ...")
+                        logger.info(f"{hash_str} 已在目的下载器中，跳过 ...")
                         # 跳过计数
                         skip += 1
                     continue
+                pending_torrents.append(torrent_item)
+            if dup_hashes:
+                from_downloader.delete_torrents(delete_file=False, ids=dup_hashes)
+            logger.info(f"预过滤完成，待转移种子数：{len(pending_torrents)}，失败：{fail}，跳过：{skip}，删除重复：{del_dup}")
+
+            # 保存断点
+            pending_hashes = [item.get("hash") for item in pending_torrents]
+            self.__save_checkpoint(from_service=from_service, to_service=to_service, pending=pending_hashes)
 
-                # 转换保存路径
-                download_dir = self.__convert_save_path(torrent_item.get('save_path'),
-                                                        self._frompath,
-                                                        self._topath)
-                if not download_dir:
-                    logger.error(f"转换保存路径失败：{torrent_item.get('save_path')}")
+            downloader_helper = DownloaderHelper()
+            is_from_qb = downloader_helper.is_downloader("qbittorrent", service=from_service)
+            processed = 0
+            source_deletes = []
+            # 并发读取并处理种子文件，按顺序串行添加到目的下载器
+            for torrent_item, (content, download_dir) in self.__prepare_transfers(torrents=pending_torrents,
+                                                                                 is_from_qb=is_from_qb):
+                processed += 1
+                if processed % self._progress_interval == 0:
+                    logger.info(f"转移进度：{processed}/{len(pending_torrents)}，成功：{success}，失败：{fail}")
+                    self.__flush_source_deletes(from_downloader=from_downloader, hashes=source_deletes)
+                    # 当前种子尚未添加，仍需保留在断点中
+                    self.__save_checkpoint(from_service=from_service, to_service=to_service,
+                                           pending=pending_hashes[processed - 1:])
+                if not content or not download_dir:
                     # 失败计数
                     fail += 1
                     continue
 
-                # 如果源下载器是QB检查是否有Tracker，没有的话额外获取
-                if downloader_helper.is_downloader("qbittorrent", service=from_service):
-                    # 读取种子内容、解析种子文件
-                    content = torrent_file.read_bytes()
-                    if not content:
-                        logger.warn(f"读取种子文件失败：{torrent_file}")
-                        fail += 1
-                        continue
-                    # 读取trackers
-                    try:
-                        torrent_main = bdecode(content)
-                        main_announce = torrent_main.get('announce')
-                    except Exception as err:
-                        logger.warn(f"解析种子文件 {torrent_file} 失败：{str(err)}")
-                        fail += 1
-                        continue
-
-                    if not main_announce:
-                        logger.info(f"{torrent_item.get('hash')} 未发现tracker信息，尝试补充tracker信息...")
-                        # 读取fastresume文件
-                        fastresume_file = Path(self._fromtorrentpath) / f"{torrent_item.get('hash')}.fastresume"
-                        if not fastresume_file.exists():
-                            logger.warn(f"fastresume文件不存在：{fastresume_file}")
-                            fail += 1
-                            continue
-                        # 尝试补充trackers
-                        try:
-                            # 解析fastresume文件
-                            fastresume = fastresume_file.read_bytes()
-                            torrent_fastresume = bdecode(fastresume)
-                            # 读取trackers
-                            fastresume_trackers = torrent_fastresume.get('trackers')
-                            if isinstance(fastresume_trackers, list) \
-                                    and len(fastresume_trackers) > 0 \
-                                    and fastresume_trackers[0]:
-                                # 重新赋值
-                                torrent_main['announce'] = fastresume_trackers[0][0]
-                                # 保留其他tracker，避免单一tracker无法连接
-                                if len(fastresume_trackers) > 1 or len(fastresume_trackers[0]) > 1:
-                                    torrent_main['announce-list'] = fastresume_trackers
-                                # 替换种子文件路径
-                                torrent_file = settings.TEMP_PATH / f"{torrent_item.get('hash')}.torrent"
-                                # 编码并保存到临时文件
-                                torrent_file.write_bytes(bencode(torrent_main))
-                        except Exception as err:
-                            logger.error(f"解析fastresume文件 {fastresume_file} 出错：{str(err)}")
-                            fail += 1
-                            continue
-
+                torrent_file = Path(self._fromtorrentpath) / f"{torrent_item.get('hash')}.torrent"
                 # 发送到另一个下载器中下载：默认暂停、传输下载路径、关闭自动管理模式
                 logger.info(f"添加转移做种任务到下载器 {to_service.name}：{torrent_file}")
                 download_id = self.__download(service=to_service,
-                                              content=torrent_file.read_bytes(),
+                                              content=content,
                                               save_path=download_dir,
                                               torrent=torrent_item.get('torrent'))
                 if not download_id:
@@ -893,11 +890,6 @@ class TorrentTransfer(_PluginBase):
                     else:
                         self.__add_recheck_torrents(to_service, download_id)
 
-                    # 删除源种子，不能删除文件！
-                    if self._deletesource:
-                        logger.info(f"删除源下载器任务（不含文件）：{torrent_item.get('hash')} ...")
-                        from_downloader.delete_torrents(delete_file=False, ids=[torrent_item.get('hash')])
-
                     # 成功计数
                     success += 1
                     # 插入转种记录
@@ -909,6 +901,21 @@ class TorrentTransfer(_PluginBase):
                                        "delete_source": self._deletesource,
                                        "delete_duplicate": self._deleteduplicate,
                                    })
+
+                    # 删除源种子，不能删除文件！按批次统一删除
+                    if self._deletesource:
+                        logger.info(f"删除源下载器任务（不含文件）：{torrent_item.get('hash')} ...")
+                        source_deletes.append(torrent_item.get('hash'))
+
+            self.__flush_source_deletes(from_downloader=from_downloader, hashes=source_deletes)
+            if self._event.is_set():
+                logger.info(f"转移服务停止，已处理 {processed}/{len(pending_torrents)}，下次运行时继续转移")
+                self.__save_checkpoint(from_service=from_service, to_service=to_service,
+                                       pending=pending_hashes[processed:])
+                return
+            # 转移完成，清除断点
+            self.del_data(key="transfer_checkpoint")
+
             # 触发校验任务
             if success > 0 and self._autostart:
                 self.check_recheck()
@@ -924,6 +931,151 @@ class TorrentTransfer(_PluginBase):
             logger.info(f"没有需要转移的种子")
         logger.info("转移做种任务执行完成")
 
+    def __get_downloader_hashes(self, service: ServiceInfo) -> Optional[Set[str]]:
+        """
+        获取下载器中全部种子的Hash，获取失败时返回None
+        """
+        torrents, error = service.instance.get_torrents()
+        if error:
+            return None
+        return {self.__get_hash(torrent, service.type) for torrent in torrents or []}
+
+    @staticmethod
+    def __exists_in_downloader(hash_str: str, service: ServiceInfo, hashes: Optional[Set[str]]) -> bool:
+        """
+        判断种子是否已在下载器中，没有Hash清单时逐个查询
+        """
+        if hashes is not None:
+            return hash_str in hashes
+        torrent_info, _ = service.instance.get_torrents(ids=[hash_str])
+        return True if torrent_info else False
+
+    def __prepare_transfers(self, torrents: List[dict],
+                            is_from_qb: bool) -> Iterator[Tuple[dict, Tuple[Optional[bytes], Optional[str]]]]:
+        """
+        使用有界线程池并发准备种子文件，按原顺序返回种子及准备结果
+        """
+        if not torrents:
+            return
+        window = deque()
+        executor = ThreadPoolExecutor(max_workers=self._transfer_workers, thread_name_prefix="TorrentTransfer")
+        try:
+            items = iter(torrents)
+            while True:
+                # 最多同时准备线程数两倍的种子，避免一次性读取全部种子文件
+                while len(window) < self._transfer_workers * 2:
+                    torrent_item = next(items, None)
+                    if not torrent_item:
+                        break
+                    window.append((torrent_item, executor.submit(self.__prepare_transfer, torrent_item, is_from_qb)))
+                if not window:
+                    break
+                if self._event.is_set():
+                    logger.info(f"转移服务停止")
+                    return
+                torrent_item, future = window.popleft()
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logger.error(f"准备种子文件 {torrent_item.get('hash')} 出错：{str(e)}")
+                    result = (None, None)
+                yield torrent_item, result
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def __prepare_transfer(self, torrent_item: dict, is_from_qb: bool) -> Tuple[Optional[bytes], Optional[str]]:
+        """
+        转换保存路径并读取种子文件，源下载器为QB时补充缺失的tracker信息
+        :return: 种子内容、目的下载器保存路径
+        """
+        # 转换保存路径
+        download_dir = self.__convert_save_path(torrent_item.get('save_path'),
+                                                self._frompath,
+                                                self._topath)
+        if not download_dir:
+            logger.error(f"转换保存路径失败：{torrent_item.get('save_path')}")
+            return None, None
+
+        torrent_file = Path(self._fromtorrentpath) / f"{torrent_item.get('hash')}.torrent"
+        # 读取种子内容
+        content = torrent_file.read_bytes()
+        if not content:
+            logger.warn(f"读取种子文件失败：{torrent_file}")
+            return None, None
+
+        # 如果源下载器是QB检查是否有Tracker，没有的话额外获取
+        if not is_from_qb:
+            return content, download_dir
+
+        # 读取trackers
+        try:
+            torrent_main = bdecode(content)
+            main_announce = torrent_main.get('announce')
+        except Exception as err:
+            logger.warn(f"解析种子文件 {torrent_file} 失败：{str(err)}")
+            return None, None
+
+        if main_announce:
+            return content, download_dir
+
+        logger.info(f"{torrent_item.get('hash')} 未发现tracker信息，尝试补充tracker信息...")
+        # 读取fastresume文件
+        fastresume_file = Path(self._fromtorrentpath) / f"{torrent_item.get('hash')}.fastresume"
+        if not fastresume_file.exists():
+            logger.warn(f"fastresume文件不存在：{fastresume_file}")
+            return None, None
+        # 尝试补充trackers
+        try:
+            # 解析fastresume文件
+            fastresume = fastresume_file.read_bytes()
+            torrent_fastresume = bdecode(fastresume)
+            # 读取trackers
+            fastresume_trackers = torrent_fastresume.get('trackers')
+            if isinstance(fastresume_trackers, list) \
+                    and len(fastresume_trackers) > 0 \
+                    and fastresume_trackers[0]:
+                # 重新赋值
+                torrent_main['announce'] = fastresume_trackers[0][0]
+                # 保留其他tracker，避免单一tracker无法连接
+                if len(fastresume_trackers) > 1 or len(fastresume_trackers[0]) > 1:
+                    torrent_main['announce-list'] = fastresume_trackers
+                # 重新编码种子内容
+                content = bencode(torrent_main)
+        except Exception as err:
+            logger.error(f"解析fastresume文件 {fastresume_file} 出错：{str(err)}")
+            return None, None
+        return content, download_dir
+
+    @staticmethod
+    def __flush_source_deletes(from_downloader: Union[Qbittorrent, Transmission], hashes: List[str]):
+        """
+        批量删除已转移成功的源种子，不删除文件
+        """
+        if not hashes:
+            return
+        from_downloader.delete_torrents(delete_file=False, ids=list(hashes))
+        hashes.clear()
+
+    def __get_checkpoint(self, from_service: ServiceInfo, to_service: ServiceInfo) -> dict:
+        """
+        获取上次转移的断点，源或目的下载器发生变化时忽略
+        """
+        checkpoint = self.get_data(key="transfer_checkpoint") or {}
+        if checkpoint.get("from") != from_service.name or checkpoint.get("to") != to_service.name:
+            return {}
+        return checkpoint
+
+    def __save_checkpoint(self, from_service: ServiceInfo, to_service: ServiceInfo, pending: List[str]):
+        """
+        保存转移断点，记录尚未处理的种子
+        """
+        self.save_data(key="transfer_checkpoint",
+                       value={
+                           "from": from_service.name,
+                           "to": to_service.name,
+                           "pending": pending
+                       })
+
     def __add_recheck_torrents(self, service: ServiceInfo, download_id: str):
         # 追加校验任务
         logger.info(f"添加校验检查任务：{download_id} ...")